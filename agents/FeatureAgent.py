@@ -1,8 +1,8 @@
 # agents/FeatureAgent.py
-import pandas as pd
 import numpy as np
 from crewai import Agent
 from typing import ClassVar, Optional, List, Dict, Any
+from utils.timeseries import TimeSeries
 
 
 class FeatureAgent(Agent):
@@ -23,17 +23,15 @@ class FeatureAgent(Agent):
                     if not x_raw or not y_raw or len(x_raw) != len(y_raw):
                         continue
 
-                    # Parse dates
-                    x_dates = pd.to_datetime(x_raw, errors='coerce')
-                    mask = x_dates.notna()
-                    x_dates = x_dates[mask]
-                    y = np.array([float(v) for v, m in zip(y_raw, mask) if m])
+                    # Parse dates into the sorted ordinal index (drops unparseable rows)
+                    series = TimeSeries.from_lists(x_raw, y_raw, name=series_name)
+                    y = series.values
 
                     if len(y) < 1:
                         continue
 
                     # Days since first point
-                    days = (x_dates - x_dates.min()).dt.days.values
+                    days = series.dates - series.dates[0]
                     if len(days) < 2:
                         days = np.arange(len(y))
 
@@ -1,50 +1,63 @@
 # agents/agents_pipeline.py
+# Heavy, optional imports (selenium, joblib via models.utils) are deferred to first use;
+# import this module through agents.registry.get_crew() so the API can start without it.
 import requests
-from bs4 import BeautifulSoup
 import re
-import json
 import pandas as pd
 import numpy as np
-import joblib
 from crewai import Crew, Agent
-from selenium.webdriver.chrome.options import Options
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-import json, re, pandas as pd, time, numpy as np
-import ast
+import os
 from typing import ClassVar, Optional, List, Dict, Any
+from utils.timeseries import TimeSeries
+from utils.metrics import inc, timed
+from models.utils import DEFAULT_BASE_HORIZON, DEFAULT_QUANTILES, MODEL_FILES, load_model, predict_bands, scaled_bands
 
 
 
 # -----------------------
 # 1️⃣ Scraper Agent
 # -----------------------
+# "selenium" (default) renders pages in headless Chrome; "http" fetches raw HTML (load tests, recorded pages)
+SCRAPER_FETCH = os.getenv("SCRAPER_FETCH", "selenium").lower()
+
+
 class ScraperAgent(Agent):
     role: ClassVar[str] = "Scraper"
     goal: ClassVar[str] = "Scrape AmarStock historical stock data."
     backstory: ClassVar[str] = "Extract X/Y axis (date/closing price) from AmarStock company pages."
 
-    def run(self, url, x_axis_dates=None):
+    def fetch_html(self, url):
+        """Rendered page source via headless Chrome, or a plain GET when SCRAPER_FETCH=http (stub/recorded pages)."""
+        if SCRAPER_FETCH == "http":
+            resp = requests.get(url, timeout=10)
+            resp.raise_for_status()
+            return resp.text
+
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        options = Options()
+        options.add_argument("--headless")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--no-sandbox")
+        driver = webdriver.Chrome(service=Service(), options=options)
         try:
-            options = Options()
-            options.add_argument("--headless")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--no-sandbox")
-            driver = webdriver.Chrome(service=Service(), options=options)
             driver.get(url)
-
             WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
-
-            html = driver.page_source
+            return driver.page_source
+        finally:
             driver.quit()
 
+    def run(self, url, x_axis_dates=None):
+        try:
+            html = self.fetch_html(url)
+
             # Extract JS arrays like: window.chartData = [{date:'2025-10-23', close:210.0}, ...]
             pattern = r"window\.chartData\s*=\s*(\[[^\]]+\])"
             match = re.search(pattern, html)
@@ -65,30 +78,40 @@ class ScraperAgent(Agent):
                     x_vals.append(date)
                     y_vals.append(float(close))
 
-            # Filter by requested dates
+            # Filter by requested dates (binary search over the sorted date index)
+            series = TimeSeries.from_lists(x_vals, y_vals, name="Price")
             if x_axis_dates:
-                x_filtered, y_filtered = [], []
-                for d, v in zip(x_vals, y_vals):
-                    if d in x_axis_dates:
-                        x_filtered.append(d)
-                        y_filtered.append(v)
-                x_vals, y_vals = x_filtered, y_filtered
+                series = series.at(x_axis_dates)
 
-            return {"axis": [{"x": x_vals, "y": y_vals, "name": "Price"}], "source_url": url}
+            return {"axis": [series.to_axis()], "source_url": url}
 
         except Exception as e:
             return {"error": f"Scraping failed: {e}", "axis": []}
         
 # -----------------------
-# 2️⃣ Research Agent (placeholder)
+# 2️⃣ Research Agent (local vector index, services/research_index.py)
 # -----------------------
 class ResearchAgent(Agent):
     role: ClassVar[str] = "Researcher"
     goal: ClassVar[str] = "Retrieve historical articles or reports for context"
     backstory: ClassVar[str] = "Responsible for finding external information for predictions"
 
-    def run(self, query):
-        return {"articles": []}  # placeholder for RAG
+    def run(self, query, symbol=None, k=None):
+        """Top-k indexed news/filing chunks for ``symbol`` (default: last path segment of a URL query)."""
+        from services.research_index import RESEARCH_TOP_K, get_research_index
+
+        url_like = bool(query) and "/" in query
+        if not symbol and url_like:
+            symbol = query.rstrip("/").rsplit("/", 1)[-1]
+        try:
+            # Opening the index (chromadb store, embedder) can fail too; research is optional context
+            index = get_research_index()
+            if index is None:
+                return {"articles": []}
+            text = query if query and not url_like else f"{symbol or ''} outlook earnings dividend news".strip()
+            return {"articles": index.search(symbol, text, k or RESEARCH_TOP_K)}
+        except Exception as e:
+            return {"articles": [], "error": f"Research lookup failed: {e}"}
 
 # -----------------------
 # 3️⃣ Feature Agent
@@ -125,8 +148,8 @@ class FeatureAgent(Agent):
             if docs.get("axis"):
                 for i, ax in enumerate(docs["axis"]):
                     try:
-                        x_numeric = np.arange(len(ax["x"]))  # use indices for slope
-                        y = np.array([float(v) for v in ax["y"]])
+                        y = TimeSeries.from_axis(ax).values
+                        x_numeric = np.arange(len(y))  # use indices for slope
                         slope = float(np.polyfit(x_numeric, y, 1)[0])
                         y_mean = float(np.mean(y))
                         features[f"axis_{i}_slope"] = slope
@@ -151,15 +174,18 @@ class ModelAgent(Agent):
     goal: str = "Predict upper and lower limits using features"
     backstory: str = "Apply quantile models to compute predictions"
 
-    def run(self, features):
+    def run(self, features, horizons=None, quantiles=None):
+        """q10/q90 limits; with ``horizons`` also ``bands`` = {horizon: {quantile: value}} from the same features."""
         try:
             X = pd.DataFrame([features])
-            model_upper = joblib.load("models/quantile_q90.pkl")
-            model_lower = joblib.load("models/quantile_q10.pkl")
-            upper = model_upper.predict(X)[0]
-            lower = model_lower.predict(X)[0]
-            return {"upper": upper, "lower": lower, "meta": {"features_used": features}}
+            model_upper = load_model(MODEL_FILES["upper"])
+            model_lower = load_model(MODEL_FILES["lower"])
+            with timed("inference"):
+                upper = model_upper.predict(X)[0]
+                lower = model_lower.predict(X)[0]
+            result = {"upper": upper, "lower": lower, "meta": {"features_used": features}}
         except Exception as e:
+            inc("heuristic_fallbacks_total")
             # fallback simple logic
             profit = features.get("last_profit", 100)
             revenue = features.get("last_revenue", 1000)
@@ -167,13 +193,44 @@ class ModelAgent(Agent):
             base = revenue * ratio * 0.1
             upper = base * 1.2
             lower = base * 0.8
-            return {"upper": round(upper, 2), "lower": round(lower, 2),
-                    "meta": {"features_used": features, "error": str(e)}}
+            result = {"upper": round(upper, 2), "lower": round(lower, 2),
+                      "meta": {"features_used": features, "error": str(e)}}
+
+        if horizons:
+            result["bands"], extrapolated, unavailable = self.bands(
+                features, horizons, quantiles or DEFAULT_QUANTILES, float(result["lower"]), float(result["upper"]))
+            if extrapolated:
+                result["meta"]["extrapolated_horizons"] = extrapolated
+            if unavailable:
+                result["meta"]["unavailable_quantiles"] = unavailable
+        return result
+
+    def bands(self, features, horizons, quantiles, lower, upper):
+        """
+        All horizons from one batched pass over the bundle; horizons it lacks are scaled from
+        (lower, upper), the q10/q90 band for the bundle's base horizon. Also returns the
+        extrapolated horizons and {horizon: quantiles the bundle has no model for}.
+        """
+        base_horizon = DEFAULT_BASE_HORIZON
+        try:
+            bundle = load_model(MODEL_FILES["bundle"])
+            base_horizon = bundle.get("horizon", DEFAULT_BASE_HORIZON)
+            with timed("inference"):
+                bands, unavailable = predict_bands(bundle, pd.DataFrame([features]), horizons, quantiles)
+        except Exception:
+            bands, unavailable = {}, {}
+        missing = [h for h in horizons if h not in bands]
+        if missing:
+            inc("heuristic_fallbacks_total")
+            bands.update(scaled_bands(lower, upper, base_horizon, missing, quantiles))
+        return bands, missing, unavailable
 
 # -----------------------
 # 5️⃣ Compose Crew
 # -----------------------
-crew = Crew(
-    name="rupalilife_predict_crew",
-    agents=[ScraperAgent(), ResearchAgent(), FeatureAgent(), ModelAgent()]
-)
\ No newline at end of file
+def build_crew() -> Crew:
+    """Scraper, Research, Feature and Model agents in pipeline order (see agents.registry)."""
+    return Crew(
+        name="rupalilife_predict_crew",
+        agents=[ScraperAgent(), ResearchAgent(), FeatureAgent(), ModelAgent()]
+    )
@@ -5,6 +5,11 @@ from io import StringIO
 from crewai import Agent
 import re
 from typing import ClassVar, Optional, List
+from utils.timeseries import TimeSeries
+import os
+
+# Overridable so load tests can point the agent at a local stub server
+AMARSTOCK_BASE_URL = os.getenv("AMARSTOCK_BASE_URL", "https://www.amarstock.com").rstrip("/")
 
 class AmarStockScraperAgent(Agent):
     role: ClassVar[str] = "Scraper"
@@ -13,7 +18,7 @@ class AmarStockScraperAgent(Agent):
 
     def run(self, symbol: str, x_axis_dates: Optional[List[str]] = None):
         try:
-            base_url = f"https://www.amarstock.com/company/{symbol}"
+            base_url = f"{AMARSTOCK_BASE_URL}/company/{symbol}"
             headers = {"User-Agent": "Mozilla/5.0"}
 
             # Step 1: Get company page
@@ -28,7 +33,7 @@ class AmarStockScraperAgent(Agent):
 
             csv_url = match.group(1)
             if not csv_url.startswith("http"):
-                csv_url = "https://www.amarstock.com" + csv_url
+                csv_url = AMARSTOCK_BASE_URL + csv_url
 
             # Step 3: Download CSV
             csv_resp = requests.get(csv_url, headers=headers, timeout=10)
@@ -36,16 +41,12 @@ class AmarStockScraperAgent(Agent):
                 return {"error": f"CSV download failed: {csv_resp.status_code}", "axis": []}
 
             df = pd.read_csv(StringIO(csv_resp.text))
-            df['Date'] = pd.to_datetime(df['Date'], errors='coerce').dt.strftime('%Y-%m-%d')
-            df['Close'] = pd.to_numeric(df['Close'], errors='coerce')
+            series = TimeSeries.from_frame(df, "Date", "Close", name="Price")
 
             if x_axis_dates:
-                df = df[df['Date'].isin(x_axis_dates)]
-
-            x_vals = df['Date'].tolist()
-            y_vals = df['Close'].tolist()
+                series = series.at(x_axis_dates)
 
-            return {"axis": [{"x": x_vals, "y": y_vals, "name": "Price"}],
+            return {"axis": [series.to_axis()],
                     "source_url": csv_url}
 
         except Exception as e:
@@ -3,6 +3,7 @@ import yfinance as yf
 import pandas as pd
 from crewai import Agent
 from typing import ClassVar, Optional, List
+from utils.timeseries import TimeSeries
 
 class DSEXScraperAgent(Agent):
     role: ClassVar[str] = "Scraper"
@@ -17,16 +18,14 @@ class DSEXScraperAgent(Agent):
             data.reset_index(inplace=True)
             data['Date'] = pd.to_datetime(data['Date']).dt.strftime('%Y-%m-%d')
 
+            series = TimeSeries.from_frame(data, "Date", "Close", name="DSEX Close")
             if x_axis_dates:
-                data = data[data['Date'].isin(x_axis_dates)]
-
-            x_vals = data['Date'].tolist()
-            y_vals = data['Close'].tolist()
+                series = series.at(x_axis_dates)
 
             # Save CSV
             data.to_csv("DSEX_historical_data.csv", index=False)
 
-            return {"axis": [{"x": x_vals, "y": y_vals, "name": "DSEX Close"}],
+            return {"axis": [series.to_axis()],
                     "source": "Yahoo Finance via yfinance"}
 
         except Exception as e:
@@ -0,0 +1,99 @@
+"""
+Lazy access to the prediction crew.
+
+``agents.agents_pipeline`` pulls in crewai (and its LLM stack), so it is only
+imported on the first ``get_crew()`` call instead of when ``app.main`` is
+imported. ``warm_up()`` does that import and preloads the quantile models,
+optionally on a background thread, so the first /predict does not pay for it
+while /status and the data endpoints are already serving.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# "background" (default) | "blocking" | "off"
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background").lower()
+
+_crew = None
+_crew_lock = threading.Lock()
+_warmup_thread: Optional[threading.Thread] = None
+
+# Filled in as things load; exposed through startup_report()
+_report: Dict[str, Any] = {"imports": {}, "warmup": {"status": "not started"}}
+
+
+def _record(name: str, started: float):
+    _report["imports"][name] = round(time.perf_counter() - started, 4)
+
+
+def get_crew():
+    """The shared Crew, imported and built on first use (thread-safe)."""
+    global _crew
+    if _crew is None:
+        with _crew_lock:
+            if _crew is None:
+                started = time.perf_counter()
+                from agents.agents_pipeline import build_crew
+                _record("agents.agents_pipeline", started)
+
+                started = time.perf_counter()
+                _crew = build_crew()
+                _record("crew", started)
+    return _crew
+
+
+def crew_loaded() -> bool:
+    return _crew is not None
+
+
+def _warm(models: bool, research: bool):
+    from models.utils import MODEL_FILES, load_model
+
+    _report["warmup"] = {"status": "running"}
+    started = time.perf_counter()
+    try:
+        get_crew()
+        if research:
+            from services.research_index import get_research_index
+            started_index = time.perf_counter()
+            if get_research_index() is not None:
+                _record("research_index", started_index)
+        if models:
+            for path in MODEL_FILES.values():
+                if os.path.exists(path):
+                    model_started = time.perf_counter()
+                    load_model(path)
+                    _record(path, model_started)
+        _report["warmup"] = {"status": "done", "seconds": round(time.perf_counter() - started, 4)}
+        logger.info(f"🔥 Warm-up finished in {_report['warmup']['seconds']}s")
+    except Exception as e:
+        _report["warmup"] = {"status": "failed", "error": str(e),
+                             "seconds": round(time.perf_counter() - started, 4)}
+        logger.error(f"❌ Warm-up failed: {e}")
+
+
+def warm_up(mode: str = WARMUP_MODE, models: bool = True, research: bool = True):
+    """
+    Import the crew and preload models now ("blocking"), on a daemon thread ("background"), or not
+    at all. ``research=False`` skips opening the research index (chromadb's SQLite handles and the
+    embedder are not fork-safe, so a prefork master leaves them to each worker).
+    """
+    global _warmup_thread
+    if mode == "off":
+        _report["warmup"] = {"status": "off"}
+        return
+    if mode == "blocking":
+        _warm(models, research)
+        return
+    if _warmup_thread is None or not _warmup_thread.is_alive():
+        _warmup_thread = threading.Thread(target=_warm, args=(models, research), name="crew-warmup", daemon=True)
+        _warmup_thread.start()
+
+
+def startup_report() -> Dict[str, Any]:
+    """Per-module import/load seconds and warm-up state."""
+    return {"crew_loaded": crew_loaded(), "imports": dict(_report["imports"]), "warmup": dict(_report["warmup"])}
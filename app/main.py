@@ -1,15 +1,116 @@
 # app/main.py
-from fastapi import FastAPI, UploadFile, Form
+import asyncio
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, Form, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import uvicorn
-from agents.agents_pipeline import crew
+from agents.registry import get_crew, startup_report, warm_up
+from models.utils import MODEL_FILES, MODEL_INFO
 import numpy as np
-from typing import Optional, List
-import pandas as pd
+from typing import Optional, List, Dict, Any
+import os
+import shutil
+import tempfile
+import datetime
+from utils.config import build_connection_string
+from utils.database_manager import AsyncDatabaseManager, DatabaseManager
+from services.market_loader import MarketHistoryLoader
+from services.job_handlers import get_job_queue, validate_job_params
+from services.sharemarket_service import AsyncShareMarketService, ShareMarketService, history_columns
+from services.market_analytics import BETA_WINDOW, MarketAnalyticsService
+from services.alerts import get_alert_engine
+from services.quote_hub import QuoteHub, batches
+from utils.downsample import METHODS as DOWNSAMPLE_METHODS, downsample_indices
+from utils.formats import JSON_MEDIA_TYPE, dumps_json, encode_columns, negotiate_format
+from utils.metrics import PROMETHEUS_MEDIA_TYPE, REGISTRY, inc, timed
+
+# Crew/crewai and the models load lazily (agents.registry), so this is the cost of serving /status
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
 
 
 app = FastAPI(title="FirstAPI - Prediction Agent")
 
+# Compress responses the client accepts compressed: brotli when brotli-asgi is installed, else gzip
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=1024)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024      # bytes copied per read while spooling uploads
+INGEST_CHUNK_ROWS = 50_000            # rows parsed per DataFrame chunk
+HISTORY_MAX_PAGE = 10_000             # max rows per /history page
+HISTORY_FLUSH_ROWS = 500              # rows per streamed chunk
+CHART_MAX_POINTS = 1_000              # default per-axis point budget in /predict axis_data
+MAX_HORIZONS = 12                    # band horizons per /predict request
+MAX_INFLIGHT = int(os.getenv("SERVE_MAX_INFLIGHT", "256"))   # concurrent requests per worker (0 = no limit)
+MAX_PREDICT = int(os.getenv("SERVE_MAX_PREDICT", "16"))      # concurrent /predict per worker (0 = no limit)
+UNLIMITED_PATHS = ("/health/", "/stream/", "/ws/", "/metrics")
+READY_DB_TIMEOUT = 2.0               # seconds for the /health/ready?deep=true database check
+# Run JOB_WORKERS job threads in this process; app/serve.py turns it off and runs one job-runner process
+API_JOB_WORKERS = os.getenv("API_JOB_WORKERS", "true").lower() == "true"
+STARTED_AT = time.time()
+READY: Dict[str, Optional[float]] = {"seconds": None}
+
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Shed load with 503 + Retry-After once a worker has ``limit`` requests (or
+    ``predict_limit`` /predict calls) in flight, instead of queueing them
+    until every client times out. Probes, streams and /metrics are not counted.
+    """
+    def __init__(self, app, limit: int = MAX_INFLIGHT, predict_limit: int = MAX_PREDICT):
+        self.app = app
+        self.limit = limit
+        self.predict_limit = predict_limit
+        self.inflight = 0
+        self.predicting = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(UNLIMITED_PATHS):
+            return await self.app(scope, receive, send)
+        predict = scope["path"] == "/predict"
+        if (self.limit and self.inflight >= self.limit) or \
+                (predict and self.predict_limit and self.predicting >= self.predict_limit):
+            inc("requests_shed_total", path="/predict" if predict else "other")
+            busy = JSONResponse({"error": "Server busy, retry shortly"}, status_code=503, headers={"Retry-After": "1"})
+            return await busy(scope, receive, send)
+        self.inflight += 1
+        self.predicting += predict
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.inflight -= 1
+            self.predicting -= predict
+
+
+app.add_middleware(ConcurrencyLimitMiddleware)
+
+_db_manager: Optional[DatabaseManager] = None
+_async_db: Optional[AsyncDatabaseManager] = None
+_quote_hub: Optional[QuoteHub] = None
+
+
+def get_db_manager() -> DatabaseManager:
+    """Create the shared DatabaseManager on first DB-backed request."""
+    global _db_manager
+    if _db_manager is None:
+        _db_manager = DatabaseManager(build_connection_string())
+    return _db_manager
+
+
+def get_async_db() -> AsyncDatabaseManager:
+    """Awaitable view of the shared DatabaseManager; queries run on its own DB threads, off the event loop."""
+    global _async_db
+    if _async_db is None:
+        _async_db = AsyncDatabaseManager(get_db_manager())
+    return _async_db
+
 # -----------------------
 # Request Model
 # -----------------------
@@ -18,79 +119,545 @@ class PredictRequest(BaseModel):
     symbol: Optional[str] = None
     horizon_days: int = 30
     x_axis_dates: Optional[List[str]] = None 
+    horizons: Optional[List[int]] = None       # extra band horizons (days); horizon_days is always included
+    quantiles: Optional[List[float]] = None    # band quantiles, default 0.1 / 0.5 / 0.9
+
+class AlertRuleRequest(BaseModel):
+    trading_code: str
+    kind: str                      # buy_below | sell_above | move_pct | band_break
+    params: Dict[str, float] = {}  # price | pct | lower + upper
+    note: Optional[str] = None
+
+class JobRequest(BaseModel):
+    kind: str                      # download | ingest | summary_refresh | retrain | rollup_rebuild | research_ingest | price_panel | eod_refresh | backfill
+    params: Dict[str, Any] = {}
 
 # -----------------------
 # Ingest Endpoint
 # -----------------------
 @app.post("/ingest")
-async def ingest(url: Optional[str] = Form(None), file: Optional[UploadFile] = None):
+async def ingest(url: Optional[str] = Form(None), file: Optional[UploadFile] = None,
+                 symbol: Optional[str] = Form(None)):
     """
     Ingest a company URL or an uploaded CSV/Excel.
+
+    The body is copied to a temp file in fixed-size chunks, then parsed
+    INGEST_CHUNK_ROWS rows at a time into the batched market_history loader,
+    so memory stays flat regardless of file size.
     """
-    return {"status": "ingest started", "url": url, "file": getattr(file, "filename", None)}
+    if file is None and not url:
+        return {"error": "Provide an uploaded file or a url"}
+
+    name = file.filename if file is not None else url.split("?")[0]
+    suffix = os.path.splitext(name or "")[1].lower()
+    if suffix not in (".csv", ".xlsx", ".xlsm"):
+        return {"error": f"Unsupported file type '{suffix}' (expected .csv or .xlsx)"}
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        # 1️⃣ Stream body to disk
+        started = time.perf_counter()
+        with tmp:
+            if file is not None:
+                # Starlette already spooled the body; copy it off the event loop in fixed-size chunks
+                await run_in_threadpool(shutil.copyfileobj, file.file, tmp, UPLOAD_CHUNK_BYTES)
+            else:
+                await run_in_threadpool(_download_to, url, tmp)
+        size = os.path.getsize(tmp.name)
+
+        # 2️⃣ Parse in bounded chunks and batch-insert (off the event loop)
+        loader = MarketHistoryLoader(get_db_manager())
+        stats = await run_in_threadpool(loader.load_file, tmp.name, symbol.strip().upper() if symbol else None,
+                                        INGEST_CHUNK_ROWS)
+        elapsed = time.perf_counter() - started
+
+        return {"status": "ingested", "url": url, "file": name, "bytes": size,
+                "rows": stats["rows"], "chunks": stats["chunks"], "elapsed_sec": round(elapsed, 3)}
+    except Exception as e:
+        return {"error": f"Ingest failed: {e}"}
+    finally:
+        if file is not None:
+            await file.close()
+        os.unlink(tmp.name)
+
+
+def _download_to(url: str, out) -> None:
+    import requests
+
+    with requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, stream=True, timeout=30) as resp:
+        resp.raise_for_status()
+        resp.raw.decode_content = True
+        shutil.copyfileobj(resp.raw, out, UPLOAD_CHUNK_BYTES)
+
 # -----------------------
 # Predict Endpoint
 # -----------------------
 @app.post("/predict")
-async def predict(req: PredictRequest):
+async def predict(req: PredictRequest, request: Request, format: Optional[str] = None,
+                  max_points: Optional[int] = None, downsample: str = "lttb"):
+    """``format`` (or Accept) = json | columnar | arrow | parquet.
+
+    Each axis is downsampled to ``max_points`` (default CHART_MAX_POINTS, 0 = every point)
+    with ``downsample`` = lttb | minmax; features are computed on the full series first.
+    """
     try:
+        fmt = negotiate_format(request.headers.get("accept"), format)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=406)
+    if downsample not in DOWNSAMPLE_METHODS:
+        return JSONResponse({"error": f"downsample must be one of {list(DOWNSAMPLE_METHODS)}"}, status_code=400)
+    points = CHART_MAX_POINTS if max_points is None else max(0, max_points)
+    horizons = sorted({req.horizon_days, *(req.horizons or [])})
+    if len(horizons) > MAX_HORIZONS or not all(0 < h <= 365 for h in horizons):
+        return JSONResponse({"error": f"horizons must be 1..365 days, at most {MAX_HORIZONS}"}, status_code=400)
+    if req.quantiles is not None and not (req.quantiles and all(0 < q < 1 for q in req.quantiles)):
+        return JSONResponse({"error": "quantiles must lie strictly between 0 and 1"}, status_code=400)
+    started = time.perf_counter()
+    try:
+        crew = await run_in_threadpool(get_crew)
+        # Every stage blocks (HTTP scrape, chromadb query, model inference), so each runs on the
+        # thread pool: the event loop keeps serving probes and up to SERVE_MAX_PREDICT predictions
+
         # 1️⃣ Scrape data (ScraperAgent)
-        docs = crew.agents[0].run(req.source_url, x_axis_dates=req.x_axis_dates)
+        with timed("scrape"):
+            docs = await run_in_threadpool(crew.agents[0].run, req.source_url, x_axis_dates=req.x_axis_dates)
         if docs.get("error"):
+            inc("scrape_fallbacks_total")
             return {"error": f"Scraping failed: {docs['error']}"}
 
-        # 2️⃣ Research (placeholder)
-        crew.agents[1].run(req.source_url)
+        # 2️⃣ Research (local vector index)
+        with timed("research"):
+            research = await run_in_threadpool(crew.agents[1].run, req.source_url, symbol=req.symbol)
 
         # 3️⃣ Extract features (FeatureAgent)
-        features = crew.agents[2].run(docs).get("features", {})
-
-        # 4️⃣ Predict using ModelAgent
-        prediction = crew.agents[3].run(features)
-
-        # 5️⃣ Build axis_data with slope/mean/std/growth
-        axis_features = []
-        if docs.get("axis"):
-            for i, ax in enumerate(docs["axis"]):
-                x_vals = ax.get("x", [])
-                y_vals = ax.get("y", [])
-                slope = features.get(f"axis_{i}_slope", 0.0)
-                y_mean = features.get(f"axis_{i}_y_mean", None)
-                y_std = features.get(f"axis_{i}_y_std", None)
-                growth = features.get(f"axis_{i}_growth_pct", None)
-
-                axis_features.append({
-                    "axis_index": i,
-                    "name": ax.get("name", f"series_{i}"),
-                    "x_values": x_vals,
-                    "y_values": y_vals,
-                    "slope": slope,
-                    "y_mean": y_mean,
-                    "y_std": y_std,
-                    "growth_pct": growth
-                })
-
-        # 6️⃣ Build final response        
-        result = {
-            "symbol": req.symbol,
-            "lower_limit": prediction.get("lower"),
-            "upper_limit": prediction.get("upper"),
-            "confidence": 0.78,
-            "explanation": f"Features used: {prediction.get('meta', {}).get('features_used', {})}",
-            "sources": [req.source_url],
-            "axis_data": axis_features
+        with timed("features"):
+            features = (await run_in_threadpool(crew.agents[2].run, docs)).get("features", {})
+
+        # 4️⃣ Predict using ModelAgent: every horizon/quantile from the same feature row
+        #    (model_load / inference spans recorded inside)
+        prediction = await run_in_threadpool(crew.agents[3].run, features, horizons=horizons, quantiles=req.quantiles)
+        bands = prediction.get("bands", {})
+        main_band = bands.get(req.horizon_days)
+        extrapolated = prediction.get("meta", {}).get("extrapolated_horizons", [])
+        unavailable = prediction.get("meta", {}).get("unavailable_quantiles", {})
+
+        with timed("response"):
+            # 5️⃣ Build axis_data with slope/mean/std/growth
+            axis_features = []
+            if docs.get("axis"):
+                for i, ax in enumerate(docs["axis"]):
+                    x_vals = ax.get("x", [])
+                    y_vals = ax.get("y", [])
+                    points_total = len(y_vals)
+                    keep = downsample_indices(y_vals, points, method=downsample)
+                    if len(keep) < points_total:
+                        x_vals = [x_vals[j] for j in keep]
+                        y_vals = [y_vals[j] for j in keep]
+                    slope = features.get(f"axis_{i}_slope", 0.0)
+                    y_mean = features.get(f"axis_{i}_y_mean", None)
+                    y_std = features.get(f"axis_{i}_y_std", None)
+                    growth = features.get(f"axis_{i}_growth_pct", None)
+
+                    axis_features.append({
+                        "axis_index": i,
+                        "name": ax.get("name", f"series_{i}"),
+                        "x_values": x_vals,
+                        "y_values": y_vals,
+                        "points_total": points_total,
+                        "slope": slope,
+                        "y_mean": y_mean,
+                        "y_std": y_std,
+                        "growth_pct": growth
+                    })
+
+            # 6️⃣ Build final response        
+            result = {
+                "symbol": req.symbol,
+                "lower_limit": min(main_band.values()) if main_band else prediction.get("lower"),
+                "upper_limit": max(main_band.values()) if main_band else prediction.get("upper"),
+                "bands": [
+                    {"horizon_days": h, "quantiles": {str(q): v for q, v in bands[h].items()},
+                     "lower": min(bands[h].values()), "upper": max(bands[h].values()),
+                     # scaled from the base q10/q90 band (no trained model for h), and quantiles without a model
+                     "extrapolated": h in extrapolated, "unavailable_quantiles": unavailable.get(h, [])}
+                    for h in horizons if bands.get(h)
+                ],
+                "confidence": 0.78,
+                "explanation": f"Features used: {prediction.get('meta', {}).get('features_used', {})}",
+                "sources": [req.source_url],
+                "research": research.get("articles", []),
+                "axis_data": axis_features
+            }
+
+            return _encode_prediction(result, fmt)
+
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        REGISTRY.observe("stage_seconds", time.perf_counter() - started, {"stage": "total"})
+
+def _band_columns(bands: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Band rows -> {"horizon_days": [...], ..., "q<quantile>": [...]} (None where a quantile is unavailable)."""
+    quantiles = sorted({q for b in bands for q in b["quantiles"]}, key=float)
+    columns: Dict[str, List[Any]] = {name: [b[name] for b in bands]
+                                     for name in ("horizon_days", "lower", "upper", "extrapolated")}
+    for q in quantiles:
+        columns[f"q{q}"] = [b["quantiles"].get(q) for b in bands]
+    return columns
+
+
+def _encode_prediction(result: Dict[str, Any], fmt: str) -> Response:
+    """
+    JSON via the fast serializer; otherwise axis points as columns (axis_index, x, y) with the
+    scalars alongside: top-level keys for ``columnar`` (bands column-oriented too), Arrow/Parquet
+    schema metadata for ``arrow`` / ``parquet``.
+    """
+    if fmt == "json":
+        return Response(dumps_json(result), media_type=JSON_MEDIA_TYPE)
+
+    axes = result.get("axis_data", [])
+    meta = {**result, "axis_data": [{k: v for k, v in a.items() if k not in ("x_values", "y_values")} for a in axes]}
+    if fmt == "columnar":
+        meta["bands"] = _band_columns(result.get("bands", []))
+        columns = {
+            "axis_index": [a["axis_index"] for a in axes for _ in a["x_values"]],
+            "x": [x for a in axes for x in a["x_values"]],
+            "y": [y for a in axes for y in a["y_values"]],
+        }
+    else:
+        columns = {
+            "axis_index": np.concatenate([np.full(len(a["x_values"]), a["axis_index"], dtype=np.int16) for a in axes])
+            if axes else np.empty(0, dtype=np.int16),
+            "x": np.concatenate([np.asarray(a["x_values"], dtype="datetime64[D]") for a in axes])
+            if axes else np.empty(0, dtype="datetime64[D]"),
+            "y": np.concatenate([np.asarray(a["y_values"], dtype=np.float64) for a in axes])
+            if axes else np.empty(0, dtype=np.float64),
         }
+    body, media_type = encode_columns(columns, fmt, metadata=meta)
+    return Response(body, media_type=media_type)
+
+# ----------------------- History (keyset pages) -----------------------
+async def _history_stream(trading_code: str, cols: List[str], cursor, direction: str, limit: int):
+    """Yield one JSON document in pieces: header, row arrays in HISTORY_FLUSH_ROWS chunks, then next_cursor."""
+    header = dumps_json({"trading_code": trading_code, "columns": cols, "direction": direction})
+    yield header[:-1] + b', "rows": ['
+    count, last_date = 0, None
+    pages = AsyncShareMarketService(get_async_db()).iter_history(trading_code, cols, cursor, direction, limit,
+                                                                 batch_size=HISTORY_FLUSH_ROWS)
+    async for page in pages:
+        yield (b"," if count else b"") + b",".join(dumps_json(list(row)) for row in page)
+        count += len(page)
+        last_date = page[-1][0]
+    next_cursor = last_date if count == limit else None
+    yield b"], " + dumps_json({"count": count, "next_cursor": next_cursor})[1:]
+
+
+async def _history_columnar(trading_code: str, cols: List[str], cursor, direction: str, limit: int,
+                            fmt: str) -> Response:
+    """Materialize one bounded page as columns and encode it (Arrow/Parquet/columnar JSON)."""
+    rows = await AsyncShareMarketService(get_async_db()).get_history_rows(trading_code, cols, cursor, direction, limit)
+    columns = {c: list(v) for c, v in zip(cols, zip(*rows))} if rows else {c: [] for c in cols}
+    next_cursor = rows[-1][0].isoformat() if len(rows) == limit else None
+    meta = {"trading_code": trading_code, "direction": direction, "count": len(rows), "next_cursor": next_cursor}
+    body, media_type = encode_columns(columns, fmt, metadata=meta)
+    return Response(body, media_type=media_type, headers={"X-Next-Cursor": next_cursor or ""})
 
-        return result
 
+@app.get("/history/{trading_code}")
+async def history(trading_code: str, request: Request, columns: Optional[str] = None,
+                  cursor: Optional[datetime.date] = None, direction: str = "desc", limit: int = 500,
+                  format: Optional[str] = None):
+    """
+    Page through a symbol's history: ``columns=date,closep`` projects columns,
+    ``cursor`` is the previous page's ``next_cursor``. The default JSON is
+    streamed with chunked transfer so neither side holds more than one page;
+    ``format`` (or Accept) = columnar | arrow | parquet returns the page columnar.
+    """
+    try:
+        cols = history_columns(columns.split(",") if columns else None)
+        if direction not in ("asc", "desc"):
+            raise ValueError("direction must be 'asc' or 'desc'")
+        limit = max(1, min(limit, HISTORY_MAX_PAGE))
+        fmt = negotiate_format(request.headers.get("accept"), format)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    code = trading_code.upper()
+    if fmt != "json":
+        try:
+            return await _history_columnar(code, cols, cursor, direction, limit, fmt)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=406)
+    return StreamingResponse(_history_stream(code, cols, cursor, direction, limit), media_type=JSON_MEDIA_TYPE)
+
+# ----------------------- OHLCV (daily / weekly / monthly) -----------------------
+@app.get("/ohlcv/{trading_code}")
+async def ohlcv(trading_code: str, request: Request, start: Optional[datetime.date] = None,
+          end: Optional[datetime.date] = None, max_points: int = CHART_MAX_POINTS,
+          resolution: str = "auto", format: Optional[str] = None):
+    """
+    OHLCV between ``start`` and ``end`` from the finest of daily / weekly / monthly
+    (rollup tables) that fits ``max_points`` rows, unless ``resolution`` is given.
+    """
+    try:
+        fmt = negotiate_format(request.headers.get("accept"), format)
+        used, frame = await AsyncShareMarketService(get_async_db()).get_ohlcv(
+            trading_code.upper(), start, end, max_points=max(0, max_points), resolution=resolution)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    dates = frame["date"].to_numpy().astype("datetime64[D]")
+    columns = {c: frame[c].to_numpy() for c in frame.columns}
+    columns["date"] = dates if fmt in ("arrow", "parquet") else np.datetime_as_string(dates, unit="D").tolist()
+    meta = {"trading_code": trading_code.upper(), "resolution": used, "count": len(frame)}
+    try:
+        body, media_type = encode_columns(columns, fmt, metadata=meta)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=406)
+    return Response(body, media_type=media_type)
+
+# ----------------------- Market analytics (beta / correlation / clusters) -----------------------
+def _records(frame) -> List[Dict[str, Any]]:
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+async def _analytics(call, *args):
+    """Run a MarketAnalyticsService call on a DB thread; unknown codes are 404, an empty database 400."""
+    try:
+        return await get_async_db().run(call, MarketAnalyticsService(get_db_manager()), *args)
+    except KeyError as e:
+        return JSONResponse({"error": e.args[0] if e.args else str(e)}, status_code=404)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+
+@app.get("/analytics/beta/{trading_code}")
+async def analytics_beta(trading_code: str, window: int = BETA_WINDOW):
+    """Daily returns and trailing-``window`` beta of one code against DSEX (equal-weight market without DSEX data)."""
+    def run(service, code):
+        frame = service.beta_history(code, max(2, window))
+        frame["date"] = np.datetime_as_string(frame["date"].to_numpy().astype("datetime64[D]"), unit="D")
+        return {"trading_code": code, "window": window, "market": service.panel().market_source,
+                "rows": _records(frame)}
+    return await _analytics(run, trading_code.upper())
+
+
+@app.get("/analytics/betas")
+async def analytics_betas():
+    """Window beta and market correlation of every code."""
+    return await _analytics(lambda service: {"market": service.engine().market_source,
+                                             "window": service.window, "betas": _records(service.betas())})
+
+
+@app.get("/analytics/correlation")
+async def analytics_correlation(codes: str):
+    """Correlation matrix of ``codes`` (comma-separated)."""
+    names = [c.strip().upper() for c in codes.split(",") if c.strip()]
+    def run(service):
+        corr = service.correlation(names)
+        return {"codes": names, "matrix": corr.astype(object).where(corr.notna(), None).values.tolist()}
+    return await _analytics(run)
+
+
+@app.get("/analytics/peers/{trading_code}")
+async def analytics_peers(trading_code: str, n: int = 10):
+    """The ``n`` codes whose returns move most closely with ``trading_code``."""
+    return await _analytics(lambda service, code: {"trading_code": code,
+                                                   "peers": _records(service.peers(code, max(1, n)))},
+                            trading_code.upper())
+
+
+@app.get("/analytics/clusters")
+async def analytics_clusters(k: int = 12):
+    """Codes grouped into ``k`` sector-style clusters by return correlation."""
+    return await _analytics(lambda service: {"k": k, "clusters": _records(service.clusters(max(1, k)))})
+
+# ----------------------- Price alerts (evaluated on every ingest) -----------------------
+@app.post("/alerts/rules")
+def add_alert_rule(req: AlertRuleRequest):
+    try:
+        # The rule starts after the newest stored row, so history already loaded never fires it
+        latest = ShareMarketService(get_db_manager()).latest_close(req.trading_code)
+        return get_alert_engine().add_rule(req.trading_code, req.kind, req.params, req.note, latest=latest)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+
+@app.get("/alerts/rules")
+def list_alert_rules(trading_code: Optional[str] = None):
+    return {"rules": get_alert_engine().list_rules(trading_code)}
+
+
+@app.delete("/alerts/rules/{rule_id}")
+def delete_alert_rule(rule_id: int):
+    return {"rule_id": rule_id, "deleted": get_alert_engine().delete_rule(rule_id)}
+
+
+@app.get("/alerts/events")
+def alert_events(trading_code: Optional[str] = None, limit: int = 50):
+    return {"events": get_alert_engine().events(max(1, min(limit, 1000)), trading_code)}
+
+# ----------------------- Live quotes (SSE / WebSocket fan-out) -----------------------
+def get_quote_hub() -> QuoteHub:
+    """The process's QuoteHub: one upstream poller per watched symbol, shared by every client."""
+    global _quote_hub
+    if _quote_hub is None:
+        _quote_hub = QuoteHub()
+    return _quote_hub
+
+
+@app.get("/stream/quotes")
+async def stream_quotes(symbols: str):
+    """Server-sent events for ``symbols`` (comma-separated): ``quote`` on LTP changes and ``alert`` firings."""
+    hub = get_quote_hub()
+    try:
+        sub = hub.subscribe(symbols.split(","))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    async def events():
+        pending = batches(hub, sub)
+        try:
+            async for batch in pending:
+                if not batch:
+                    yield b": keepalive\n\n"
+                else:
+                    yield b"".join(b"event: %s\ndata: %s\n\n" % (m["type"].encode(), dumps_json(m)) for m in batch)
+        finally:
+            # Client gone: unsubscribe now rather than when the generator is collected
+            await pending.aclose()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/ws/quotes")
+async def ws_quotes(websocket: WebSocket, symbols: str):
+    """Same messages as /stream/quotes as JSON arrays; an empty array is a heartbeat."""
+    hub = get_quote_hub()
+    await websocket.accept()
+    try:
+        sub = hub.subscribe(symbols.split(","))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    pending = batches(hub, sub)
+    try:
+        async for batch in pending:
+            await websocket.send_text(dumps_json(batch).decode())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        await pending.aclose()
+
+
+@app.on_event("shutdown")
+async def stop_quote_hub():
+    if _quote_hub is not None:
+        await _quote_hub.close()
+
+
+@app.on_event("shutdown")
+async def close_database():
+    if _async_db is not None:
+        _async_db.close()
+    if _db_manager is not None:
+        _db_manager.close()
+
+# ----------------------- Background Jobs -----------------------
+def job_queue():
+    """The shared job table; its workers run here only when API_JOB_WORKERS is on."""
+    return get_job_queue(start=API_JOB_WORKERS)
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue()
+
+
+@app.on_event("startup")
+async def warm_up_crew():
+    # WARMUP_MODE=background (default) loads crew + models on a thread; the app serves meanwhile
+    warm_up()
+    READY["seconds"] = round(time.perf_counter() - IMPORT_STARTED, 4)
+    print(f"🚀 Ready in {READY['seconds']}s (app import {IMPORT_SECONDS:.3f}s)")
+
+
+@app.post("/jobs")
+async def submit_job(req: JobRequest):
+    try:
+        validate_job_params(req.kind, req.params)
+        job_id = job_queue().submit(req.kind, req.params)
+        return {"job_id": job_id, "status": "queued"}
     except Exception as e:
         return {"error": str(e)}
 
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    return {"jobs": job_queue().list(status=status, limit=limit)}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue().get(job_id)
+    return job if job else {"error": f"Job {job_id} not found"}
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    return {"job_id": job_id, "cancelled": job_queue().cancel(job_id)}
+
+# ----------------------- Probes -----------------------
+@app.get("/health/live")
+async def health_live():
+    """Liveness: this worker's event loop answers (no dependencies checked)."""
+    return {"status": "alive", "pid": os.getpid(), "uptime_seconds": round(time.time() - STARTED_AT, 1)}
+
+
+@app.get("/health/ready")
+async def health_ready(deep: bool = False):
+    """Readiness: warm-up finished (crew and models loaded); ``deep`` also requires a database round trip."""
+    warmup = startup_report()["warmup"]
+    reasons = [] if warmup.get("status") in ("done", "off") else [f"warm-up {warmup.get('status')}"]
+    if deep:
+        try:
+            await asyncio.wait_for(get_async_db().fetchall("SELECT 1"), READY_DB_TIMEOUT)
+        except Exception as e:
+            reasons.append(f"database: {type(e).__name__}: {e}")
+    return JSONResponse({"ready": not reasons, "pid": os.getpid(), "reasons": reasons, "warmup": warmup},
+                        status_code=200 if not reasons else 503)
+
 # ----------------------- Service Status -----------------------
 @app.get("/status")
 async def status():
-    return {"service": "running", "model_last_trained": None}
+    models = {}
+    for name, path in MODEL_FILES.items():
+        on_disk = os.path.exists(path)
+        models[name] = {
+            "path": path,
+            "trained_at": datetime.datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat() + "Z"
+            if on_disk else None,
+            **MODEL_INFO.get(path, {"version": None, "loaded_at": None, "load_seconds": None}),
+        }
+    trained = [m["trained_at"] for m in models.values() if m["trained_at"]]
+    return {
+        "service": "running",
+        "uptime_seconds": round(time.time() - STARTED_AT, 1),
+        "model_last_trained": max(trained) if trained else None,
+        "models": models,
+        "quotes": get_quote_hub().stats(),
+        "startup": {"import_seconds": round(IMPORT_SECONDS, 4), "ready_seconds": READY["seconds"],
+                    **startup_report()},
+        **REGISTRY.snapshot(),
+    }
+
+# ----------------------- Prometheus metrics -----------------------
+@app.get("/metrics")
+async def metrics():
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_MEDIA_TYPE)
 
 # ----------------------- Run API -----------------------
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
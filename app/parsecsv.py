@@ -1,27 +1,27 @@
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
 import pandas as pd
+from utils.timeseries import TimeSeries
 
 # Load the CSV file
 df = pd.read_csv('historical_data.csv')
 
-# Convert 'Date' column to datetime format
-df['Date'] = pd.to_datetime(df['Date'])
+# Build the sorted date index from 'Date' and 'Close'
+series = TimeSeries.from_frame(df, "Date", "Close", name="Price")
 
-# Filter data for the desired date range
+# Filter data for the desired date range (binary search, no full-column compare)
 start_date = '2025-10-23'
 end_date = '2025-10-25'
-df_filtered = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
-
-# Extract 'Date' and 'Close' columns
-df_filtered = df_filtered[['Date', 'Close']]
-
-# Convert to list format
-dates = df_filtered['Date'].dt.strftime('%Y-%m-%d').tolist()
-prices = df_filtered['Close'].tolist()
+series_filtered = series.between(start_date, end_date)
 
 # Prepare the final output
 output = {
-    "axis": [{"x": dates, "y": prices, "name": "Price"}],
+    "axis": [series_filtered.to_axis()],
     "source_url": "https://www.amarstock.com/csv-data-download"
 }
 
-print(output)
\ No newline at end of file
+print(output)
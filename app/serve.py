@@ -0,0 +1,214 @@
+"""
+Production launcher for the prediction API.
+
+One master process imports ``app.main``, loads the crew and the quantile
+models and maps the price panel, then forks SERVE_WORKERS uvicorn workers
+(gunicorn prefork with ``preload_app``). Workers inherit everything the
+master loaded copy-on-write, so N workers cost about one copy of the model
+memory instead of N. Nothing that holds sockets, SQLite handles or native
+thread pools is created before the fork: the database engine and the
+research index (chromadb + embedder) are opened lazily in each worker,
+whose startup warm-up opens the index before it reports ready.
+
+    python app/serve.py                          # SERVE_WORKERS (default: CPU count) on SERVE_HOST:SERVE_PORT
+    python app/serve.py --workers 4 --port 8000
+
+Each worker is recycled after SERVE_MAX_REQUESTS (+ random jitter, so they
+do not all restart together): the master forks a replacement from the warm
+image while the old worker finishes its in-flight requests within
+SERVE_GRACEFUL_TIMEOUT. ``kill -HUP <master>`` reloads the models in the
+master (e.g. after a retrain) and rolls every worker onto them.
+
+Background jobs do not run in the API workers (a recycled worker would kill
+its in-flight download or retrain): with SERVE_JOB_RUNNER=process the
+master starts one ``services/job_handlers.py`` runner process, revives it
+whenever it forks a worker, and stops it on shutdown.
+
+Probes: GET /health/live (the worker's event loop answers) and
+GET /health/ready (warm-up done; ``?deep=true`` also checks the database).
+Per-worker request limits are SERVE_MAX_INFLIGHT / SERVE_MAX_PREDICT
+(see app.main). Without fork (Windows) it serves one uvicorn process.
+"""
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# One BLAS thread per worker: N workers x N BLAS threads would oversubscribe the cores
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, os.getenv("SERVE_BLAS_THREADS", "1"))
+# API workers only submit jobs; one job-runner process executes them (SERVE_JOB_RUNNER)
+os.environ.setdefault("API_JOB_WORKERS", "false")
+# Workers warm up synchronously on startup: their own research index, plus model cache hits unless a retrain landed
+os.environ.setdefault("WARMUP_MODE", "blocking")
+
+import argparse
+import gc
+import importlib.util
+import logging
+import subprocess
+import time
+from typing import Any, Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "0")) or os.cpu_count() or 1
+SERVE_MAX_REQUESTS = int(os.getenv("SERVE_MAX_REQUESTS", "10000"))           # 0 = never recycle
+SERVE_MAX_REQUESTS_JITTER = int(os.getenv("SERVE_MAX_REQUESTS_JITTER", "1000"))
+SERVE_GRACEFUL_TIMEOUT = int(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30"))      # seconds to finish in-flight requests
+SERVE_TIMEOUT = int(os.getenv("SERVE_TIMEOUT", "120"))                       # silent worker is killed and replaced
+SERVE_BACKLOG = int(os.getenv("SERVE_BACKLOG", "2048"))
+# "process": this launcher runs services/job_handlers.py as its one job runner;
+# "off": the runner is deployed as its own service (the EOD scheduler and Streamlit only enqueue)
+SERVE_JOB_RUNNER = os.getenv("SERVE_JOB_RUNNER", "process").lower()
+JOB_RUNNER_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "services", "job_handlers.py"))
+
+_job_runner: Optional[subprocess.Popen] = None
+
+
+def preload():
+    """Import the app and load everything workers should share (runs in the master, before fork)."""
+    from agents.registry import startup_report, warm_up
+    from services.price_panel import get_price_panel
+
+    started = time.perf_counter()
+    import app.main as api
+
+    # Crew + pickled models only; the research index is opened per worker (see _post_fork)
+    warm_up("blocking", research=False)
+    report = startup_report()
+    if report["warmup"].get("status") == "failed":
+        logger.error(f"❌ Preload failed: {report['warmup'].get('error')}; workers will report not ready")
+    try:
+        get_price_panel()
+    except Exception as e:
+        logger.warning(f"⚠️ Price panel not mapped: {e}")
+
+    # Objects loaded so far never move to a younger GC generation, so collections in
+    # the workers do not write to (and un-share) the pages that hold them
+    gc.collect()
+    gc.freeze()
+    logger.info(f"✅ Preloaded app in {time.perf_counter() - started:.1f}s "
+                f"({len(report['imports'])} modules/models, {gc.get_freeze_count()} objects frozen)")
+    return api.app
+
+
+def ensure_job_runner():
+    """Start the job-runner process, or restart it if it exited (called from the master only)."""
+    global _job_runner
+    if SERVE_JOB_RUNNER != "process" or (_job_runner is not None and _job_runner.poll() is None):
+        return
+    if _job_runner is not None:
+        logger.warning(f"⚠️ Job runner exited with {_job_runner.returncode}; restarting")
+    # fork + exec of a fresh interpreter, so it shares nothing with the preloaded master
+    _job_runner = subprocess.Popen([sys.executable, JOB_RUNNER_SCRIPT])
+    logger.info(f"🧰 Job runner started (pid {_job_runner.pid})")
+
+
+def stop_job_runner(timeout: float = SERVE_GRACEFUL_TIMEOUT):
+    if _job_runner is None or _job_runner.poll() is not None:
+        return
+    _job_runner.terminate()    # SIGTERM: stop claiming, let running jobs drain
+    try:
+        _job_runner.wait(timeout)
+    except subprocess.TimeoutExpired:
+        _job_runner.kill()
+
+
+def _worker_class():
+    try:
+        from uvicorn_worker import UvicornWorker
+    except ImportError:
+        from uvicorn.workers import UvicornWorker
+    return UvicornWorker
+
+
+def run_prefork(application, options: Dict[str, Any]):
+    from gunicorn.app.base import BaseApplication
+
+    class PreforkServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return application
+
+    PreforkServer().run()
+
+
+def _on_reload(server):
+    # SIGHUP: refresh the master's copy (load_model re-reads changed files) before new workers fork
+    server.log.info("🔁 Reloading models before rolling workers")
+    preload()
+
+
+def _pre_fork(server, worker):
+    # Runs in the master whenever a worker is (re)spawned: a convenient point to revive the job runner
+    ensure_job_runner()
+
+
+def _on_exit(server):
+    stop_job_runner()
+
+
+def _post_fork(server, worker):
+    # Drop anything fork-unsafe the master may have opened anyway (e.g. a DB engine during a
+    # reload); each worker then creates its own on first use
+    import app.main as api
+
+    if api._db_manager is not None:
+        api._db_manager.engine.dispose(close=False)
+        api._db_manager = None
+        api._async_db = None
+    from services import research_index
+
+    research_index._index = None
+
+
+def _when_ready(server):
+    server.log.info(f"🚀 Master {os.getpid()} ready, forking {server.num_workers} workers")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prefork production server for app.main:app")
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    args = parser.parse_args()
+
+    application = preload()
+    ensure_job_runner()
+    if importlib.util.find_spec("gunicorn") is None:    # POSIX only
+        import uvicorn
+
+        logger.warning("⚠️ gunicorn is not available (it needs fork); serving a single uvicorn process")
+        try:
+            uvicorn.run(application, host=args.host, port=args.port, backlog=SERVE_BACKLOG,
+                        limit_max_requests=SERVE_MAX_REQUESTS or None,
+                        timeout_graceful_shutdown=SERVE_GRACEFUL_TIMEOUT)
+        finally:
+            stop_job_runner()
+        sys.exit(0)
+
+    run_prefork(application, {
+        "bind": f"{args.host}:{args.port}",
+        "workers": max(1, args.workers),
+        "worker_class": _worker_class(),
+        "preload_app": True,
+        "max_requests": SERVE_MAX_REQUESTS,
+        "max_requests_jitter": SERVE_MAX_REQUESTS_JITTER if SERVE_MAX_REQUESTS else 0,
+        "graceful_timeout": SERVE_GRACEFUL_TIMEOUT,
+        "timeout": SERVE_TIMEOUT,
+        "backlog": SERVE_BACKLOG,
+        "keepalive": 5,
+        "on_reload": _on_reload,
+        "pre_fork": _pre_fork,
+        "post_fork": _post_fork,
+        "on_exit": _on_exit,
+        "when_ready": _when_ready,
+    })
@@ -5,20 +5,119 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 
+import functools
 import pandas as pd
 import streamlit as st
-from stocksurferbd import PriceData
+from contextlib import contextmanager
 from utils.config import build_connection_string
 from utils.database_manager import DatabaseManager
 from services.sharemarket_service import ShareMarketService
-from sqlalchemy import text
+from services.market_analytics import BETA_WINDOW, MarketAnalyticsService
+from services.alerts import RULE_KINDS, get_alert_engine
+from services.job_handlers import get_job_queue
+from utils.downsample import downsample_frame
 import datetime
+import time
 
 # -------------------------------
 # Streamlit UI
 # -------------------------------
 st.set_page_config(page_title="Stock History Bot", layout="wide")
 
+# Inputs live in forms (one rerun per submit) and results in fragments (a widget
+# inside one reruns only that section). Frames and analyses are cached per
+# (code, window, data_version), so reruns after a fetch do not touch the database.
+CACHE_TTL = 600          # seconds a cached frame / analysis is kept
+VERSION_TTL = 30         # seconds between dbo.symbols change checks (new loads show up within this)
+PERF_KEEP = 20           # reruns listed in the performance panel
+
+
+# -------------------------------
+# Per-rerun performance accounting
+# -------------------------------
+def _perf_record():
+    stack = st.session_state.get("perf_stack")
+    return stack[-1] if stack else None
+
+
+def perf_push(scope):
+    st.session_state.setdefault("perf_stack", []).append({
+        "scope": scope, "query": 0.0, "rows": 0, "misses": 0, "compute": 0.0, "render": 0.0,
+        "started": time.perf_counter(),
+    })
+
+
+def perf_pop():
+    """Close the innermost record; returns (record, standalone). A fragment run inside a full run is folded into it."""
+    stack = st.session_state.perf_stack
+    record = stack.pop()
+    record["total"] = time.perf_counter() - record.pop("started")
+    if stack:
+        for key in ("query", "rows", "misses", "compute", "render"):
+            stack[-1][key] += record[key]
+        return record, False
+    st.session_state.perf_log = ([record] + st.session_state.get("perf_log", []))[:PERF_KEEP]
+    return record, True
+
+
+@contextmanager
+def perf(stage):
+    """Charge the block's wall time to ``stage`` ("compute" / "render") of the current rerun."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = _perf_record()
+        if record is not None:
+            record[stage] += time.perf_counter() - started
+
+
+def fetch(call, *args, **kwargs):
+    """Run a database read (only reached on a cache miss) and charge its time and rows to the current rerun."""
+    started = time.perf_counter()
+    result = call(*args, **kwargs)
+    record = _perf_record()
+    if record is not None:
+        frame = result[-1] if isinstance(result, tuple) else result
+        record["query"] += time.perf_counter() - started
+        record["rows"] += len(frame) if frame is not None else 0
+        record["misses"] += 1
+    return result
+
+
+def perf_line(record):
+    return (f"⏱️ {record['scope']}: query {record['query'] * 1000:.0f} ms ({record['rows']} rows, "
+            f"{record['misses']} cache misses) · compute {record['compute'] * 1000:.0f} ms · "
+            f"render {record['render'] * 1000:.0f} ms · total {record['total'] * 1000:.0f} ms")
+
+
+def fragment(scope, run_every=None):
+    """``st.fragment`` whose own reruns are timed and, with the panel on, reported under the section."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            perf_push(scope)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record, standalone = perf_pop()
+                if standalone and st.session_state.get("show_perf"):
+                    st.caption(perf_line(record))
+        return st.fragment(run, run_every=run_every)
+    return wrap
+
+
+def render_perf_panel(container):
+    log = st.session_state.get("perf_log", [])
+    container.subheader("⏱️ Rerun Timings")
+    container.caption("Latest first. Fragment reruns re-execute only their section; cache hits cost no query time.")
+    if log:
+        container.dataframe(pd.DataFrame([{
+            "rerun": r["scope"], "query ms": round(r["query"] * 1000, 1), "rows": r["rows"],
+            "misses": r["misses"], "compute ms": round(r["compute"] * 1000, 1),
+            "render ms": round(r["render"] * 1000, 1), "total ms": round(r["total"] * 1000, 1),
+        } for r in log]), hide_index=True)
+
 
 # -------------------------------
 # Sidebar: Chatbot History + Menu
@@ -28,8 +127,11 @@ st.sidebar.title("💬 Chat History")
 # Sidebar menu
 menu = st.sidebar.radio(
     "Select Action",
-    ["🔍 View Trading Codes", "⬇️ Download & Save Data", "📈 Get History by Code", "📈 Get Data Analysis by Code","🗑️ Clear Chat History"]
+    ["🔍 View Trading Codes", "⬇️ Download & Save Data", "📈 Get History by Code", "📈 Get Data Analysis by Code",
+     "🧮 Market Beta & Correlation", "🔔 Price Alerts", "🗑️ Clear Chat History"]
 )
+st.sidebar.toggle("⏱️ Performance panel", key="show_perf")
+perf_panel = st.sidebar.container()
 
 # Initialize session state
 if "chat_history" not in st.session_state:
@@ -40,370 +142,518 @@ for i, msg in enumerate(st.session_state.chat_history):
     with st.sidebar.expander(f"Session {i + 1}", expanded=False):
         st.write(msg)
 
-# Database setup
-connection_string = build_connection_string()
-db_manager = DatabaseManager(connection_string)
-share_service = ShareMarketService(db_manager)
+# Background job table; the jobs themselves run in the job-runner process (python services/job_handlers.py)
+@st.cache_resource
+def job_queue():
+    return get_job_queue(start=False)
 
-# -------------------------------
-# Menu Option 1: View All Trading Codes
-# -------------------------------
-if menu == "🔍 View Trading Codes":
-    st.title("🔍 View Trading Codes")
-    try:
-        codes = share_service.get_trading_list()  # Call service method
-        if codes:
-            st.success(f"✅ Found {len(codes)} trading codes.")
-            st.dataframe(pd.DataFrame(codes, columns=["Trading Codes"]))
-            st.session_state.chat_history.append(f"Fetched {len(codes)} trading codes from database.")
-        else:
-            st.warning("⚠️ No trading codes found in the database.")
-            st.session_state.chat_history.append("⚠️ No trading codes found in the database.")
-    except Exception as e:
-        st.error(f"❌ Error fetching trading list: {e}")
-        st.session_state.chat_history.append(f"❌ Error fetching trading list: {e}")
+# Columns shown on the history/analysis pages (order matches the DataFrame headers below)
+HISTORY_COLUMNS = ["date", "ltp", "high", "low", "openp", "closep", "trade", "value_mn", "volume"]
+HISTORY_LABELS = {
+    "date": "Date", "ltp": "LTP", "high": "High", "low": "Low", "openp": "Open",
+    "closep": "Close", "trade": "Trade", "value_mn": "Value (Mn)", "volume": "Volume",
+}
+HISTORY_MAX_RECORDS = 500   # "recent records" fetched once per code; the number input only slices it
+
+# Point budget per line chart; long histories are reduced with LTTB (peaks/troughs kept)
+CHART_MAX_POINTS = 1500
 
+def line_chart(df, column="LTP"):
+    st.line_chart(downsample_frame(df, column, CHART_MAX_POINTS).set_index("Date")[column])
 
 # -------------------------------
-# Menu Option 2: Download & Save New Data
+# Database setup (one engine per Streamlit server, shared by every session and rerun)
 # -------------------------------
-elif menu == "⬇️ Download & Save Data":
-    st.title("⬇️ Download & Save Stock Data")
-    # Input: Stock symbol
-    symbol = st.text_input("Enter Stock Symbol (e.g., ACI):").strip().upper()
-    market = "DSE"  # default market
-
-    # Ensure 'db' folder exists
-    db_folder = "db"
-    os.makedirs(db_folder, exist_ok=True)
-    file_name = f"{symbol}_history.xlsx"
-    file_path = os.path.join(db_folder, file_name)
-
-    if st.button("Download & Save Data"):
-        if not symbol:
-            st.warning("⚠️ Please enter a stock symbol!")
-        else:
-            # Step 1: Download
-            st.info(f"🔄 Downloading historical data for {symbol} from {market}...")
-            loader = PriceData()
-            try:
-                loader.save_history_data(symbol=symbol, file_name=file_path, market=market)
-                st.success(f"✅ Data saved successfully to '{file_path}'")
-            except Exception as e:
-                st.error(f"❌ Error downloading data: {e}")
-                st.stop()
+@st.cache_resource
+def db_manager():
+    return DatabaseManager(build_connection_string())
 
-            # Step 2: Load and preview
-            try:
-                df = pd.read_excel(file_path)
-                df.columns = df.columns.str.strip().str.lower()
+@st.cache_resource
+def share_service():
+    return ShareMarketService(db_manager())
 
-                st.subheader("📊 Preview of downloaded data:")
-                st.dataframe(df.head())
+@st.cache_resource
+def analytics_service():
+    return MarketAnalyticsService(db_manager())
 
-                st.subheader("🧾 Columns and Data Types:")
-                st.write(df.dtypes)
-            except Exception as e:
-                st.error(f"❌ Error reading Excel file: {e}")
-                st.stop()
-
-            # Step 3: Save to SQL Server
-            try:
-                connection_string = build_connection_string()
-                db_manager = DatabaseManager(connection_string)
-                session = db_manager.get_session()
-
-                # 🔹 Insert data row by row
-                for _, row in df.iterrows():
-                    insert_sql = text("""
-                    INSERT INTO dbo.market_history (unnamed,date,trading_code, ltp, high, low, openp, closep, ycp, trade, value_mn, volume)
-                    VALUES (:unnamed,:date, :trading_code, :ltp, :high, :low, :openp, :closep, :ycp, :trade, :value_mn, :volume)
-                    """)
-                    session.execute(insert_sql, {
-                        "unnamed": symbol,
-                        "date": row.get("date"),
-                        "trading_code": row.get("trading_code"),
-                        "ltp": row.get("ltp"),
-                        "high": row.get("high"),
-                        "low": row.get("low"),
-                        "openp": row.get("openp"),
-                        "closep": row.get("closep"),
-                        "ycp": row.get("ycp"),
-                        "trade": row.get("trade"),
-                        "value_mn": row.get("value_mn"),
-                        "volume": row.get("volume")
-                    })
-                session.commit()
-                st.success("✅ Data successfully saved to 'market_history' table in SQL Server")
-            except Exception as e:
-                st.error(f"❌ Error saving data to DB: {e}")
-            finally:
-                session.close()
-                db_manager.close()
 
 # -------------------------------
-# Menu Option 3: Get History by Code
+# Cached reads and analyses (keyed by data_version, so a new load invalidates them)
 # -------------------------------
-elif menu == "📈 Get History by Code":
-    st.title("📈 Get History by Trading Code")
-
+@st.cache_data(ttl=VERSION_TTL, show_spinner=False)
+def data_version():
+    return share_service().data_version()
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def trading_codes(version):
+    return fetch(share_service().get_trading_list)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=64, show_spinner=False)
+def history_frame(code, direction, limit, version):
+    # Typed fetch: datetime64 dates and float64 prices, no Decimal conversion pass
+    return fetch(share_service().get_history_frame, code, HISTORY_COLUMNS,
+                 direction=direction, limit=limit).rename(columns=HISTORY_LABELS)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=64, show_spinner=False)
+def ohlcv_frame(code, version):
+    # Full history from the weekly/monthly rollups when daily rows exceed the chart budget
+    resolution, full = fetch(share_service().get_ohlcv, code, max_points=CHART_MAX_POINTS)
+    return resolution, full.rename(columns=HISTORY_LABELS)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=64, show_spinner=False)
+def close_range(code, version):
+    """Lowest / highest close of the last 250 sessions (suggested alert levels)."""
+    closes = fetch(share_service().get_history_frame, code, ["date", "closep"],
+                   direction="desc", limit=250)["closep"].dropna()
+    return (float(closes.min()), float(closes.max())) if len(closes) else (0.0, 0.0)
+
+
+def zones(df):
+    """Two lowest (buy) and two highest (sell) closes with average close, volatility and expected profit."""
+    buys, sells = df.nsmallest(2, "Close"), df.nlargest(2, "Close")
+    avg_buy = (buys.iloc[0]["Close"] + buys.iloc[1]["Close"]) / 2
+    avg_sell = (sells.iloc[0]["Close"] + sells.iloc[1]["Close"]) / 2
+    return {"buys": buys, "sells": sells, "avg_price": df["Close"].mean(), "volatility": df["Close"].std(),
+            "profit_pct": (avg_sell - avg_buy) / avg_buy * 100}
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=32, show_spinner=False)
+def analysis(code, version):
+    """Full history plus the full-range and 1-year buy/sell summaries of one code."""
+    df = history_frame(code, "asc", None, version)
+    if df.empty:
+        return None
+    with perf("compute"):
+        # 🔹 Filter last 1 year (365 days)
+        cutoff_date = datetime.datetime.now() - datetime.timedelta(days=365)
+        df_recent = df[df["Date"] >= cutoff_date]
+        return {"df": df, "latest": df.loc[df["Date"] == df["Date"].max()].iloc[0], "full": zones(df),
+                "recent": df_recent, "year": zones(df_recent) if len(df_recent) >= 4 else None}
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=32, show_spinner=False)
+def beta_history(code, window, version):
+    with perf("compute"):
+        beta = analytics_service().beta_history(code, window)
+        return analytics_service().panel().market_source, beta
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def market_betas(version):
+    with perf("compute"):
+        return analytics_service().betas().set_index("trading_code")
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=64, show_spinner=False)
+def peers(code, n, version):
+    with perf("compute"):
+        return analytics_service().peers(code, n)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=16, show_spinner=False)
+def clusters(k, version):
+    with perf("compute"):
+        return analytics_service().clusters(k)
+
+
+def code_list():
     try:
-        session = db_manager.get_session()
-        result = session.execute(text("SELECT DISTINCT trading_code FROM market_history ORDER BY trading_code")).fetchall()
-        trading_codes = [r[0] for r in result]
-        session.close()
+        return trading_codes(data_version()) or []
     except Exception as e:
         st.error(f"❌ Could not load trading codes: {e}")
-        trading_codes = []
+        return []
 
-    if trading_codes:
-        selected_code = st.selectbox("Select a Trading Code:", trading_codes)
-        limit = st.number_input("Number of recent records to view:", min_value=1, max_value=500, value=10)
-
-        if st.button("Fetch History"):
-            try:
-                session = db_manager.get_session()
-                query = text("""
-                    SELECT TOP (:limit) date, ltp, high, low, openp, closep,trade, value_mn, volume
-                    FROM market_history
-                    WHERE trading_code = :code
-                    ORDER BY date DESC
-                """)
-                rows = session.execute(query, {"limit": limit, "code": selected_code}).fetchall()
-                session.close()
-
-                if rows:
-                    df = pd.DataFrame(rows, columns=["Date", "LTP", "High", "Low", "Open", "Close","Trade", "Value (Mn)", "Volume"])
-                    st.subheader(f"📊 Last {limit} Records for {selected_code}")
-                    st.dataframe(df)
-                    st.line_chart(df.set_index("Date")["LTP"])
-                    st.session_state.chat_history.append(f"Fetched {len(df)} records for {selected_code}.")
-                else:
-                    st.warning(f"No records found for {selected_code}.")
-            except Exception as e:
-                st.error(f"❌ Error fetching history: {e}")
 
 # -------------------------------
-# Menu Option 4: Get History by Code
+# Result sections (fragments: their own widgets rerun only them)
 # -------------------------------
-elif menu == "📈 Get Data Analysis by Code":
-    st.title("📈 Get Data Analysis by Trading Code")
+@fragment("download progress", run_every=1.0)
+def job_progress(job_id, market):
+    job = job_queue().get(job_id)
+    if job is None or job["status"] not in ("queued", "running"):
+        st.rerun()   # finished: redraw the page with the outcome (and stop polling)
+    if st.button("Cancel Job"):
+        job_queue().cancel(job_id)
+    st.info(f"🔄 Downloading historical data for {job['params'].get('symbol')} from {market}...")
+    total = job["rows_total"] or 0
+    st.progress(min(job["rows_done"] / total, 1.0) if total else 0.0)
+    st.caption(
+        f"{job['status']} · {job['message'] or ''} · {job['rows_done']} rows · "
+        f"{job['rows_per_sec'] or 0:.0f} rows/s"
+    )
+
+
+@fragment("history")
+def history_view(selected_code):
+    limit = st.number_input("Number of recent records to view:", min_value=1,
+                            max_value=HISTORY_MAX_RECORDS, value=10, key="history_limit")
     try:
-        session = db_manager.get_session()
-        result = session.execute(text("SELECT DISTINCT trading_code FROM market_history ORDER BY trading_code")).fetchall()
-        trading_codes = [r[0] for r in result]
-        session.close()
+        version = data_version()
+        df = history_frame(selected_code, "desc", HISTORY_MAX_RECORDS, version).head(int(limit))
+        if df.empty:
+            st.warning(f"No records found for {selected_code}.")
+            return
+        resolution, full = ohlcv_frame(selected_code, version)
     except Exception as e:
-        st.error(f"❌ Could not load trading codes: {e}")
-        trading_codes = []
-
-    if trading_codes:
-        selected_code = st.selectbox("Select a Trading Code:", trading_codes)
-        limit = st.number_input("Number of recent records to view:", min_value=1, max_value=500, value=10)
-
-        if st.button("Fetch History"):
-            try:
-                session = db_manager.get_session()
-                query = text("""
-                    SELECT date, ltp, high, low, openp, closep, trade, value_mn, volume
-                    FROM market_history
-                    WHERE trading_code = :code
-                    ORDER BY date ASC
-                """)
-                rows = session.execute(query, {"code": selected_code}).fetchall()
-                session.close()
-
-                if rows:
-                    df = pd.DataFrame(rows, columns=[
-                    "Date", "LTP", "High", "Low", "Open", "Close", "Trade", "Value (Mn)", "Volume"
-                    ])
-                    df["Date"] = pd.to_datetime(df["Date"])
-
-                    # 🔹 Convert Decimal to float
-                    for col in ["LTP", "High", "Low", "Open", "Close", "Trade", "Value (Mn)", "Volume"]:
-                        df[col] = df[col].astype(float)
-
-                    st.subheader(f"📊 Full Historical Data for {selected_code}")
-                    st.dataframe(df.tail(limit))  # show last N rows
-                    st.line_chart(df.set_index("Date")["LTP"])
-
-                    # ---------------------------
-                    # 📅 Latest Market Data
-                    # ---------------------------
-                    st.subheader("📅 Latest Available Market Data")
-
-                    latest_date = df["Date"].max()
-                    latest_row = df.loc[df["Date"] == latest_date].iloc[0]
-
-                    st.markdown(f"### 🗓️ **Date:** {latest_date.date()}")
-                    st.write("Here’s the most recent market data for this trading code:")
-
-                    latest_data = {
-                        "LTP": latest_row["LTP"],
-                        "Open": latest_row["Open"],
-                        "Close": latest_row["Close"],
-                        "High": latest_row["High"],
-                        "Low": latest_row["Low"],
-                        "Trade": latest_row["Trade"],
-                        "Value (Mn)": latest_row["Value (Mn)"],
-                        "Volume": latest_row["Volume"]
-                    }
-
-                    st.dataframe(pd.DataFrame([latest_data]).T.rename(columns={0: "Value"}))
-
-                    st.info(
-                        f"**Latest Data ({latest_date.date()})** — "
-                        f"LTP: {latest_row['LTP']:.2f}, Open: {latest_row['Open']:.2f}, "
-                        f"Close: {latest_row['Close']:.2f}, High: {latest_row['High']:.2f}, "
-                        f"Low: {latest_row['Low']:.2f}, Trade: {latest_row['Trade']:.0f}, "
-                        f"Value(Mn): {latest_row['Value (Mn)']:.2f}, Volume: {latest_row['Volume']:.0f}"
-                    )
-
-
-                    # ---------------------------
-                    # 📈 Enhanced Analysis Section
-                    # ---------------------------
-                    st.subheader("📈 Market Analysis Summary")
-
-                    # Sort to find two lowest and two highest closes
-                    buy_candidates = df.nsmallest(2, "Close")
-                    sell_candidates = df.nlargest(2, "Close")
-
-                    buy1_price, buy1_date = buy_candidates.iloc[0]["Close"], buy_candidates.iloc[0]["Date"]
-                    buy2_price, buy2_date = buy_candidates.iloc[1]["Close"], buy_candidates.iloc[1]["Date"]
-
-                    sell1_price, sell1_date = sell_candidates.iloc[0]["Close"], sell_candidates.iloc[0]["Date"]
-                    sell2_price, sell2_date = sell_candidates.iloc[1]["Close"], sell_candidates.iloc[1]["Date"]
-
-                    avg_price = df["Close"].mean()
-                    volatility = df["Close"].std()
-
-                    # 🟢 Display Buy Zones
-                    st.markdown("### 🟢 Recommended Buy Zones")
-                    col1, col2 = st.columns(2)
-                    col1.metric("Buy Limit 1", f"{buy1_price:.2f}", f"on {buy1_date.date()}")
-                    col2.metric("Buy Limit 2", f"{buy2_price:.2f}", f"on {buy2_date.date()}")
-
-                    # 🔴 Display Sell Zones
-                    st.markdown("### 🔴 Recommended Sell Targets")
-                    col3, col4 = st.columns(2)
-                    col3.metric("Sell Limit 1", f"{sell1_price:.2f}", f"on {sell1_date.date()}")
-                    col4.metric("Sell Limit 2", f"{sell2_price:.2f}", f"on {sell2_date.date()}")
-
-                    # 🧮 Compute potential profit ranges
-                    avg_buy = (buy1_price + buy2_price) / 2
-                    avg_sell = (sell1_price + sell2_price) / 2
-                    profit = avg_sell - avg_buy
-                    profit_pct = (profit / avg_buy) * 100
-
-                    st.markdown("### 💹 Performance Summary")
-                    st.metric("Expected Average Profit %", f"{profit_pct:.2f}%")
-                    st.info(f"Average Close: {avg_price:.2f} | Volatility: {volatility:.2f}")
-
-                    # Save to chat history
-                    summary_msg = (
-                        f"{selected_code} → Buy at {buy1_price:.2f}/{buy2_price:.2f}, "
-                        f"Sell at {sell1_price:.2f}/{sell2_price:.2f}, "
-                        f"Profit ≈ {profit_pct:.2f}%"
-                    )
-                    st.session_state.chat_history.append(summary_msg)
-
-
-                    # 🔹 Filter last 1 year (365 days)
-                    cutoff_date = datetime.datetime.now() - datetime.timedelta(days=365)
-                    df_recent = df[df["Date"] >= cutoff_date]
-
-                    st.subheader(f"📊 Last 1 Year Data for {selected_code}")
-                    st.dataframe(df_recent.tail(limit))
-                    st.line_chart(df_recent.set_index("Date")["LTP"])
-
-                    # ---------------------------
-                    # 📈 Analysis on Last 1 Year
-                    # ---------------------------
-                    st.subheader("📈 1-Year Market Analysis Summary")
-
-                    if len(df_recent) >= 4:
-                        # 🔹 Two lowest and two highest close prices in last year
-                        buy_candidates = df_recent.nsmallest(2, "Close")
-                        sell_candidates = df_recent.nlargest(2, "Close")
-
-                        # 🟢 Buy limits
-                        buy1 = buy_candidates.iloc[0]
-                        buy2 = buy_candidates.iloc[1]
-                        # 🔴 Sell limits
-                        sell1 = sell_candidates.iloc[0]
-                        sell2 = sell_candidates.iloc[1]
-
-                        avg_price = df_recent["Close"].mean()
-                        volatility = df_recent["Close"].std()
-
-                        # 🟢 Buy Zones
-                        st.markdown("### 🟢 Recommended Buy Zones (1-Year Range)")
-                        col1, col2 = st.columns(2)
-                        col1.metric(
-                            "Buy Limit 1",
-                            f"{buy1['Close']:.2f}",
-                            f"{buy1['Date'].strftime('%b %d, %Y')}"
-                        )
-                        col2.metric(
-                            "Buy Limit 2",
-                            f"{buy2['Close']:.2f}",
-                            f"{buy2['Date'].strftime('%b %d, %Y')}"
-                        )
-
-                        # 🔴 Sell Zones
-                        st.markdown("### 🔴 Recommended Sell Targets (1-Year Range)")
-                        col3, col4 = st.columns(2)
-                        col3.metric(
-                            "Sell Limit 1",
-                            f"{sell1['Close']:.2f}",
-                            f"{sell1['Date'].strftime('%b %d, %Y')}"
-                        )
-                        col4.metric(
-                            "Sell Limit 2",
-                            f"{sell2['Close']:.2f}",
-                            f"{sell2['Date'].strftime('%b %d, %Y')}"
+        st.error(f"❌ Error fetching history: {e}")
+        return
+
+    with perf("render"):
+        st.subheader(f"📊 Last {limit} Records for {selected_code}")
+        st.dataframe(df)
+        line_chart(df)
+        if not full.empty:
+            st.subheader(f"📈 Full History ({resolution})")
+            line_chart(full)
+
+
+def render_zones(summary, title_suffix, date_label):
+    buy1, buy2 = summary["buys"].iloc[0], summary["buys"].iloc[1]
+    sell1, sell2 = summary["sells"].iloc[0], summary["sells"].iloc[1]
+
+    # 🟢 Display Buy Zones
+    st.markdown(f"### 🟢 Recommended Buy Zones{title_suffix}")
+    col1, col2 = st.columns(2)
+    col1.metric("Buy Limit 1", f"{buy1['Close']:.2f}", date_label(buy1["Date"]))
+    col2.metric("Buy Limit 2", f"{buy2['Close']:.2f}", date_label(buy2["Date"]))
+
+    # 🔴 Display Sell Zones
+    st.markdown(f"### 🔴 Recommended Sell Targets{title_suffix}")
+    col3, col4 = st.columns(2)
+    col3.metric("Sell Limit 1", f"{sell1['Close']:.2f}", date_label(sell1["Date"]))
+    col4.metric("Sell Limit 2", f"{sell2['Close']:.2f}", date_label(sell2["Date"]))
+
+    st.markdown(f"### 💹 Performance Summary{title_suffix}")
+    st.metric("Expected Average Profit %", f"{summary['profit_pct']:.2f}%")
+    st.info(f"Average Close: {summary['avg_price']:.2f} | Volatility: {summary['volatility']:.2f}")
+
+
+@fragment("analysis")
+def analysis_view(selected_code):
+    limit = int(st.number_input("Number of recent records to view:", min_value=1, max_value=500, value=10,
+                                key="analysis_limit"))
+    try:
+        result = analysis(selected_code, data_version())
+    except Exception as e:
+        st.error(f"❌ Error fetching history: {e}")
+        return
+    if result is None:
+        st.warning(f"No records found for {selected_code}.")
+        return
+
+    with perf("render"):
+        df, latest_row = result["df"], result["latest"]
+        st.subheader(f"📊 Full Historical Data for {selected_code}")
+        st.dataframe(df.tail(limit))  # show last N rows
+        line_chart(df)
+
+        # ---------------------------
+        # 📅 Latest Market Data
+        # ---------------------------
+        st.subheader("📅 Latest Available Market Data")
+        latest_date = latest_row["Date"]
+        st.markdown(f"### 🗓️ **Date:** {latest_date.date()}")
+        st.write("Here’s the most recent market data for this trading code:")
+
+        latest_data = {label: latest_row[label] for label in
+                       ["LTP", "Open", "Close", "High", "Low", "Trade", "Value (Mn)", "Volume"]}
+        st.dataframe(pd.DataFrame([latest_data]).T.rename(columns={0: "Value"}))
+
+        st.info(
+            f"**Latest Data ({latest_date.date()})** — "
+            f"LTP: {latest_row['LTP']:.2f}, Open: {latest_row['Open']:.2f}, "
+            f"Close: {latest_row['Close']:.2f}, High: {latest_row['High']:.2f}, "
+            f"Low: {latest_row['Low']:.2f}, Trade: {latest_row['Trade']:.0f}, "
+            f"Value(Mn): {latest_row['Value (Mn)']:.2f}, Volume: {latest_row['Volume']:.0f}"
+        )
+
+        # ---------------------------
+        # 📈 Enhanced Analysis Section
+        # ---------------------------
+        st.subheader("📈 Market Analysis Summary")
+        render_zones(result["full"], "", lambda d: f"on {d.date()}")
+
+        df_recent = result["recent"]
+        st.subheader(f"📊 Last 1 Year Data for {selected_code}")
+        st.dataframe(df_recent.tail(limit))
+        line_chart(df_recent)
+
+        # ---------------------------
+        # 📈 Analysis on Last 1 Year
+        # ---------------------------
+        st.subheader("📈 1-Year Market Analysis Summary")
+        if result["year"] is not None:
+            render_zones(result["year"], " (1-Year Range)", lambda d: d.strftime("%b %d, %Y"))
+
+            # 🕒 Latest Data Point
+            latest_recent = df_recent.iloc[-1]
+            st.markdown("### 🕒 Latest Market Data")
+            st.metric("Latest LTP", f"{latest_recent['LTP']:.2f}", f"{latest_recent['Date'].strftime('%b %d, %Y')}")
+
+
+@fragment("beta & correlation")
+def beta_view(selected_code, window, n_clusters):
+    n_peers = st.slider("Correlated codes to list:", min_value=5, max_value=50, value=10, key="beta_peers")
+    try:
+        version = data_version()
+        with st.spinner("Building the market return panel..."):
+            market, beta = beta_history(selected_code, window, version)
+        row = market_betas(version).loc[selected_code]
+        top = peers(selected_code, n_peers, version)
+        groups = clusters(n_clusters, version)
+    except KeyError as e:
+        st.warning(f"{e.args[0] if e.args else e}")
+        return
+    except Exception as e:
+        st.error(f"❌ Error computing analytics: {e}")
+        return
+
+    with perf("render"):
+        c1, c2, c3 = st.columns(3)
+        c1.metric(f"Beta vs {market}", f"{row['beta']:.2f}" if pd.notna(row["beta"]) else "n/a")
+        c2.metric("Correlation with market",
+                  f"{row['market_correlation']:.2f}" if pd.notna(row["market_correlation"]) else "n/a")
+        c3.metric("Days in window", int(row["days"]))
+
+        st.subheader(f"📈 Rolling {window}-day Beta vs {market}")
+        st.line_chart(beta.set_index("date")["beta"])
+
+        st.subheader("🤝 Most Correlated Codes")
+        st.dataframe(top)
+
+        mine = groups.loc[groups["trading_code"] == selected_code, "cluster"]
+        if not mine.empty:
+            members = groups.loc[groups["cluster"] == mine.iloc[0], "trading_code"].tolist()
+            st.subheader(f"🧩 Cluster {mine.iloc[0]} ({len(members)} codes)")
+            st.write(", ".join(members))
+
+
+@fragment("alert rules")
+def alert_rules_view():
+    alerts = get_alert_engine()
+    st.subheader("📋 Active Rules")
+    rules = alerts.list_rules()
+    if rules:
+        st.dataframe(pd.DataFrame(rules)[["id", "trading_code", "kind", "params", "note", "last_close",
+                                          "last_date", "fired_count"]].astype({"params": str}))
+        remove = st.selectbox("Delete rule:", [r["id"] for r in rules])
+        if st.button("Delete"):
+            alerts.delete_rule(remove)
+            st.success(f"🗑️ Deleted rule {remove}.")
+    else:
+        st.info("No alert rules yet.")
+
+    st.subheader("🔔 Recent Alerts")
+    events = alerts.events(limit=50)
+    if events:
+        st.dataframe(pd.DataFrame(events).assign(
+            fired_at=lambda d: pd.to_datetime(d["fired_at"], unit="s"))[
+            ["fired_at", "trading_code", "date", "kind", "close", "message"]])
+    else:
+        st.info("Nothing has fired yet.")
+
+
+st.session_state.perf_stack = []
+perf_push(menu)
+try:
+    # -------------------------------
+    # Menu Option 1: View All Trading Codes
+    # -------------------------------
+    if menu == "🔍 View Trading Codes":
+        st.title("🔍 View Trading Codes")
+        try:
+            codes = trading_codes(data_version())
+            if codes:
+                st.success(f"✅ Found {len(codes)} trading codes.")
+                with perf("render"):
+                    st.dataframe(pd.DataFrame(codes, columns=["Trading Codes"]))
+                st.session_state.chat_history.append(f"Fetched {len(codes)} trading codes from database.")
+            else:
+                st.warning("⚠️ No trading codes found in the database.")
+                st.session_state.chat_history.append("⚠️ No trading codes found in the database.")
+        except Exception as e:
+            st.error(f"❌ Error fetching trading list: {e}")
+            st.session_state.chat_history.append(f"❌ Error fetching trading list: {e}")
+
+
+    # -------------------------------
+    # Menu Option 2: Download & Save New Data
+    # -------------------------------
+    elif menu == "⬇️ Download & Save Data":
+        st.title("⬇️ Download & Save Stock Data")
+        market = "DSE"  # default market
+
+        with st.form("download_form"):
+            # Input: Stock symbol
+            symbol = st.text_input("Enter Stock Symbol (e.g., ACI):").strip().upper()
+            submitted = st.form_submit_button("Download & Save Data")
+
+        if submitted:
+            if not symbol:
+                st.warning("⚠️ Please enter a stock symbol!")
+            else:
+                # Step 1: Submit a background download + ingest job (survives reruns and tab reloads)
+                job_id = job_queue().submit("download", {"symbol": symbol, "market": market})
+                st.session_state.active_job = job_id
+                st.session_state.chat_history.append(f"Submitted download job for {symbol}.")
+
+        # Step 2: Poll the active job (the progress fragment reruns alone every second)
+        job_id = st.session_state.get("active_job")
+        if not job_id:
+            # Re-attach to a download still running from before a tab reload
+            running = [j for j in job_queue().list(status="running", limit=10) if j["kind"] == "download"]
+            job_id = running[0]["id"] if running else None
+        job = job_queue().get(job_id) if job_id else None
+        if job:
+            job_symbol = job["params"].get("symbol")
+            if job["status"] in ("queued", "running"):
+                job_progress(job_id, market)
+
+            # Step 3: Report the outcome
+            elif job["status"] == "succeeded":
+                result = job["result"] or {}
+                st.success(f"✅ {result.get('rows', 0)} rows successfully saved to 'market_history' table in SQL Server")
+                try:
+                    st.subheader("📊 Preview of downloaded data:")
+                    st.dataframe(pd.read_excel(result["file"], nrows=5))
+                except Exception as e:
+                    st.error(f"❌ Error reading Excel file: {e}")
+            elif job["status"] == "failed":
+                st.error(f"❌ Download job for {job_symbol} failed: {job['error']}")
+            elif job["status"] == "cancelled":
+                st.warning(f"⚠️ Download job for {job_symbol} was cancelled.")
+
+        # Recent jobs (persisted across sessions)
+        with st.expander("🗂️ Recent Jobs", expanded=False):
+            recent = job_queue().list(limit=20)
+            if recent:
+                st.dataframe(pd.DataFrame(recent)[["id", "kind", "status", "rows_done", "rows_per_sec", "message", "error"]])
+
+    # -------------------------------
+    # Menu Option 3: Get History by Code
+    # -------------------------------
+    elif menu == "📈 Get History by Code":
+        st.title("📈 Get History by Trading Code")
+
+        trading_codes_list = code_list()
+        if trading_codes_list:
+            with st.form("history_form"):
+                selected_code = st.selectbox("Select a Trading Code:", trading_codes_list)
+                fetched = st.form_submit_button("Fetch History")
+
+            if fetched:
+                st.session_state.history_code = selected_code
+            if st.session_state.get("history_code"):
+                history_view(st.session_state.history_code)
+                if fetched:
+                    st.session_state.chat_history.append(f"Fetched history for {selected_code}.")
+
+    # -------------------------------
+    # Menu Option 4: Get Data Analysis by Code
+    # -------------------------------
+    elif menu == "📈 Get Data Analysis by Code":
+        st.title("📈 Get Data Analysis by Trading Code")
+
+        trading_codes_list = code_list()
+        if trading_codes_list:
+            with st.form("analysis_form"):
+                selected_code = st.selectbox("Select a Trading Code:", trading_codes_list)
+                fetched = st.form_submit_button("Fetch History")
+
+            if fetched:
+                st.session_state.analysis_code = selected_code
+            if st.session_state.get("analysis_code"):
+                analysis_view(st.session_state.analysis_code)
+                if fetched:
+                    try:
+                        result = analysis(selected_code, data_version())
+                    except Exception:
+                        result = None
+                    if result is not None:
+                        full = result["full"]
+                        buys, sells = full["buys"]["Close"], full["sells"]["Close"]
+                        # Save to chat history
+                        st.session_state.chat_history.append(
+                            f"{selected_code} → Buy at {buys.iloc[0]:.2f}/{buys.iloc[1]:.2f}, "
+                            f"Sell at {sells.iloc[0]:.2f}/{sells.iloc[1]:.2f}, "
+                            f"Profit ≈ {full['profit_pct']:.2f}%"
                         )
 
-                        # 💹 Profit Calculation
-                        avg_buy = (buy1["Close"] + buy2["Close"]) / 2
-                        avg_sell = (sell1["Close"] + sell2["Close"]) / 2
-                        profit = avg_sell - avg_buy
-                        profit_pct = (profit / avg_buy) * 100
-
-                        st.markdown("### 💹 Performance Summary (1-Year Range)")
-                        st.metric("Expected Average Profit %", f"{profit_pct:.2f}%")
-                        st.info(f"Average Close: {avg_price:.2f} | Volatility: {volatility:.2f}")
-
-                        # 🕒 Latest Data Point
-                        latest_row = df_recent.iloc[-1]
-                        st.markdown("### 🕒 Latest Market Data")
-                        st.metric(
-                            "Latest LTP",
-                            f"{latest_row['LTP']:.2f}",
-                            f"{latest_row['Date'].strftime('%b %d, %Y')}"
-                        )
-                        
+    # -------------------------------
+    # Menu Option 5: Market Beta & Correlation (vs DSEX)
+    # -------------------------------
+    elif menu == "🧮 Market Beta & Correlation":
+        st.title("🧮 Market Beta & Correlation")
+
+        trading_codes_list = code_list()
+        if trading_codes_list:
+            with st.form("beta_form"):
+                selected_code = st.selectbox("Select a Trading Code:", trading_codes_list)
+                window = st.number_input("Rolling beta window (trading days):", min_value=10, max_value=250,
+                                         value=BETA_WINDOW)
+                n_clusters = st.number_input("Number of clusters:", min_value=2, max_value=50, value=12)
+                analyzed = st.form_submit_button("Analyze")
+
+            if analyzed:
+                st.session_state.beta_query = (selected_code, int(window), int(n_clusters))
+                st.session_state.chat_history.append(f"Analyzed beta/correlation for {selected_code}.")
+            if st.session_state.get("beta_query"):
+                beta_view(*st.session_state.beta_query)
+
+
+    # -------------------------------
+    # Menu Option 6: Price Alerts (checked on every ingest)
+    # -------------------------------
+    elif menu == "🔔 Price Alerts":
+        st.title("🔔 Price Alerts")
+        alerts = get_alert_engine()
+
+        trading_codes_list = code_list()
+        if trading_codes_list:
+            # Outside the form: the parameter inputs below depend on these two
+            selected_code = st.selectbox("Select a Trading Code:", trading_codes_list)
+            kind = st.selectbox("Alert type:", list(RULE_KINDS), format_func=lambda k: {
+                "buy_below": "🟢 Close crosses below buy level", "sell_above": "🔴 Close crosses above sell level",
+                "move_pct": "📈 Daily move of at least N%", "band_break": "📏 Close leaves a band",
+            }[k])
+
+            # Suggested levels: the 1-year Buy Limit 1 / Sell Limit 1 from the analysis page
+            suggested_buy, suggested_sell = close_range(selected_code, data_version())
+
+            with st.form("alert_form", clear_on_submit=True):
+                if kind == "buy_below":
+                    params = {"price": st.number_input("Buy level:", min_value=0.0, value=suggested_buy)}
+                elif kind == "sell_above":
+                    params = {"price": st.number_input("Sell level:", min_value=0.0, value=suggested_sell)}
+                elif kind == "move_pct":
+                    params = {"pct": st.number_input("Move (%):", min_value=0.1, value=5.0)}
                 else:
-                    st.warning(f"No records found for {selected_code}.")
-            except Exception as e:
-                st.error(f"❌ Error fetching history: {e}")
-
-
-# -------------------------------
-# Menu Option 5: Clear Chat History
-# -------------------------------
-elif menu == "🗑️ Clear Chat History":
-    st.session_state.chat_history.clear()
-    st.sidebar.success("Chat history cleared!")
-    st.write("🧹 Chat history has been cleared!")
-
-
-# -------------------------------
-# Cleanup
-# -------------------------------
-db_manager.close()
+                    c1, c2 = st.columns(2)
+                    params = {"lower": c1.number_input("Lower:", min_value=0.0, value=suggested_buy),
+                              "upper": c2.number_input("Upper:", min_value=0.0, value=suggested_sell)}
+                note = st.text_input("Note (optional):")
+                added = st.form_submit_button("Add Alert")
+
+            if added:
+                try:
+                    rule = alerts.add_rule(selected_code, kind, params, note or None,
+                                           latest=share_service().latest_close(selected_code))
+                    st.success(f"✅ Alert {rule['id']} added for {selected_code}.")
+                    st.session_state.chat_history.append(f"Added {kind} alert for {selected_code}.")
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+
+        alert_rules_view()
+
+
+    # -------------------------------
+    # Menu Option 7: Clear Chat History
+    # -------------------------------
+    elif menu == "🗑️ Clear Chat History":
+        st.session_state.chat_history.clear()
+        st.sidebar.success("Chat history cleared!")
+        st.write("🧹 Chat history has been cleared!")
+
+finally:
+    perf_pop()
+    if st.session_state.get("show_perf"):
+        render_perf_panel(perf_panel)
 
 
 #(.venv) PS F:\Python\Capstone_AIAgent_Prediction> set PYTHONPATH=%CD%
-#>> streamlit run app/sharemarket_chatbot.py
\ No newline at end of file
+#>> streamlit run app/sharemarket_chatbot.py
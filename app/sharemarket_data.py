@@ -3,7 +3,7 @@ from stocksurferbd import PriceData
 import pandas as pd
 from utils.config import build_connection_string
 from utils.database_manager import DatabaseManager
-from sqlalchemy import text
+from services.market_loader import MarketHistoryLoader
 from datetime import date
 
 # -------------------------------
@@ -64,7 +64,6 @@ except Exception as e:
 try:
     connection_string = build_connection_string()
     db_manager = DatabaseManager(connection_string)
-    session = db_manager.get_session()
 
     # 🔹 Optional: create table if not exists (basic example)
     # create_table_sql = text("""
@@ -82,32 +81,12 @@ try:
     # session.execute(create_table_sql)
     # session.commit()
 
-    # 🔹 Insert data row by row
-    for _, row in df.iterrows():
-        insert_sql = text("""
-        INSERT INTO dbo.market_history (unnamed,date,trading_code, ltp, high, low, openp, closep, ycp, trade, value_mn, volume)
-        VALUES (:unnamed,:date, :trading_code, :ltp, :high, :low, :openp, :closep, :ycp, :trade, :value_mn, :volume)
-        """)
-        session.execute(insert_sql, {
-            "unnamed": symbol,
-            "date": row.get("date"),
-            "trading_code": row.get("trading_code"),
-            "ltp": row.get("ltp"),
-            "high": row.get("high"),
-            "low": row.get("low"),
-            "openp": row.get("openp"),
-            "closep": row.get("closep"),
-            "ycp": row.get("ycp"),
-            "trade": row.get("trade"),
-            "value_mn": row.get("value_mn"),
-            "volume": row.get("volume")
-        })
-    session.commit()
-    print(f"\n✅ Data successfully saved to 'market_history' table in SQL Server")
+    # 🔹 Insert data in batches
+    rows_saved = MarketHistoryLoader(db_manager).load_frame(df, symbol)
+    print(f"\n✅ {rows_saved} rows successfully saved to 'market_history' table in SQL Server")
 
 except Exception as e:
     print(f"❌ Error saving data to DB: {e}")
 
 finally:
-    session.close()
     db_manager.close()
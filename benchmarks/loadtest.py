@@ -0,0 +1,338 @@
+"""
+Load test for the FastAPI service against local stub data sources.
+
+Starts a stub HTTP server that serves AmarStock-style company pages
+(``window.chartData``) and CSVs, either synthetic (benchmarks/synthetic.py) or
+recorded ones from ``--recorded DIR`` (``<CODE>.html`` / ``<CODE>.csv``). Then
+launches ``app.main:app`` under uvicorn with SCRAPER_FETCH=http and a seeded
+temporary SQLite database (or targets ``--target URL``), and drives it with a
+weighted endpoint mix through a sequence of concurrency stages.
+
+    python benchmarks/loadtest.py --profile ramp
+    python benchmarks/loadtest.py --stages 4:15,32:30 --mix predict=6,history=3,status=1 --workers 4
+
+Per stage and endpoint it reports requests, throughput, p50/p95/p99 latency
+and error rate, and writes the report as JSON.
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic import generate_history, symbol_names, write_history_files
+
+PROFILES = {
+    "smoke": "1:5,4:5",
+    "ramp": "1:10,4:15,16:20,64:20",
+    "soak": "16:300",
+}
+DEFAULT_MIX = "predict=6,history=3,status=1"
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_stages(spec: str) -> List[Tuple[int, float]]:
+    """``"1:10,8:30"`` -> [(concurrency 1, 10 s), (concurrency 8, 30 s)]."""
+    stages = []
+    for part in spec.split(","):
+        concurrency, seconds = part.split(":")
+        stages.append((int(concurrency), float(seconds)))
+    return stages
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - set(ENDPOINTS)
+    if unknown:
+        raise ValueError(f"unknown endpoints in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+# -----------------------------------------------------------
+# 🔹 Stub data source (AmarStock pages + CSVs)
+# -----------------------------------------------------------
+def chart_page(code: str, dates: List[str], closes: List[float]) -> bytes:
+    points = ",".join(f"{{'date':'{d}','close':{c}}}" for d, c in zip(dates, closes))
+    return (f"<html><body><h1>{code}</h1>"
+            f'<a href="/csv/{code}.csv">Download CSV</a>'
+            f"<script>window.chartData = [{points}];</script></body></html>").encode()
+
+
+def chart_csv(dates: List[str], closes: List[float]) -> bytes:
+    return ("Date,Close\n" + "\n".join(f"{d},{c}" for d, c in zip(dates, closes)) + "\n").encode()
+
+
+class StubSource:
+    """Serves /company/<CODE> and /csv/<CODE>.csv from memory on a background thread."""
+    def __init__(self, pages: Dict[str, bytes], csvs: Dict[str, bytes], port: int = 0):
+        source = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                body = None
+                if len(parts) == 2 and parts[0] == "company":
+                    body, ctype = source.pages.get(parts[1].upper()), "text/html"
+                elif len(parts) == 2 and parts[0] == "csv":
+                    body, ctype = source.csvs.get(parts[1].rsplit(".", 1)[0].upper()), "text/csv"
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.pages, self.csvs = pages, csvs
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @classmethod
+    def synthetic(cls, df) -> "StubSource":
+        pages, csvs = {}, {}
+        for code, rows in df.groupby("trading_code", sort=False):
+            dates = rows["date"].dt.strftime("%Y-%m-%d").tolist()
+            closes = rows["closep"].tolist()
+            pages[code], csvs[code] = chart_page(code, dates, closes), chart_csv(dates, closes)
+        return cls(pages, csvs)
+
+    @classmethod
+    def recorded(cls, folder: str) -> "StubSource":
+        pages, csvs = {}, {}
+        for name in os.listdir(folder):
+            code, ext = os.path.splitext(name)
+            with open(os.path.join(folder, name), "rb") as f:
+                if ext == ".html":
+                    pages[code.upper()] = f.read()
+                elif ext == ".csv":
+                    csvs[code.upper()] = f.read()
+        return cls(pages, csvs)
+
+    def start(self) -> "StubSource":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# -----------------------------------------------------------
+# 🔹 Service under test
+# -----------------------------------------------------------
+def seed_database(df, workdir: str) -> str:
+    """Temporary SQLite database with the synthetic history loaded (for /history)."""
+    from benchmarks.run import migrate
+
+    db_path = os.path.join(workdir, "loadtest.sqlite")
+    os.environ["DB_BACKEND"], os.environ["DB_PATH"] = "sqlite", db_path
+    migrate(db_path)
+
+    from utils.database_manager import DatabaseManager
+    from services.market_loader import MarketHistoryLoader
+
+    db_manager = DatabaseManager(f"sqlite:///{db_path}")
+    try:
+        MarketHistoryLoader(db_manager).load_file(write_history_files(df, workdir)[0])
+    finally:
+        db_manager.close()
+    return db_path
+
+
+def start_service(db_path: str, workdir: str, workers: int, port: int,
+                  extra_env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    env = {**os.environ, "SCRAPER_FETCH": "http", "DB_BACKEND": "sqlite", "DB_PATH": db_path,
+           "JOB_DB_PATH": os.path.join(workdir, "jobs.sqlite"), "PYTHONPATH": ROOT, **(extra_env or {})}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+
+async def wait_ready(client, base_url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{base_url}/status")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"Service at {base_url} did not become ready within {timeout:.0f}s")
+
+
+# -----------------------------------------------------------
+# 🔹 Load driver
+# -----------------------------------------------------------
+async def call_predict(client, base_url: str, code: str, source_url: str):
+    return await client.post(f"{base_url}/predict",
+                             json={"source_url": f"{source_url}/company/{code}", "symbol": code})
+
+
+async def call_history(client, base_url: str, code: str, source_url: str):
+    return await client.get(f"{base_url}/history/{code}", params={"limit": 250})
+
+
+async def call_status(client, base_url: str, code: str, source_url: str):
+    return await client.get(f"{base_url}/status")
+
+
+ENDPOINTS = {"predict": call_predict, "history": call_history, "status": call_status}
+
+
+def is_error(resp) -> bool:
+    """Non-2xx, or a 200 whose JSON body carries an ``error`` (how /predict reports failures)."""
+    if resp.status_code >= 400:
+        return True
+    if resp.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = resp.json()
+        except ValueError:
+            return True
+        return isinstance(body, dict) and "error" in body
+    return False
+
+
+async def run_stage(client, base_url: str, source_url: str, codes: List[str], mix: Dict[str, float],
+                    concurrency: int, seconds: float, seed: int) -> List[Tuple[str, float, bool]]:
+    """``concurrency`` closed-loop workers issue requests until the stage ends; returns (endpoint, latency, ok)."""
+    samples: List[Tuple[str, float, bool]] = []
+    names, weights = list(mix), list(mix.values())
+    deadline = time.monotonic() + seconds
+
+    async def worker(i: int):
+        rng = random.Random(seed * 1000 + i)
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                resp = await ENDPOINTS[name](client, base_url, rng.choice(codes), source_url)
+                ok = not is_error(resp)
+            except Exception:
+                ok = False
+            samples.append((name, time.perf_counter() - start, ok))
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples
+
+
+def summarize(samples: List[Tuple[str, float, bool]], seconds: float) -> Dict[str, Dict[str, Any]]:
+    out = {}
+    for name in sorted({s[0] for s in samples}):
+        lat = np.array([s[1] for s in samples if s[0] == name]) * 1000.0
+        errors = sum(1 for s in samples if s[0] == name and not s[2])
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        out[name] = {
+            "requests": int(len(lat)), "errors": errors, "error_rate": errors / len(lat),
+            "throughput_rps": len(lat) / seconds,
+            "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": float(lat.max()),
+        }
+    return out
+
+
+async def drive(base_url: str, source_url: str, codes: List[str], mix: Dict[str, float],
+                stages: List[Tuple[int, float]], seed: int, timeout: float,
+                wait: bool) -> List[Dict[str, Any]]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(c for c, _ in stages) + 4)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        if wait:
+            await wait_ready(client, base_url)
+        report = []
+        for i, (concurrency, seconds) in enumerate(stages):
+            started = time.monotonic()
+            samples = await run_stage(client, base_url, source_url, codes, mix, concurrency, seconds, seed + i)
+            elapsed = time.monotonic() - started
+            stage = {"concurrency": concurrency, "seconds": round(elapsed, 2),
+                     "endpoints": summarize(samples, elapsed)}
+            report.append(stage)
+            print_stage(stage)
+        return report
+
+
+def print_stage(stage: Dict[str, Any]):
+    print(f"\n▶ concurrency {stage['concurrency']} for {stage['seconds']}s")
+    print(f"  {'endpoint':<10}{'req':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for name, s in stage["endpoints"].items():
+        print(f"  {name:<10}{s['requests']:>8}{s['throughput_rps']:>9.1f}{s['p50_ms']:>10.1f}"
+              f"{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['error_rate']:>8.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test app.main:app against local stub data sources")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="smoke")
+    parser.add_argument("--stages", help="concurrency:seconds,... (overrides --profile)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint weights (default {DEFAULT_MIX})")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout (s)")
+    parser.add_argument("--recorded", help="folder of recorded <CODE>.html / <CODE>.csv pages to serve")
+    parser.add_argument("--target", help="base URL of an already running service (skips launching uvicorn)")
+    parser.add_argument("--output", help="report JSON (default benchmarks/results/loadtest-<timestamp>.json)")
+    args = parser.parse_args()
+
+    stages = parse_stages(args.stages or PROFILES[args.profile])
+    mix = parse_mix(args.mix)
+
+    workdir = tempfile.mkdtemp(prefix="sharemarket-loadtest-")
+    df = generate_history(args.symbols, args.days, args.seed)
+    stub = (StubSource.recorded(args.recorded) if args.recorded else StubSource.synthetic(df)).start()
+    codes = sorted(stub.pages) or symbol_names(args.symbols)
+    service = None
+    try:
+        base_url = args.target.rstrip("/") if args.target else None
+        if base_url is None:
+            db_path = seed_database(df, workdir)
+            port = free_port()
+            service = start_service(db_path, workdir, args.workers, port)
+            base_url = f"http://127.0.0.1:{port}"
+        print(f"🎯 {base_url}  stub source {stub.url}  stages {stages}  mix {mix}")
+        report = asyncio.run(drive(base_url, stub.url, codes, mix, stages, args.seed, args.timeout, wait=True))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait(timeout=30)
+        stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"loadtest-{datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"target": base_url, "workers": args.workers if not args.target else None,
+                   "mix": mix, "stages": report}, f, indent=2)
+    print(f"\n📄 Report written to {output}")
@@ -0,0 +1,174 @@
+"""
+Local stub quote feed, and a fan-out check of /stream/quotes against it.
+
+The stub serves GET /quote/<CODE> -> {"ltp", "time", "volume"} from a random
+walk that ticks every ``--tick`` seconds, and counts requests per symbol.
+Run alone it is a quote source for development (QUOTE_SOURCE=http,
+QUOTE_FEED_URL=<printed url>):
+
+    python benchmarks/quote_feed.py serve --symbols 20 --port 8765
+
+``fanout`` launches app.main:app against it, opens ``--clients`` SSE
+connections spread over ``--symbols`` symbols for ``--seconds``, and reports
+upstream requests next to messages delivered. Upstream requests should track
+symbols x seconds / QUOTE_POLL_SECONDS regardless of the client count.
+
+    python benchmarks/quote_feed.py fanout --clients 200 --symbols 5 --seconds 20
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+from benchmarks.loadtest import free_port, start_service, wait_ready
+from benchmarks.synthetic import symbol_names
+
+
+class StubQuoteFeed:
+    """Random-walk LTPs per symbol served over HTTP on a background thread."""
+    def __init__(self, symbols: List[str], tick_seconds: float = 1.0, seed: int = 42, port: int = 0):
+        feed = self
+        rng = random.Random(seed)
+        self.prices = {s: round(rng.uniform(20, 500), 1) for s in symbols}
+        self.tick_seconds = tick_seconds
+        self.requests: Counter = Counter()
+        self._rng = rng
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._ticks = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                symbol = parts[1].upper() if len(parts) == 2 and parts[0] == "quote" else None
+                quote = feed.quote(symbol) if symbol else None
+                if quote is None:
+                    self.send_error(404)
+                    return
+                body = json.dumps(quote).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def quote(self, symbol: str):
+        with self._lock:
+            if symbol not in self.prices:
+                return None
+            self.requests[symbol] += 1
+            # Advance every symbol's walk to the current tick
+            ticks = int((time.monotonic() - self._started) / self.tick_seconds)
+            for _ in range(ticks - self._ticks):
+                for s in self.prices:
+                    self.prices[s] = round(max(1.0, self.prices[s] * (1 + self._rng.gauss(0, 0.004))), 1)
+            self._ticks = max(self._ticks, ticks)
+            return {"ltp": self.prices[symbol], "time": self._ticks, "volume": 1000 * (self._ticks + 1)}
+
+    def start(self) -> "StubQuoteFeed":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# -----------------------------------------------------------
+# 🔹 Fan-out check
+# -----------------------------------------------------------
+async def sse_client(client, url: str, deadline: float, received: Counter):
+    try:
+        async with client.stream("GET", url) as resp:
+            async for line in resp.aiter_lines():
+                if line.startswith("event: "):
+                    received[line[7:].strip()] += 1
+                if time.monotonic() > deadline:
+                    break
+    except Exception:
+        received["errors"] += 1
+
+
+async def fanout(base_url: str, symbols: List[str], clients: int, seconds: float) -> Dict[str, int]:
+    import httpx
+
+    received: Counter = Counter()
+    limits = httpx.Limits(max_connections=clients + 4)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(seconds + 30), limits=limits) as client:
+        await wait_ready(client, base_url)
+        deadline = time.monotonic() + seconds
+        await asyncio.gather(*(
+            sse_client(client, f"{base_url}/stream/quotes?symbols={symbols[i % len(symbols)]}", deadline, received)
+            for i in range(clients)
+        ))
+        status = (await client.get(f"{base_url}/status")).json()
+    return {**received, "hub": status.get("quotes")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub quote feed / streaming fan-out check")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the stub feed")
+    serve.add_argument("--port", type=int, default=8765)
+    check = sub.add_parser("fanout", help="many SSE clients against one API process")
+    check.add_argument("--clients", type=int, default=100)
+    check.add_argument("--seconds", type=float, default=20.0)
+    check.add_argument("--poll", type=float, default=1.0, help="QUOTE_POLL_SECONDS for the service")
+    for p in (serve, check):
+        p.add_argument("--symbols", type=int, default=5)
+        p.add_argument("--tick", type=float, default=0.5, help="seconds between price moves")
+    args = parser.parse_args()
+
+    codes = symbol_names(args.symbols)
+    if args.command == "serve":
+        feed = StubQuoteFeed(codes, args.tick, port=args.port).start()
+        print(f"📡 Stub quote feed at {feed.url}/quote/<CODE> for {', '.join(codes)}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            feed.stop()
+        sys.exit(0)
+
+    feed = StubQuoteFeed(codes, args.tick).start()
+    workdir = tempfile.mkdtemp(prefix="sharemarket-quotes-")
+    port = free_port()
+    service = start_service(os.path.join(workdir, "empty.sqlite"), workdir, 1, port, extra_env={
+        "QUOTE_SOURCE": "http", "QUOTE_FEED_URL": feed.url, "QUOTE_POLL_SECONDS": str(args.poll),
+        "WARMUP_MODE": "off",
+    })
+    try:
+        started = time.monotonic()
+        result = asyncio.run(fanout(f"http://127.0.0.1:{port}", codes, args.clients, args.seconds))
+        elapsed = time.monotonic() - started
+    finally:
+        service.terminate()
+        service.wait(timeout=30)
+        feed.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    upstream = sum(feed.requests.values())
+    print(f"👥 {args.clients} SSE clients on {len(codes)} symbols for {args.seconds:.0f}s ({elapsed:.1f}s total)")
+    print(f"📡 upstream quote requests: {upstream} "
+          f"(~{len(codes) * args.seconds / args.poll:.0f} expected from one poller per symbol)")
+    print(f"📨 quote messages delivered: {result.get('quote', 0)}, errors: {result.get('errors', 0)}")
+    print(f"🧮 hub: {result.get('hub')}")
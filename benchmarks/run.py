@@ -0,0 +1,324 @@
+"""
+Offline benchmark suite for the hot paths.
+
+Generates a seeded synthetic market (benchmarks/synthetic.py), loads it into
+a throwaway SQLite database migrated with Alembic, and times:
+
+    cold_start      ``import app.main`` in a fresh interpreter (crew/models load lazily)
+    generate        synthetic OHLCV frame
+    ingest          MarketHistoryLoader.load_file on a CSV of every row
+    history_iter    ShareMarketService.iter_history per symbol (tuples)
+    history_frame   ShareMarketService.get_history_frame per symbol (typed)
+    analysis        the buy/sell/volatility computations of the chatbot analysis page
+    feature_agent   FeatureAgent.run (pipeline and agents/FeatureAgent.py) on chart axes
+    model_agent     ModelAgent.run with small quantile models trained on the synthetic data
+    predict         POST /predict end to end with the Selenium scraper stubbed out
+
+No network is used. Results are written as JSON so runs on different commits
+can be compared:
+
+    python benchmarks/run.py --symbols 50 --days 1500
+    python benchmarks/run.py --only ingest,history_frame --compare benchmarks/results/abc1234.json
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+import argparse
+import datetime
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import chart_axis, generate_history, symbol_names, write_history_files
+
+BENCHMARKS = ["cold_start", "generate", "ingest", "history_iter", "history_frame", "analysis",
+              "feature_agent", "model_agent", "predict"]
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+HISTORY_COLUMNS = ["date", "ltp", "high", "low", "openp", "closep", "trade", "value_mn", "volume"]
+HISTORY_LABELS = {
+    "date": "Date", "ltp": "LTP", "high": "High", "low": "Low", "openp": "Open",
+    "closep": "Close", "trade": "Trade", "value_mn": "Value (Mn)", "volume": "Volume",
+}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(fn: Callable[[], Any], repeat: int, rows: int = 0,
+            setup: Optional[Callable[[], None]] = None, warmup: int = 1) -> Dict[str, Any]:
+    """Wall-time stats over ``repeat`` runs (after ``warmup`` untimed runs); ``setup`` runs untimed before each."""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    return {
+        "repeat": repeat, "rows": rows,
+        "min": min(times), "median": median, "mean": statistics.fmean(times), "max": max(times),
+        "rows_per_sec": rows / median if rows and median else None,
+    }
+
+
+# -----------------------------------------------------------
+# 🔹 Fixtures
+# -----------------------------------------------------------
+def migrate(db_path: str):
+    """Fresh SQLite file at ``db_path`` with the Alembic schema (DB_BACKEND/DB_PATH must point at it)."""
+    from alembic import command
+    from alembic.config import Config
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    cfg = Config(os.path.join(ROOT, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    command.upgrade(cfg, "head")
+
+
+def analysis_summary(df: pd.DataFrame) -> Dict[str, float]:
+    """Same computations as the "Get Data Analysis by Code" page (full range and last 365 days)."""
+    out = {}
+    cutoff = df["Date"].max() - pd.Timedelta(days=365)
+    for label, frame in (("all", df), ("1y", df[df["Date"] >= cutoff])):
+        if len(frame) < 4:
+            continue
+        latest = frame.loc[frame["Date"] == frame["Date"].max()].iloc[0]
+        buy = frame.nsmallest(2, "Close")
+        sell = frame.nlargest(2, "Close")
+        avg_buy = buy["Close"].mean()
+        avg_sell = sell["Close"].mean()
+        out[f"{label}_latest_ltp"] = float(latest["LTP"])
+        out[f"{label}_profit_pct"] = float((avg_sell - avg_buy) / avg_buy * 100)
+        out[f"{label}_avg"] = float(frame["Close"].mean())
+        out[f"{label}_volatility"] = float(frame["Close"].std())
+    return out
+
+
+def train_small_models(df: pd.DataFrame, folder: str) -> Dict[str, str]:
+    """Fit light q10/q90 models on the synthetic closes so ModelAgent takes its model path."""
+    import joblib
+    from sklearn.ensemble import GradientBoostingRegressor
+    from models.train_quantile import build_training_set
+
+    X_parts, y_parts = [], []
+    for _, rows in df.groupby("trading_code", sort=False):
+        X, y = build_training_set(rows["closep"].to_numpy(np.float64), window=60, horizon=30)
+        X_parts.append(X)
+        y_parts.append(y)
+    X_all, y_all = pd.concat(X_parts, ignore_index=True), np.concatenate(y_parts)
+
+    paths = {}
+    for name, alpha in (("upper", 0.9), ("lower", 0.1)):
+        model = GradientBoostingRegressor(loss="quantile", alpha=alpha, n_estimators=50, max_depth=3)
+        model.fit(X_all, y_all)
+        paths[name] = os.path.join(folder, f"quantile_{name}.pkl")
+        joblib.dump(model, paths[name])
+    return paths
+
+
+class StubScraper:
+    """Stands in for the Selenium ScraperAgent: serves a synthetic chart for the requested URL."""
+    def __init__(self, axes: Dict[str, Dict[str, list]]):
+        self.axes = axes
+
+    def run(self, url, x_axis_dates=None):
+        from utils.timeseries import TimeSeries
+
+        ax = self.axes[url.rsplit("/", 1)[-1]]
+        series = TimeSeries.from_lists(ax["x"], ax["y"], name="Price")
+        if x_axis_dates:
+            series = series.at(x_axis_dates)
+        return {"axis": [series.to_axis()], "source_url": url}
+
+
+# -----------------------------------------------------------
+# 🔹 Suite
+# -----------------------------------------------------------
+def run_suite(symbols: int, days: int, seed: int, repeat: int, sample: int,
+              only: Optional[List[str]] = None) -> Dict[str, Any]:
+    selected = only or BENCHMARKS
+    workdir = tempfile.mkdtemp(prefix="sharemarket-bench-")
+    db_path = os.path.join(workdir, "bench.sqlite")
+    # Must be set before utils.config is imported anywhere
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["DB_PATH"] = db_path
+
+    results: Dict[str, Any] = {}
+    try:
+        if "cold_start" in selected:
+            env = {**os.environ, "PYTHONPATH": ROOT}
+            results["cold_start"] = measure(
+                lambda: subprocess.run([sys.executable, "-c", "import app.main"], cwd=ROOT, env=env, check=True),
+                repeat)
+
+        df = generate_history(symbols, days, seed)
+        codes = symbol_names(symbols)[:sample]
+        if "generate" in selected:
+            results["generate"] = measure(lambda: generate_history(symbols, days, seed), repeat, rows=len(df))
+
+        from utils.database_manager import DatabaseManager
+        from services.market_loader import MarketHistoryLoader
+        from services.sharemarket_service import ShareMarketService
+
+        csv_path = write_history_files(df, workdir)[0]
+
+        def fresh_db():
+            migrate(db_path)
+
+        def ingest():
+            db_manager = DatabaseManager(f"sqlite:///{db_path}")
+            try:
+                MarketHistoryLoader(db_manager).load_file(csv_path)
+            finally:
+                db_manager.close()
+
+        if "ingest" in selected:
+            results["ingest"] = measure(ingest, repeat, rows=len(df), setup=fresh_db)
+
+        needs_db = {"history_iter", "history_frame", "analysis"} & set(selected)
+        if needs_db:
+            fresh_db()
+            ingest()
+            db_manager = DatabaseManager(f"sqlite:///{db_path}")
+            service = ShareMarketService(db_manager)
+            sample_rows = int(df["trading_code"].isin(codes).sum())
+            try:
+                if "history_iter" in selected:
+                    results["history_iter"] = measure(
+                        lambda: [list(service.iter_history(c, HISTORY_COLUMNS, direction="asc")) for c in codes],
+                        repeat, rows=sample_rows)
+                if "history_frame" in selected:
+                    results["history_frame"] = measure(
+                        lambda: [service.get_history_frame(c, HISTORY_COLUMNS) for c in codes],
+                        repeat, rows=sample_rows)
+                if "analysis" in selected:
+                    frames = [service.get_history_frame(c, HISTORY_COLUMNS).rename(columns=HISTORY_LABELS)
+                              for c in codes]
+                    results["analysis"] = measure(lambda: [analysis_summary(f) for f in frames],
+                                                  repeat, rows=sample_rows)
+            finally:
+                db_manager.close()
+
+        axes = {c: chart_axis(df, c) for c in codes}
+        docs = [{"axis": [ax]} for ax in axes.values()]
+        axis_rows = sum(len(ax["x"]) for ax in axes.values())
+
+        if {"feature_agent", "model_agent", "predict"} & set(selected):
+            from agents.registry import get_crew
+            from agents.FeatureAgent import FeatureAgent as ChartFeatureAgent
+            from models.utils import MODEL_FILES
+
+            crew = get_crew()
+            pipeline_features, model_agent = crew.agents[2], crew.agents[3]
+            if "feature_agent" in selected:
+                chart_features = ChartFeatureAgent()
+                results["feature_agent"] = measure(lambda: [pipeline_features.run(d) for d in docs],
+                                                   repeat, rows=axis_rows)
+                results["feature_agent_chart"] = measure(lambda: [chart_features.run(d) for d in docs],
+                                                         repeat, rows=axis_rows)
+
+            if {"model_agent", "predict"} & set(selected):
+                MODEL_FILES.update(train_small_models(df, workdir))
+            if "model_agent" in selected:
+                features = [pipeline_features.run(d)["features"] for d in docs]
+                results["model_agent"] = measure(lambda: [model_agent.run(f) for f in features],
+                                                 repeat, rows=len(features))
+
+            if "predict" in selected:
+                from fastapi.testclient import TestClient
+                import app.main as api
+
+                scraper = crew.agents[0]
+                crew.agents[0] = StubScraper(axes)
+                try:
+                    client = TestClient(api.app)
+
+                    def predict_all():
+                        for code in codes:
+                            resp = client.post("/predict", json={"source_url": f"https://bench.local/{code}",
+                                                                 "symbol": code})
+                            resp.raise_for_status()
+
+                    results["predict"] = measure(predict_all, repeat, rows=len(codes))
+                finally:
+                    crew.agents[0] = scraper
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """Print median-time ratios against a previous results file (>1.00 = slower now)."""
+    print(f"{'benchmark':<22}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:<22}{'-':>12}{stats['median']:>12.4f}{'-':>8}")
+            continue
+        print(f"{name:<22}{base['median']:>12.4f}{stats['median']:>12.4f}{stats['median'] / base['median']:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite (synthetic data, no network)")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--days", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sample", type=int, default=10, help="symbols used by the per-symbol benchmarks")
+    parser.add_argument("--only", help=f"comma-separated subset of {','.join(BENCHMARKS)}")
+    parser.add_argument("--output", help="results JSON (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    only = [b.strip() for b in args.only.split(",")] if args.only else None
+    unknown = set(only or []) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"symbols": args.symbols, "days": args.days, "seed": args.seed,
+                   "repeat": args.repeat, "sample": args.sample},
+        "results": run_suite(args.symbols, args.days, args.seed, args.repeat, args.sample, only),
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, stats in report["results"].items():
+        rate = f"  {stats['rows_per_sec']:,.0f} rows/s" if stats["rows_per_sec"] else ""
+        print(f"{name:<22} median {stats['median']:.4f}s{rate}")
+    print(f"📄 Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
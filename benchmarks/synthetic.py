@@ -0,0 +1,82 @@
+"""
+Seeded synthetic DSE price history in the dbo.market_history schema.
+
+Prices follow a per-symbol geometric random walk on DSE trading days
+(Sunday–Thursday); OHLC/LTP/YCP, trade count, volume and value are derived
+from it so the same (symbols, days, seed) always yields identical frames.
+"""
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+DSE_WEEKDAYS = "Sun Mon Tue Wed Thu"
+
+
+def trading_days(days: int, start: str = "2015-01-01") -> pd.DatetimeIndex:
+    """``days`` consecutive DSE trading days (Fri/Sat weekend) from ``start``."""
+    return pd.bdate_range(start=start, periods=days, freq="C", weekmask=DSE_WEEKDAYS)
+
+
+def symbol_names(n: int) -> List[str]:
+    return [f"SYN{i:04d}" for i in range(n)]
+
+
+def generate_history(symbols: int = 50, days: int = 1000, seed: int = 42,
+                     start: str = "2015-01-01") -> pd.DataFrame:
+    """``symbols`` × ``days`` rows with the market_history columns, sorted by (trading_code, date)."""
+    rng = np.random.default_rng(seed)
+    dates = trading_days(days, start)
+    codes = symbol_names(symbols)
+
+    base = rng.uniform(10.0, 500.0, size=(symbols, 1))
+    drift = rng.normal(0.0002, 0.0004, size=(symbols, 1))
+    vol = rng.uniform(0.01, 0.03, size=(symbols, 1))
+    log_ret = drift + vol * rng.standard_normal((symbols, days))
+    close = np.round(base * np.exp(np.cumsum(log_ret, axis=1)), 1)
+
+    ycp = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+    openp = np.round(ycp * (1 + rng.normal(0, 0.004, size=close.shape)), 1)
+    spread = np.abs(rng.normal(0, 0.01, size=close.shape)) * close
+    high = np.round(np.maximum(openp, close) + spread, 1)
+    low = np.round(np.maximum(np.minimum(openp, close) - spread, 0.1), 1)
+    ltp = close
+    trade = rng.integers(50, 5000, size=close.shape)
+    volume = trade * rng.integers(20, 400, size=close.shape)
+    value_mn = np.round(volume * close / 1e6, 3)
+
+    code_col = np.repeat(np.array(codes, dtype=object), days)
+    return pd.DataFrame({
+        "unnamed": code_col,
+        "date": np.tile(dates.values, symbols),
+        "trading_code": code_col,
+        "ltp": ltp.ravel(), "high": high.ravel(), "low": low.ravel(),
+        "openp": openp.ravel(), "closep": close.ravel(), "ycp": ycp.ravel(),
+        "trade": trade.ravel(), "value_mn": value_mn.ravel(), "volume": volume.ravel(),
+    })
+
+
+def chart_axis(df: pd.DataFrame, code: str) -> Dict[str, list]:
+    """One symbol's closes in the ScraperAgent ``axis`` shape ({"name", "x", "y"})."""
+    rows = df[df["trading_code"] == code]
+    return {
+        "name": "Price",
+        "x": rows["date"].dt.strftime("%Y-%m-%d").tolist(),
+        "y": rows["closep"].astype(float).tolist(),
+    }
+
+
+def write_history_files(df: pd.DataFrame, folder: str, per_symbol: bool = False) -> List[str]:
+    """Write the frame as CSV (one file, or one ``<CODE>_history.csv`` per symbol) for ingest runs."""
+    os.makedirs(folder, exist_ok=True)
+    if not per_symbol:
+        path = os.path.join(folder, "market_history.csv")
+        df.to_csv(path, index=False)
+        return [path]
+    paths = []
+    for code, rows in df.groupby("trading_code", sort=True):
+        path = os.path.join(folder, f"{code}_history.csv")
+        rows.to_csv(path, index=False)
+        paths.append(path)
+    return paths
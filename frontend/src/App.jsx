@@ -1,4 +1,27 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
+
+// Live LTP + alert firings for one symbol over SSE (the server shares one upstream poller per symbol)
+function LiveQuote({ symbol }){
+  const [quote, setQuote] = useState(null);
+  const [alerts, setAlerts] = useState([]);
+
+  useEffect(() => {
+    if (!symbol) return;
+    const source = new EventSource(`/api/stream/quotes?symbols=${encodeURIComponent(symbol)}`);
+    source.addEventListener("quote", e => setQuote(JSON.parse(e.data)));
+    source.addEventListener("alert", e => setAlerts(prev => [JSON.parse(e.data), ...prev].slice(0, 5)));
+    return () => source.close();
+  }, [symbol]);
+
+  if (!quote) return null;
+  return (
+    <div className="mt-4 p-4 border rounded">
+      <h2>{quote.symbol} live</h2>
+      <p>LTP: {quote.ltp} <small>({quote.time})</small></p>
+      {alerts.map(a => <p key={a.id}>🔔 {a.date}: {a.message}</p>)}
+    </div>
+  );
+}
 
 function App(){
   const [url, setUrl] = useState("");
@@ -24,6 +47,8 @@ function App(){
         <button className="bg-blue-600 text-white px-4 py-2 rounded">Predict</button>
       </form>
 
+      <LiveQuote symbol={result?.symbol || ""} />
+
       {result && (
         <div className="mt-6 p-4 border rounded">
           <h2>Results</h2>
@@ -0,0 +1,41 @@
+# migrations/env.py
+from logging.config import fileConfig
+
+from alembic import context
+from alembic.ddl.impl import DefaultImpl
+from sqlalchemy import create_engine, pool
+
+from utils.config import build_connection_string
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# Raw-SQL project: no ORM metadata, migrations are written by hand
+target_metadata = None
+
+
+class DuckDBImpl(DefaultImpl):
+    """Lets Alembic run against duckdb_engine (DB_BACKEND=duckdb)."""
+    __dialect__ = "duckdb"
+
+
+def run_migrations_offline() -> None:
+    context.configure(url=build_connection_string(), target_metadata=target_metadata,
+                      literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    engine = create_engine(build_connection_string(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,47 @@
+"""market_history baseline
+
+Creates dbo.market_history (plain market_history on SQLite/DuckDB) for fresh
+databases; existing databases (where the table was created by hand) are left
+untouched.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.sql_dialect import SqlDialect
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+PRICE = sa.Numeric(18, 2)
+
+
+def upgrade() -> None:
+    schema = SqlDialect(op.get_bind().dialect.name).schema
+    if sa.inspect(op.get_bind()).has_table("market_history", schema=schema):
+        return
+    op.create_table(
+        "market_history",
+        sa.Column("unnamed", sa.String(50)),
+        sa.Column("date", sa.Date, nullable=False),
+        sa.Column("trading_code", sa.String(50), nullable=False),
+        sa.Column("ltp", PRICE),
+        sa.Column("high", PRICE),
+        sa.Column("low", PRICE),
+        sa.Column("openp", PRICE),
+        sa.Column("closep", PRICE),
+        sa.Column("ycp", PRICE),
+        sa.Column("trade", sa.BigInteger),
+        sa.Column("value_mn", sa.Numeric(18, 4)),
+        sa.Column("volume", sa.BigInteger),
+        schema=schema,
+    )
+
+
+def downgrade() -> None:
+    # Never drop market data on downgrade
+    pass
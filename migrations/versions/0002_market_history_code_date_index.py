@@ -0,0 +1,72 @@
+"""market_history (trading_code, date) unique index
+
+Removes rows without a trading_code/date and duplicate (trading_code, date)
+rows left by repeated downloads, makes both key columns NOT NULL, then adds a
+unique index on (trading_code, date). The index is CLUSTERED when the table
+is still a heap; otherwise it is a nonclustered index INCLUDE-ing the price
+columns so history reads stay covered. On SQLite/DuckDB the key columns are
+already NOT NULL (0001) and a plain unique index is created.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.sql_dialect import SqlDialect
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "UX_market_history_code_date"
+INCLUDE_COLUMNS = ["ltp", "high", "low", "openp", "closep", "ycp", "trade", "value_mn", "volume"]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    sql = SqlDialect(bind.dialect.name)
+    table = sql.table("market_history")
+
+    # 1️⃣ Dedupe (keep one arbitrary row per key) and drop keyless rows
+    op.execute(f"DELETE FROM {table} WHERE trading_code IS NULL OR date IS NULL")
+    if sql.is_mssql:
+        op.execute(f"""
+            WITH ranked AS (
+                SELECT ROW_NUMBER() OVER (PARTITION BY trading_code, date ORDER BY (SELECT NULL)) AS rn
+                FROM {table}
+            )
+            DELETE FROM ranked WHERE rn > 1
+        """)
+    else:
+        op.execute(f"""
+            DELETE FROM {table} WHERE rowid NOT IN (
+                SELECT MIN(rowid) FROM {table} GROUP BY trading_code, date
+            )
+        """)
+
+    # 2️⃣ Key columns NOT NULL (hand-made SQL Server tables)
+    has_clustered = False
+    if sql.is_mssql:
+        op.alter_column("market_history", "trading_code", existing_type=sa.String(50), nullable=False, schema="dbo")
+        op.alter_column("market_history", "date", existing_type=sa.Date, nullable=False, schema="dbo")
+        has_clustered = bind.execute(sa.text("""
+            SELECT COUNT(*) FROM sys.indexes
+            WHERE object_id = OBJECT_ID('dbo.market_history') AND type = 1
+        """)).scalar()
+
+    # 3️⃣ Unique (trading_code, date) index
+    op.create_index(
+        INDEX_NAME, "market_history", ["trading_code", "date"], unique=True, schema=sql.schema,
+        mssql_clustered=not has_clustered,
+        mssql_include=INCLUDE_COLUMNS if has_clustered else None,
+    )
+
+
+def downgrade() -> None:
+    sql = SqlDialect(op.get_bind().dialect.name)
+    op.drop_index(INDEX_NAME, table_name="market_history", schema=sql.schema)
+    if sql.is_mssql:
+        op.alter_column("market_history", "date", existing_type=sa.Date, nullable=True, schema="dbo")
+        op.alter_column("market_history", "trading_code", existing_type=sa.String(50), nullable=True, schema="dbo")
@@ -0,0 +1,60 @@
+"""symbols dimension and market_summary tables
+
+dbo.symbols holds one row per trading code (date range + row count) and is
+maintained by MarketHistoryLoader, so code lists no longer need
+SELECT DISTINCT over the fact table. dbo.market_summary (previously created
+on demand by refresh_summary) is now created here.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.sql_dialect import SqlDialect
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    sql = SqlDialect(op.get_bind().dialect.name)
+    op.create_table(
+        "symbols",
+        sa.Column("trading_code", sa.String(50), primary_key=True),
+        sa.Column("first_date", sa.Date),
+        sa.Column("last_date", sa.Date),
+        sa.Column("row_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.current_timestamp()),
+        schema=sql.schema,
+    )
+    op.execute(f"""
+        INSERT INTO {sql.table("symbols")} (trading_code, first_date, last_date, row_count)
+        SELECT trading_code, MIN(date), MAX(date), COUNT(*)
+        FROM {sql.table("market_history")}
+        GROUP BY trading_code
+    """)
+
+    if not sa.inspect(op.get_bind()).has_table("market_summary", schema=sql.schema):
+        op.create_table(
+            "market_summary",
+            sa.Column("trading_code", sa.String(50), primary_key=True),
+            sa.Column("first_date", sa.Date),
+            sa.Column("last_date", sa.Date),
+            sa.Column("row_count", sa.Integer),
+            sa.Column("last_close", sa.Float),
+            sa.Column("min_close", sa.Float),
+            sa.Column("max_close", sa.Float),
+            sa.Column("avg_close", sa.Float),
+            sa.Column("std_close", sa.Float),
+            sa.Column("refreshed_at", sa.DateTime),
+            schema=sql.schema,
+        )
+
+
+def downgrade() -> None:
+    schema = SqlDialect(op.get_bind().dialect.name).schema
+    op.drop_table("market_summary", schema=schema)
+    op.drop_table("symbols", schema=schema)
@@ -0,0 +1,51 @@
+"""weekly / monthly OHLCV rollup tables
+
+dbo.market_history_weekly (DSE weeks, Sunday start) and
+dbo.market_history_monthly hold one row per trading code and bucket, keyed by
+(trading_code, period_start). ``date`` is the last trading day in the bucket,
+so rollup frames have the same columns as daily history. MarketHistoryLoader
+keeps them current; fill them for existing data with the ``rollup_rebuild``
+job.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.sql_dialect import SqlDialect
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+PRICE = sa.Numeric(18, 2)
+ROLLUP_TABLES = ("market_history_weekly", "market_history_monthly")
+
+
+def upgrade() -> None:
+    schema = SqlDialect(op.get_bind().dialect.name).schema
+    for name in ROLLUP_TABLES:
+        op.create_table(
+            name,
+            sa.Column("trading_code", sa.String(50), primary_key=True),
+            sa.Column("period_start", sa.Date, primary_key=True),
+            sa.Column("date", sa.Date, nullable=False),
+            sa.Column("ltp", PRICE),
+            sa.Column("high", PRICE),
+            sa.Column("low", PRICE),
+            sa.Column("openp", PRICE),
+            sa.Column("closep", PRICE),
+            sa.Column("trade", sa.BigInteger),
+            sa.Column("value_mn", sa.Numeric(18, 4)),
+            sa.Column("volume", sa.BigInteger),
+            sa.Column("days", sa.Integer, nullable=False),
+            schema=schema,
+        )
+
+
+def downgrade() -> None:
+    schema = SqlDialect(op.get_bind().dialect.name).schema
+    for name in ROLLUP_TABLES:
+        op.drop_table(name, schema=schema)
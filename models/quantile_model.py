@@ -1,10 +1,6 @@
 from crewai import Agent
 import pandas as pd
-from models.utils import load_model
-
-import numpy as np
-import joblib
-from crewai import Agent
+from models.utils import MODEL_FILES, load_model
 import os
 from typing import ClassVar, Optional, List, Dict, Any
 
@@ -30,14 +26,14 @@ class ModelAgent(Agent):
             # ------------------------
             # 2️⃣ Load models dynamically
             # ------------------------
-            upper_path = "models/quantile_q90.pkl"
-            lower_path = "models/quantile_q10.pkl"
+            upper_path = MODEL_FILES["upper"]
+            lower_path = MODEL_FILES["lower"]
 
             if not os.path.exists(upper_path) or not os.path.exists(lower_path):
                 raise FileNotFoundError("Quantile models not found")
 
-            model_upper = joblib.load(upper_path)
-            model_lower = joblib.load(lower_path)
+            model_upper = load_model(upper_path)
+            model_lower = load_model(lower_path)
 
             # ------------------------
             # 3️⃣ Predict upper/lower limits
@@ -0,0 +1,126 @@
+# models/train_quantile.py
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sklearn.ensemble import GradientBoostingRegressor
+from typing import Callable, Dict, Optional, Sequence
+from services.sharemarket_service import ShareMarketService
+from models.utils import DEFAULT_QUANTILES, MODEL_FILES
+
+# Must match the keys FeatureAgent (agents_pipeline) produces for the first chart axis
+FEATURE_COLUMNS = ["axis_0_slope", "axis_0_y_mean"]
+MODEL_PATHS = {0.1: MODEL_FILES["lower"], 0.9: MODEL_FILES["upper"]}
+DEFAULT_HORIZONS = (5, 10, 30, 60)
+
+
+def window_features(closes: np.ndarray, window: int) -> pd.DataFrame:
+    """Slope-vs-index and mean of every trailing ``window`` of closes, via cumulative sums (no Python loop)."""
+    n = len(closes)
+    if n < window:
+        return pd.DataFrame(columns=FEATURE_COLUMNS)
+
+    idx = np.arange(n, dtype=np.float64)
+    cy = np.concatenate(([0.0], np.cumsum(closes)))
+    cxy = np.concatenate(([0.0], np.cumsum(closes * idx)))
+    sum_y = cy[window:] - cy[:-window]
+    starts = np.arange(n - window + 1, dtype=np.float64)
+    # sum(local_x * y) where local_x = global_idx - start
+    sum_xy = (cxy[window:] - cxy[:-window]) - starts * sum_y
+
+    x_mean = (window - 1) / 2.0
+    sxx = float(np.sum((np.arange(window) - x_mean) ** 2))
+    slope = (sum_xy - x_mean * sum_y) / sxx
+    return pd.DataFrame({"axis_0_slope": slope, "axis_0_y_mean": sum_y / window})
+
+
+def build_training_sets(closes: np.ndarray, window: int, horizons: Sequence[int]):
+    """Features computed once; for each horizon h, the leading rows paired with close at t + h."""
+    feats = window_features(closes, window)
+    sets = {}
+    for h in horizons:
+        n_targets = len(closes) - (window - 1) - h
+        if n_targets <= 0:
+            sets[h] = (feats.iloc[:0], np.empty(0))
+        else:
+            sets[h] = (feats.iloc[:n_targets], closes[window - 1 + h:][:n_targets])
+    return sets
+
+
+def build_training_set(closes: np.ndarray, window: int, horizon: int):
+    """Features for each window ending at t, target = close at t + horizon."""
+    return build_training_sets(closes, window, [horizon])[horizon]
+
+
+def train_quantile_models(db_manager, window: int = 60, horizon: int = 30,
+                          progress: Optional[Callable[[int, int], None]] = None,
+                          horizons: Sequence[int] = DEFAULT_HORIZONS,
+                          quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, object]:
+    """
+    Fit one gradient-boosting quantile model per (horizon, quantile) and save them as a
+    single bundle (MODEL_FILES["bundle"]), plus the q10/q90 models for ``horizon``
+    at the legacy paths. Closes are read and window features built once per code.
+    """
+    horizons = sorted(set(int(h) for h in horizons) | {horizon})
+    quantiles = sorted(set(float(q) for q in quantiles) | set(MODEL_PATHS))
+
+    service = ShareMarketService(db_manager)
+    session = db_manager.get_session()
+    try:
+        dialect = db_manager.sql
+        codes = [r[0] for r in session.execute(text(f"SELECT trading_code FROM {dialect.table('symbols')}")).fetchall()]
+        parts = {h: ([], []) for h in horizons}
+        rows = 0
+        # Slices of the shared memory-mapped panel when it is current, else one query per code
+        panel = service.price_panel()
+        for i, code in enumerate(codes):
+            if panel is not None and code in panel:
+                closes = panel.symbol(code, ["closep"])["closep"].astype(np.float64)
+                closes = closes[~np.isnan(closes)]
+            else:
+                closes = service.fetch_arrays(f"""
+                    SELECT closep FROM {dialect.table("market_history")}
+                    WHERE trading_code = :code AND closep IS NOT NULL
+                    ORDER BY date ASC
+                """, {"code": code}, {"closep": np.float64})["closep"]
+            rows += len(closes)
+            for h, (X, y) in build_training_sets(closes, window, horizons).items():
+                if len(y):
+                    parts[h][0].append(X)
+                    parts[h][1].append(y)
+            if progress:
+                progress(rows, i + 1)
+    finally:
+        session.close()
+
+    if not parts[horizon][1]:
+        raise ValueError(f"Not enough history to train (need > {window + horizon} rows for at least one code)")
+
+    models, samples = {}, {}
+    for h in horizons:
+        if not parts[h][1]:
+            continue
+        X_all = pd.concat(parts[h][0], ignore_index=True)
+        y_all = np.concatenate(parts[h][1])
+        samples[h] = int(len(y_all))
+        for alpha in quantiles:
+            model = GradientBoostingRegressor(loss="quantile", alpha=alpha, n_estimators=200, max_depth=3)
+            model.fit(X_all, y_all)
+            models[(h, alpha)] = model
+
+    # "horizon" is what the legacy q10/q90 models predict; fallback bands are scaled from it
+    bundle = {"window": window, "features": FEATURE_COLUMNS, "horizon": horizon, "horizons": sorted(samples),
+              "quantiles": quantiles, "models": models}
+    joblib.dump(bundle, MODEL_FILES["bundle"])
+    for alpha, path in MODEL_PATHS.items():
+        joblib.dump(models[(horizon, alpha)], path)
+
+    return {"samples": samples[horizon], "samples_by_horizon": samples, "codes": len(codes), "rows": rows,
+            "window": window, "horizon": horizon, "horizons": sorted(samples), "quantiles": quantiles,
+            "models": list(MODEL_PATHS.values()) + [MODEL_FILES["bundle"]]}
@@ -1,5 +1,84 @@
 # models/utils.py
-import joblib
+import datetime
+import os
+import threading
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from utils.metrics import inc, timed
+
+# Quantile models used by the prediction pipeline (written by models/train_quantile.py)
+MODEL_FILES = {
+    "upper": "models/quantile_q90.pkl",
+    "lower": "models/quantile_q10.pkl",
+    # {(horizon_days, quantile): model} for every trained horizon, see train_quantile_models
+    "bundle": "models/quantile_bundle.pkl",
+}
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+# Horizon (days) of the q10/q90 models when the bundle does not say (train_quantile_models default)
+DEFAULT_BASE_HORIZON = 30
+
+# path -> (mtime, model); MODEL_INFO[path] is what /status reports
+_model_cache: Dict[str, Any] = {}
+_model_lock = threading.Lock()
+MODEL_INFO: Dict[str, Dict[str, Any]] = {}
+
 
 def load_model(path):
-    return joblib.load(path)
\ No newline at end of file
+    """Load a pickled model once and reuse it until the file on disk changes (e.g. after a retrain job)."""
+    mtime = os.path.getmtime(path)
+    with _model_lock:
+        cached = _model_cache.get(path)
+        if cached and cached[0] == mtime:
+            inc("model_cache_total", result="hit")
+            return cached[1]
+
+        import joblib  # deferred so importing models.utils stays cheap
+
+        inc("model_cache_total", result="miss")
+        started = datetime.datetime.utcnow()
+        with timed("model_load"):
+            model = joblib.load(path)
+        _model_cache[path] = (mtime, model)
+        MODEL_INFO[path] = {
+            "version": datetime.datetime.utcfromtimestamp(mtime).isoformat() + "Z",
+            "loaded_at": started.isoformat() + "Z",
+            "load_seconds": round((datetime.datetime.utcnow() - started).total_seconds(), 4),
+        }
+        return model
+
+
+def predict_bands(bundle: Dict[str, Any], X, horizons: Sequence[int],
+                  quantiles: Optional[Sequence[float]] = None) -> Tuple[Dict[int, Dict[float, float]], Dict[int, List[float]]]:
+    """
+    ({horizon: {quantile: value}}, {horizon: [quantiles the bundle lacks]}) from one feature row
+    ``X`` for every requested horizon the bundle has. Values are sorted across quantiles so
+    bands never cross.
+    """
+    X = X.reindex(columns=bundle["features"])
+    quantiles = sorted(quantiles or bundle["quantiles"])
+    out, unavailable = {}, {}
+    for h in horizons:
+        qs = [q for q in quantiles if (h, q) in bundle["models"]]
+        if qs:
+            values = np.sort([float(bundle["models"][(h, q)].predict(X)[0]) for q in qs])
+            out[h] = dict(zip(qs, values.tolist()))
+            if len(qs) < len(quantiles):
+                unavailable[h] = [q for q in quantiles if q not in out[h]]
+    return out, unavailable
+
+
+def scaled_bands(lower: float, upper: float, base_horizon: int, horizons: Sequence[int],
+                 quantiles: Sequence[float], base_quantile: float = 0.9) -> Dict[int, Dict[float, float]]:
+    """
+    Extrapolate one (lower, upper) band, produced for ``base_horizon`` days at the
+    (1 - base_quantile, base_quantile) quantiles, to other horizons/quantiles
+    (normal, sqrt-of-time spread).
+    """
+    center, half = (upper + lower) / 2.0, (upper - lower) / 2.0
+    z_base = NormalDist().inv_cdf(base_quantile)
+    out = {}
+    for h in horizons:
+        scale = half * np.sqrt(h / base_horizon) / z_base
+        out[h] = {q: round(center + scale * NormalDist().inv_cdf(q), 4) for q in sorted(quantiles)}
+    return out
@@ -0,0 +1,283 @@
+"""
+Price alerts evaluated incrementally on ingest.
+
+Users register rules per trading code in a local SQLite store
+(ALERTS_DB_PATH):
+
+    buy_below   {"price": p}                 close crosses down to / below p
+    sell_above  {"price": p}                 close crosses up to / above p
+    move_pct    {"pct": n}                   |close / previous close - 1| >= n %
+    band_break  {"lower": l, "upper": u}     close leaves a quantile band (e.g. /predict "bands")
+
+MarketHistoryLoader hands every committed batch to ``AlertEngine.evaluate``.
+Only codes that have rules are looked at (an in-memory set, refreshed when
+rules change), only their rules are read (indexed by trading_code) and each
+rule only sees rows newer than the last date it evaluated, so the cost
+follows the new rows rather than the number of rules or the history length.
+Firings are stored in ``alert_events`` and POSTed to ALERT_WEBHOOK_URL when
+set (otherwise just logged).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ALERTS_DB_PATH = os.getenv("ALERTS_DB_PATH", os.path.join("db", "alerts.sqlite"))
+ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL", "")
+
+# kind -> required numeric params
+RULE_KINDS = {
+    "buy_below": ("price",),
+    "sell_above": ("price",),
+    "move_pct": ("pct",),
+    "band_break": ("lower", "upper"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trading_code TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    note TEXT,
+    active INTEGER NOT NULL DEFAULT 1,
+    last_close REAL,
+    last_date TEXT,
+    fired_count INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_alert_rules_code ON alert_rules (trading_code, active);
+CREATE TABLE IF NOT EXISTS alert_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rule_id INTEGER NOT NULL,
+    trading_code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    close REAL NOT NULL,
+    message TEXT NOT NULL,
+    fired_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_alert_events_fired ON alert_events (fired_at);
+"""
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        out = float(value)
+    except (TypeError, ValueError):
+        return None
+    return out if out == out else None
+
+
+def check_rule(kind: str, params: Dict[str, float], prev: Optional[float], close: float) -> Optional[str]:
+    """Message when ``close`` (after ``prev``, None if unknown) triggers the rule, else None."""
+    if kind == "buy_below":
+        level = params["price"]
+        if close <= level and (prev is None or prev > level):
+            return f"closed at {close:.2f}, at/below buy level {level:.2f}"
+    elif kind == "sell_above":
+        level = params["price"]
+        if close >= level and (prev is None or prev < level):
+            return f"closed at {close:.2f}, at/above sell level {level:.2f}"
+    elif kind == "move_pct":
+        if prev:
+            change = (close / prev - 1.0) * 100.0
+            if abs(change) >= params["pct"]:
+                return f"moved {change:+.2f}% to {close:.2f} (threshold {params['pct']:.2f}%)"
+    elif kind == "band_break":
+        lower, upper = params["lower"], params["upper"]
+        inside_before = prev is None or lower <= prev <= upper
+        if inside_before and not lower <= close <= upper:
+            side = "below" if close < lower else "above"
+            return f"closed at {close:.2f}, {side} band [{lower:.2f}, {upper:.2f}]"
+    return None
+
+
+class AlertEngine:
+    """SQLite-backed rule store plus the incremental evaluator."""
+    def __init__(self, db_path: str = ALERTS_DB_PATH, webhook_url: str = ALERT_WEBHOOK_URL):
+        self.db_path = db_path
+        self.webhook_url = webhook_url
+        self._codes: Optional[Set[str]] = None
+        self._data_version: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        rule = dict(row)
+        if "params" in rule:
+            rule["params"] = json.loads(rule["params"])
+        if "active" in rule:
+            rule["active"] = bool(rule["active"])
+        return rule
+
+    # -----------------------------------------------------------
+    # 🔹 Rules
+    # -----------------------------------------------------------
+    def add_rule(self, trading_code: str, kind: str, params: Dict[str, Any], note: Optional[str] = None,
+                 latest: Optional[tuple] = None) -> Dict[str, Any]:
+        """
+        Store a rule. ``latest`` = (date, close) of the newest stored row for the code
+        (ShareMarketService.latest_close): the rule starts from there, so rows already stored
+        (e.g. a re-ingested file) never fire it.
+        """
+        if kind not in RULE_KINDS:
+            raise ValueError(f"Unknown alert kind '{kind}' (expected one of {sorted(RULE_KINDS)})")
+        clean = {}
+        for name in RULE_KINDS[kind]:
+            value = _float(params.get(name))
+            if value is None:
+                raise ValueError(f"'{kind}' alerts need a numeric '{name}'")
+            clean[name] = value
+        if kind == "band_break" and clean["lower"] > clean["upper"]:
+            raise ValueError("band_break needs lower <= upper")
+        if kind == "move_pct" and clean["pct"] <= 0:
+            raise ValueError("move_pct needs pct > 0")
+
+        code = trading_code.strip().upper()
+        last_date, last_close = (str(latest[0])[:10], _float(latest[1])) if latest else (None, None)
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "INSERT INTO alert_rules (trading_code, kind, params, note, last_close, last_date, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (code, kind, json.dumps(clean), note, last_close, last_date, time.time()))
+            row = conn.execute("SELECT * FROM alert_rules WHERE id = ?", (cur.lastrowid,)).fetchone()
+        logger.info(f"🔔 Added {kind} alert {cur.lastrowid} for {code}")
+        return self._row_to_dict(row)
+
+    def delete_rule(self, rule_id: int) -> bool:
+        with closing(self._connect()) as conn:
+            return bool(conn.execute("DELETE FROM alert_rules WHERE id = ?", (rule_id,)).rowcount)
+
+    def list_rules(self, trading_code: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql, args = "SELECT * FROM alert_rules", []
+        if trading_code:
+            sql += " WHERE trading_code = ?"
+            args.append(trading_code.strip().upper())
+        with closing(self._connect()) as conn:
+            return [self._row_to_dict(r) for r in conn.execute(sql + " ORDER BY trading_code, id", args).fetchall()]
+
+    def events(self, limit: int = 50, trading_code: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql, args = "SELECT * FROM alert_events", []
+        if trading_code:
+            sql += " WHERE trading_code = ?"
+            args.append(trading_code.strip().upper())
+        sql += " ORDER BY fired_at DESC, id DESC LIMIT ?"
+        args.append(limit)
+        with closing(self._connect()) as conn:
+            return [dict(r) for r in conn.execute(sql, args).fetchall()]
+
+    def last_event_id(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM alert_events").fetchone()[0]
+
+    def events_after(self, event_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        """Events with id > ``event_id``, oldest first (used to tail firings from other processes)."""
+        with closing(self._connect()) as conn:
+            return [dict(r) for r in conn.execute(
+                "SELECT * FROM alert_events WHERE id > ? ORDER BY id LIMIT ?", (event_id, limit)).fetchall()]
+
+    # -----------------------------------------------------------
+    # 🔹 Incremental evaluation
+    # -----------------------------------------------------------
+    def _watched_codes(self, conn: sqlite3.Connection) -> Set[str]:
+        """Codes with active rules; re-read only when rules were added or removed (by any process)."""
+        key = tuple(conn.execute("SELECT COUNT(*), MAX(id) FROM alert_rules WHERE active = 1").fetchone())
+        with self._lock:
+            if self._codes is None or self._data_version != key:
+                self._codes = {r[0] for r in conn.execute(
+                    "SELECT DISTINCT trading_code FROM alert_rules WHERE active = 1").fetchall()}
+                self._data_version = key
+            return self._codes
+
+    def evaluate(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Check the rules of every code in ``records`` (dicts with trading_code, date, closep, ycp) against those rows."""
+        with closing(self._connect()) as conn:
+            watched = self._watched_codes(conn)
+            if not watched:
+                return []
+            rows_by_code: Dict[str, List[Dict[str, Any]]] = {}
+            for r in records:
+                code = r.get("trading_code")
+                if code in watched and _float(r.get("closep")) is not None:
+                    rows_by_code.setdefault(code, []).append(r)
+            if not rows_by_code:
+                return []
+
+            codes = sorted(rows_by_code)
+            rules = conn.execute(
+                f"SELECT * FROM alert_rules WHERE active = 1 AND trading_code IN ({', '.join('?' * len(codes))})",
+                codes).fetchall()
+
+            now, fired, state = time.time(), [], []
+            for rule in map(self._row_to_dict, rules):
+                rows = sorted(rows_by_code[rule["trading_code"]], key=lambda r: str(r["date"]))
+                prev, last_date, count = rule["last_close"], rule["last_date"], 0
+                for r in rows:
+                    date = str(r["date"])[:10]
+                    if last_date is not None and date <= last_date:
+                        continue   # already evaluated (re-ingest of the same rows)
+                    close = _float(r["closep"])
+                    message = check_rule(rule["kind"], rule["params"], _float(r.get("ycp")) or prev, close)
+                    if message:
+                        fired.append({"rule_id": rule["id"], "trading_code": rule["trading_code"], "date": date,
+                                      "kind": rule["kind"], "close": close, "message": message, "fired_at": now})
+                        count += 1
+                    prev, last_date = close, date
+                state.append((prev, last_date, count, rule["id"]))
+
+            conn.execute("BEGIN")
+            conn.executemany("UPDATE alert_rules SET last_close = ?, last_date = ?, fired_count = fired_count + ? "
+                             "WHERE id = ?", state)
+            conn.executemany("INSERT INTO alert_events (rule_id, trading_code, date, kind, close, message, fired_at) "
+                             "VALUES (:rule_id, :trading_code, :date, :kind, :close, :message, :fired_at)", fired)
+            conn.execute("COMMIT")
+
+        if fired:
+            self._deliver(fired)
+        return fired
+
+    def _deliver(self, events: List[Dict[str, Any]]):
+        for e in events:
+            logger.info(f"🔔 {e['trading_code']} {e['date']}: {e['message']} (rule {e['rule_id']})")
+        if self.webhook_url:
+            # Off the ingest path; a failed POST only loses the notification, the event row is already stored
+            threading.Thread(target=self._post, args=(events,), name="alert-webhook", daemon=True).start()
+
+    def _post(self, events: List[Dict[str, Any]]):
+        import requests
+
+        try:
+            requests.post(self.webhook_url, json={"events": events}, timeout=10).raise_for_status()
+        except Exception as e:
+            logger.error(f"❌ Alert webhook failed: {e}")
+
+
+_engine: Optional[AlertEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine() -> AlertEngine:
+    """Process-wide AlertEngine on ALERTS_DB_PATH."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AlertEngine()
+        return _engine
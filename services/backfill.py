@@ -0,0 +1,199 @@
+"""
+Rebuild market_history from local history archives, without the network.
+
+Every download leaves ``db/<CODE>_history.xlsx`` behind, and exports from
+elsewhere can sit next to them (``<CODE>_history.csv``, or any CSV/XLSX
+passed explicitly that has a trading_code column). The backfill:
+
+    discover archives -> parse + normalize in a process pool (Excel parsing is CPU-bound)
+                      -> drop (trading_code, date) keys already stored or seen this run
+                      -> MarketHistoryLoader.load_records, one transaction per file
+
+Files are parsed largest first with at most 2 x workers in flight, so the
+pool stays busy while the parent loads and memory stays bounded whatever
+the archive size. Alert rules are not evaluated: archived rows are
+history, not new closes.
+
+    python services/backfill.py                        # every *_history.* under ARCHIVE_DIRS
+    python services/backfill.py db exports/DSE.csv --workers 8
+    python services/backfill.py --dry-run              # parse and dedupe only
+"""
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import itertools
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from utils.database_manager import DatabaseManager
+from services.market_loader import MARKET_HISTORY_COLUMNS, MarketHistoryLoader, iter_history_chunks
+from services.sharemarket_service import ShareMarketService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIRS = [p for p in os.getenv("ARCHIVE_DIRS", "db").split(os.pathsep) if p]
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "0")) or os.cpu_count() or 1
+ARCHIVE_EXTENSIONS = (".xlsx", ".xlsm", ".csv")
+ARCHIVE_SUFFIX = "_history"
+KEY_QUERY_CODES = 500      # codes per stored-key query (SQL Server allows 2100 parameters)
+
+
+def archive_symbol(path: str) -> Optional[str]:
+    """``ACI_history.xlsx`` -> ``ACI``; None for other names."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if stem.lower().endswith(ARCHIVE_SUFFIX) and len(stem) > len(ARCHIVE_SUFFIX):
+        return stem[:-len(ARCHIVE_SUFFIX)].strip().upper()
+    return None
+
+
+def discover_archives(paths: Optional[Iterable[str]] = None) -> List[Tuple[str, Optional[str]]]:
+    """
+    (path, symbol) for every explicit file and every ``*_history.{xlsx,xlsm,csv}``
+    under the given directories (default ARCHIVE_DIRS, recursive), largest first.
+    """
+    found: Dict[str, Optional[str]] = {}
+    for root in paths or ARCHIVE_DIRS:
+        if os.path.isfile(root):
+            found[os.path.abspath(root)] = archive_symbol(root)
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                # "~$..." are Excel lock files of open workbooks
+                if name.startswith("~$") or not name.lower().endswith(ARCHIVE_EXTENSIONS):
+                    continue
+                symbol = archive_symbol(name)
+                if symbol:
+                    found[os.path.abspath(os.path.join(dirpath, name))] = symbol
+    return sorted(found.items(), key=lambda item: os.path.getsize(item[0]), reverse=True)
+
+
+def parse_archive(path: str, symbol: Optional[str], chunk_rows: int = 50_000) -> pd.DataFrame:
+    """One archive as a normalized market_history frame (runs in a pool process)."""
+    frames = [MarketHistoryLoader.normalize_frame(chunk, symbol) for chunk in iter_history_chunks(path, chunk_rows)]
+    if not frames:
+        return pd.DataFrame(columns=MARKET_HISTORY_COLUMNS)
+    return pd.concat(frames, ignore_index=True).drop_duplicates(subset=["trading_code", "date"], keep="last")
+
+
+def _days(dates: Any) -> np.ndarray:
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int32)
+
+
+class ArchiveBackfill:
+    """Parse archives in a process pool and load only rows whose (trading_code, date) is not stored yet."""
+    def __init__(self, db_manager: DatabaseManager, workers: int = BACKFILL_WORKERS, batch_size: int = 1000):
+        self.db_manager = db_manager
+        self.workers = max(1, workers)
+        self.loader = MarketHistoryLoader(db_manager, batch_size=batch_size, evaluate_alerts=False)
+        self.service = ShareMarketService(db_manager)
+        # code -> sorted days (since epoch) stored or loaded, read once per code
+        self._known: Dict[str, np.ndarray] = {}
+
+    # -----------------------------------------------------------
+    # 🔹 Dedupe against stored keys
+    # -----------------------------------------------------------
+    def _load_keys(self, codes: List[str]):
+        missing = [c for c in codes if c not in self._known]
+        table = self.db_manager.sql.table("market_history")
+        for start in range(0, len(missing), KEY_QUERY_CODES):
+            batch = missing[start:start + KEY_QUERY_CODES]
+            params = {f"c{i}": code for i, code in enumerate(batch)}
+            arrays = self.service.fetch_arrays(
+                f"SELECT trading_code, date FROM {table} WHERE trading_code IN ({', '.join(':' + k for k in params)})",
+                params, {"trading_code": object, "date": "datetime64[ns]"})
+            stored = pd.Series(_days(arrays["date"])).groupby(arrays["trading_code"]) if len(arrays["date"]) else {}
+            for code in batch:
+                self._known[code] = np.empty(0, dtype=np.int32)
+            for code, days in stored:
+                self._known[code] = np.unique(days.to_numpy())
+
+    def new_rows(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Rows of ``frame`` whose key is neither in market_history nor loaded earlier in this run."""
+        if frame.empty:
+            return frame
+        self._load_keys(sorted(frame["trading_code"].unique()))
+        days = _days(frame["date"].to_numpy())
+        keep = np.ones(len(frame), dtype=bool)
+        for code, idx in frame.groupby("trading_code").indices.items():
+            keep[idx] = ~np.isin(days[idx], self._known[code])
+        return frame[keep]
+
+    def _remember(self, loaded: pd.DataFrame):
+        days = _days(loaded["date"].to_numpy())
+        for code, idx in loaded.groupby("trading_code").indices.items():
+            self._known[code] = np.union1d(self._known[code], days[idx])
+
+    # -----------------------------------------------------------
+    # 🔹 Parse (pool) -> dedupe -> load (this process)
+    # -----------------------------------------------------------
+    def run(self, archives: List[Tuple[str, Optional[str]]],
+            on_file: Optional[Callable[[int, Dict[str, Any]], None]] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Load ``archives`` ((path, symbol) pairs); ``on_file(files_done, totals)`` is called after each file."""
+        started = time.perf_counter()
+        totals: Dict[str, Any] = {"files": len(archives), "parsed": 0, "loaded": 0, "duplicates": 0,
+                                  "failed": {}, "workers": self.workers}
+        queue = iter(archives)
+        files_done = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            inflight = {}
+
+            def refill():
+                for path, symbol in itertools.islice(queue, 2 * self.workers - len(inflight)):
+                    inflight[pool.submit(parse_archive, path, symbol)] = path
+
+            refill()
+            while inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = os.path.basename(inflight.pop(future))
+                    try:
+                        frame = future.result()
+                        fresh = self.new_rows(frame)
+                        loaded = len(fresh) if dry_run else self.loader.load_records(
+                            MarketHistoryLoader.frame_records(fresh))
+                        self._remember(fresh)
+                        totals["parsed"] += len(frame)
+                        totals["loaded"] += loaded
+                        totals["duplicates"] += len(frame) - len(fresh)
+                        logger.info(f"✅ {name}: {len(frame)} rows parsed, {loaded} new")
+                    except Exception as e:
+                        totals["failed"][name] = str(e)
+                        logger.error(f"❌ Backfill failed for {name}: {e}")
+                    files_done += 1
+                    if on_file:
+                        on_file(files_done, totals)
+                refill()
+
+        totals["seconds"] = round(time.perf_counter() - started, 2)
+        logger.info(f"✅ Backfill {'(dry run) ' if dry_run else ''}done: {totals['loaded']} new rows from "
+                    f"{totals['files']} files in {totals['seconds']}s ({len(totals['failed'])} failed)")
+        return totals
+
+
+if __name__ == "__main__":
+    from utils.config import build_connection_string
+
+    parser = argparse.ArgumentParser(description="Load local history archives (XLSX/CSV) into market_history")
+    parser.add_argument("paths", nargs="*", help=f"files or directories (default: {os.pathsep.join(ARCHIVE_DIRS)})")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="parser processes")
+    parser.add_argument("--dry-run", action="store_true", help="parse and dedupe only; report what would load")
+    args = parser.parse_args()
+
+    found = discover_archives(args.paths or None)
+    if not found:
+        sys.exit("No history archives found")
+    print(f"📂 {len(found)} archives, {sum(os.path.getsize(p) for p, _ in found) / 2 ** 20:.1f} MB, "
+          f"{args.workers} workers")
+    manager = DatabaseManager(build_connection_string())
+    try:
+        print(ArchiveBackfill(manager, args.workers).run(found, dry_run=args.dry_run))
+    finally:
+        manager.close()
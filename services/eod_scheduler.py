@@ -0,0 +1,117 @@
+"""
+End-of-day refresh scheduler.
+
+Runs as a small daemon: once per DSE trading day, at EOD_REFRESH_TIME (local
+exchange time), it queues an ``eod_refresh`` job that re-downloads every
+trading code stalest-first, then runs the summary/price-panel/retrain steps in order. Fridays and
+Saturdays (DSE weekend) and dates listed in DSE_HOLIDAYS_FILE are skipped.
+
+    python services/eod_scheduler.py          # run forever
+    python services/eod_scheduler.py --now    # queue one refresh immediately and exit
+
+It only enqueues; the jobs run in the job-runner process
+(``python services/job_handlers.py``, started by app/serve.py).
+"""
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import datetime
+import logging
+import threading
+from typing import Optional, Set
+from zoneinfo import ZoneInfo
+from services.job_handlers import get_job_queue
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EOD_TIMEZONE = os.getenv("EOD_TIMEZONE", "Asia/Dhaka")
+EOD_REFRESH_TIME = os.getenv("EOD_REFRESH_TIME", "15:30")   # DSE closes 14:30
+EOD_CONCURRENCY = int(os.getenv("EOD_CONCURRENCY", "4"))
+DSE_HOLIDAYS_FILE = os.getenv("DSE_HOLIDAYS_FILE", "")
+DSE_WEEKEND = {4, 5}   # Friday, Saturday (date.weekday())
+
+
+def load_holidays(path: str = DSE_HOLIDAYS_FILE) -> Set[datetime.date]:
+    """Read one ISO date per line (``#`` comments allowed)."""
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        lines = (line.split("#")[0].strip() for line in f)
+        return {datetime.date.fromisoformat(line) for line in lines if line}
+
+
+def is_trading_day(day: datetime.date, holidays: Set[datetime.date]) -> bool:
+    return day.weekday() not in DSE_WEEKEND and day not in holidays
+
+
+def next_run_after(now: datetime.datetime, holidays: Set[datetime.date]) -> datetime.datetime:
+    """Next trading-day refresh time strictly after ``now`` (tz-aware)."""
+    hour, minute = (int(p) for p in EOD_REFRESH_TIME.split(":"))
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += datetime.timedelta(days=1)
+    while not is_trading_day(candidate.date(), holidays):
+        candidate += datetime.timedelta(days=1)
+    return candidate
+
+
+class EODScheduler:
+    """Sleeps until the next refresh slot and queues one ``eod_refresh`` job per trading day."""
+    def __init__(self, concurrency: int = EOD_CONCURRENCY, tz: str = EOD_TIMEZONE):
+        self.concurrency = concurrency
+        self.tz = ZoneInfo(tz)
+        # Enqueue only: the dedicated job runner (python services/job_handlers.py) executes the jobs
+        self.queue = get_job_queue(start=False)
+        self._stop = threading.Event()
+
+    def trigger(self, session_date: Optional[datetime.date] = None) -> Optional[str]:
+        """Queue the refresh for ``session_date`` unless one was already queued for it."""
+        session_date = session_date or datetime.datetime.now(self.tz).date()
+        existing = self.queue.find("eod_refresh", {"session_date": session_date.isoformat()},
+                                   statuses=["queued", "running", "succeeded"])
+        if existing:
+            job = existing[0]
+            logger.info(f"ℹ️ EOD refresh for {session_date} already {job['status']} ({job['id']})")
+            return None
+        return self.queue.submit("eod_refresh", {
+            "session_date": session_date.isoformat(),
+            "concurrency": self.concurrency,
+        })
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            holidays = load_holidays()
+            now = datetime.datetime.now(self.tz)
+            run_at = next_run_after(now, holidays)
+            logger.info(f"⏰ Next EOD refresh at {run_at.isoformat()}")
+            if self._stop.wait((run_at - now).total_seconds()):
+                break
+            self.trigger(run_at.date())
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DSE end-of-day refresh scheduler")
+    parser.add_argument("--now", action="store_true", help="queue one refresh immediately and exit when done")
+    args = parser.parse_args()
+
+    scheduler = EODScheduler()
+    if args.now:
+        job_id = scheduler.trigger()
+        # Wait for this refresh, then for the follow-up chain it queued (other jobs are not waited on)
+        while job_id:
+            job = scheduler.queue.get(job_id)
+            while job["status"] in ("queued", "running"):
+                scheduler._stop.wait(5)
+                job = scheduler.queue.get(job_id)
+            logger.info(f"✅ {job['kind']} job {job_id} {job['status']}")
+            job_id = ((job.get("result") or {}).get("follow_up_jobs") or {}).get("chain")
+    else:
+        scheduler.run_forever()
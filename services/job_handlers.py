@@ -0,0 +1,313 @@
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+from utils.config import build_connection_string
+from utils.database_manager import DatabaseManager
+from services.job_queue import JobContext, JobQueue
+from services.market_loader import MarketHistoryLoader
+from services.sharemarket_service import ShareMarketService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("db", "jobs.sqlite"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))   # a dead worker's jobs are retried after this
+DOWNLOAD_FOLDER = "db"
+# Files the ingest job may read (upload drop folder); backfill and research ingest stay inside
+# ARCHIVE_DIRS / RESEARCH_DOCS_DIR, so job params cannot point the server at arbitrary paths
+INGEST_DIR = os.getenv("INGEST_DIR", os.path.join("db", "uploads"))
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def _db_manager() -> DatabaseManager:
+    return DatabaseManager(build_connection_string())
+
+
+def confine_path(path: str, roots: List[str]) -> str:
+    """Resolved ``path`` if it lies inside one of ``roots`` (symlinks followed), else ValueError."""
+    resolved = os.path.realpath(path)
+    for root in roots:
+        root = os.path.realpath(root)
+        if os.path.commonpath([resolved, root]) == root:
+            return resolved
+    raise ValueError(f"'{path}' is outside the allowed directories ({', '.join(roots)})")
+
+
+def _archive_dirs() -> List[str]:
+    from services.backfill import ARCHIVE_DIRS
+
+    return ARCHIVE_DIRS
+
+
+def _research_dirs() -> List[str]:
+    from services.research_index import RESEARCH_DOCS_DIR
+
+    return [RESEARCH_DOCS_DIR]
+
+
+# Job kind -> (path param, allowed roots) checked on submit and again in the handler
+PATH_PARAMS = {
+    "ingest": ("path", lambda: [INGEST_DIR]),
+    "backfill": ("paths", _archive_dirs),
+    "research_ingest": ("root", _research_dirs),
+}
+
+
+def validate_job_params(kind: str, params: Dict[str, Any]):
+    """Reject file-system params that point outside the directories a job kind may read."""
+    if kind not in PATH_PARAMS:
+        return
+    name, roots = PATH_PARAMS[kind]
+    value = params.get(name)
+    if value is None:
+        return
+    for path in value if isinstance(value, list) else [value]:
+        confine_path(str(path), roots())
+
+
+# -----------------------------------------------------------
+# 🔹 Job handlers: handler(ctx, **params) -> result dict
+# -----------------------------------------------------------
+def ingest_job(ctx: JobContext, path: str, symbol: Optional[str] = None, chunk_rows: int = 50_000) -> Dict[str, Any]:
+    path = confine_path(path, [INGEST_DIR])
+    db_manager = _db_manager()
+    try:
+        loader = MarketHistoryLoader(db_manager)
+        ctx.progress(0, message=f"Loading {os.path.basename(path)}")
+        return loader.load_file(path, symbol, chunk_rows, on_chunk=lambda rows: ctx.progress(rows))
+    finally:
+        db_manager.close()
+
+
+def download_and_load(symbol: str, market: str = "DSE", since: Optional[Any] = None,
+                      on_chunk: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+    """Download one symbol's history workbook and load rows newer than ``since``."""
+    from stocksurferbd import PriceData
+
+    symbol = symbol.strip().upper()
+    os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
+    file_path = os.path.join(DOWNLOAD_FOLDER, f"{symbol}_history.xlsx")
+    PriceData().save_history_data(symbol=symbol, file_name=file_path, market=market)
+
+    db_manager = _db_manager()
+    try:
+        result = MarketHistoryLoader(db_manager).load_file(file_path, symbol, on_chunk=on_chunk, since=since)
+    finally:
+        db_manager.close()
+    return {**result, "symbol": symbol, "file": file_path}
+
+
+def download_job(ctx: JobContext, symbol: str, market: str = "DSE", since: Optional[str] = None) -> Dict[str, Any]:
+    ctx.progress(0, message=f"Downloading {symbol.strip().upper()} from {market}")
+    return download_and_load(symbol, market, since, on_chunk=lambda rows: ctx.progress(rows))
+
+
+def summary_refresh_job(ctx: JobContext) -> Dict[str, Any]:
+    db_manager = _db_manager()
+    try:
+        ctx.progress(0, message="Refreshing market_summary")
+        codes = ShareMarketService(db_manager).refresh_summary()
+        ctx.progress(codes)
+        return {"codes": codes}
+    finally:
+        db_manager.close()
+
+
+def price_panel_job(ctx: JobContext) -> Dict[str, Any]:
+    """Rebuild the memory-mapped price panel (services/price_panel.py) from market_history."""
+    from services.price_panel import build_price_panel
+
+    db_manager = _db_manager()
+    try:
+        ctx.progress(0, message="Dumping market_history")
+        return build_price_panel(db_manager)
+    finally:
+        db_manager.close()
+
+
+def rollup_rebuild_job(ctx: JobContext, codes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Rebuild weekly/monthly rollups from daily history (fills them for data loaded before migration 0004)."""
+    from services.rollups import refresh_rollups
+
+    db_manager = _db_manager()
+    try:
+        targets = [c.strip().upper() for c in codes] if codes else list(ShareMarketService(db_manager).get_last_dates())
+        buckets = 0
+        for i, code in enumerate(targets):
+            ctx.check_cancelled()
+            session = db_manager.get_session()
+            try:
+                written = refresh_rollups(session, db_manager.sql, [code])
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+            buckets += sum(written.values())
+            ctx.progress(buckets, message=f"{i + 1}/{len(targets)} codes")
+        return {"codes": len(targets), "buckets": buckets}
+    finally:
+        db_manager.close()
+
+
+def research_ingest_job(ctx: JobContext, root: Optional[str] = None) -> Dict[str, Any]:
+    """(Re)index local news/filings for ResearchAgent; unchanged chunks are never re-embedded."""
+    from services.research_index import RESEARCH_DOCS_DIR, get_research_index
+
+    root = confine_path(root, [RESEARCH_DOCS_DIR]) if root else RESEARCH_DOCS_DIR
+    index = get_research_index()
+    if index is None:
+        raise RuntimeError("Research index unavailable (install chromadb)")
+    return index.ingest_dir(root,
+                            on_file=lambda files, totals: ctx.progress(totals["chunks"], message=f"{files} files"))
+
+
+def retrain_job(ctx: JobContext, window: int = 60, horizon: int = 30,
+                horizons: Optional[List[int]] = None, quantiles: Optional[List[float]] = None) -> Dict[str, Any]:
+    from models.train_quantile import DEFAULT_HORIZONS, DEFAULT_QUANTILES, train_quantile_models
+
+    db_manager = _db_manager()
+    try:
+        return train_quantile_models(
+            db_manager, window=window, horizon=horizon,
+            horizons=horizons or DEFAULT_HORIZONS, quantiles=quantiles or DEFAULT_QUANTILES,
+            progress=lambda rows, codes: ctx.progress(rows, message=f"Read {codes} codes"),
+        )
+    finally:
+        db_manager.close()
+
+
+def chain_job(ctx: JobContext, kinds: List[str]) -> Dict[str, Any]:
+    """Run the handlers of ``kinds`` one after another; a failed step stops the rest."""
+    unknown = [k for k in kinds if k not in ctx.queue.handlers]
+    if unknown:
+        raise ValueError(f"Unknown job kinds in chain: {unknown}")
+    results: Dict[str, Any] = {}
+    for i, kind in enumerate(kinds):
+        ctx.progress(0, message=f"{i + 1}/{len(kinds)} {kind}")
+        results[kind] = ctx.queue.handlers[kind](ctx)
+    return {"steps": results}
+
+
+def queue_chain(ctx: JobContext, kinds: List[str]) -> Dict[str, str]:
+    """Queue ``kinds`` as one sequential ``chain`` job (not as parallel jobs in arbitrary order)."""
+    return {"chain": ctx.queue.submit("chain", {"kinds": list(kinds)})} if kinds else {}
+
+
+def eod_refresh_job(ctx: JobContext, codes: Optional[List[str]] = None, market: str = "DSE",
+                    concurrency: int = 4, chain: Optional[List[str]] = None,
+                    session_date: Optional[str] = None) -> Dict[str, Any]:
+    """Refresh every trading code (stalest first) with bounded concurrency, then queue follow-up jobs."""
+    db_manager = _db_manager()
+    try:
+        last_dates = ShareMarketService(db_manager).get_last_dates()
+    finally:
+        db_manager.close()
+
+    # get_last_dates is ordered oldest-first, so the stalest codes are downloaded first
+    targets = [c.strip().upper() for c in codes] if codes else list(last_dates)
+    total, done, rows = len(targets), 0, 0
+    failed: Dict[str, str] = {}
+    ctx.progress(0, rows_total=None, message=f"0/{total} codes")
+
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="eod-download")
+    try:
+        futures = {
+            pool.submit(download_and_load, code, market, last_dates.get(code)): code
+            for code in targets
+        }
+        for future in as_completed(futures):
+            code = futures[future]
+            done += 1
+            try:
+                rows += future.result()["rows"]
+            except Exception as e:
+                failed[code] = str(e)
+                logger.error(f"❌ EOD refresh failed for {code}: {e}")
+            ctx.progress(rows, message=f"{done}/{total} codes")
+    finally:
+        # On cancellation, drop downloads that have not started yet
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    return {"session_date": session_date, "codes": total, "rows": rows, "failed": failed,
+            "follow_up_jobs": queue_chain(ctx, EOD_CHAIN if chain is None else chain)}
+
+
+def backfill_job(ctx: JobContext, paths: Optional[List[str]] = None, workers: Optional[int] = None,
+                 chain: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Load local history archives (services/backfill.py, no network), then queue the EOD follow-up jobs."""
+    from services.backfill import ARCHIVE_DIRS, BACKFILL_WORKERS, ArchiveBackfill, discover_archives
+
+    archives = discover_archives([confine_path(p, ARCHIVE_DIRS) for p in paths] if paths else None)
+    ctx.progress(0, message=f"0/{len(archives)} files")
+    db_manager = _db_manager()
+    try:
+        result = ArchiveBackfill(db_manager, workers or BACKFILL_WORKERS).run(
+            archives, on_file=lambda files, totals: ctx.progress(totals["loaded"],
+                                                                 message=f"{files}/{len(archives)} files"))
+    finally:
+        db_manager.close()
+
+    follow_ups = queue_chain(ctx, EOD_CHAIN if chain is None else chain) if result["loaded"] else {}
+    return {**result, "follow_up_jobs": follow_ups}
+
+
+# Steps run in order after an EOD refresh / backfill (market_summary, shared price panel, then model features/retrain)
+EOD_CHAIN = ["summary_refresh", "price_panel", "retrain"]
+
+DEFAULT_HANDLERS = {
+    "download": download_job,
+    "ingest": ingest_job,
+    "summary_refresh": summary_refresh_job,
+    "retrain": retrain_job,
+    "rollup_rebuild": rollup_rebuild_job,
+    "price_panel": price_panel_job,
+    "research_ingest": research_ingest_job,
+    "eod_refresh": eod_refresh_job,
+    "backfill": backfill_job,
+    "chain": chain_job,
+}
+
+
+def get_job_queue(start: bool = True) -> JobQueue:
+    """Process-wide JobQueue with the default handlers registered (workers started on first call)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(JOB_DB_PATH, workers=JOB_WORKERS, lease_seconds=JOB_LEASE_SECONDS)
+            for kind, handler in DEFAULT_HANDLERS.items():
+                _queue.register(kind, handler)
+        if start:
+            _queue.start()
+        return _queue
+
+
+if __name__ == "__main__":
+    import argparse
+    import signal
+
+    parser = argparse.ArgumentParser(description="Dedicated job-runner process (JOB_WORKERS threads on JOB_DB_PATH)")
+    parser.add_argument("--drain", type=float, default=30.0, help="seconds to let running jobs finish on SIGTERM")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    queue = get_job_queue()
+    try:
+        while not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    # Stop claiming; a job still running after --drain is re-queued once its lease expires
+    queue.stop(timeout=args.drain)
@@ -0,0 +1,329 @@
+"""
+Local background job queue.
+
+Jobs are persisted in a small SQLite table so they survive browser reloads and
+process restarts; a pool of worker threads claims queued jobs atomically and
+runs the handler registered for the job kind. Handlers receive a JobContext to
+report progress (rows done / total, rows per second) and to honour cancellation.
+
+A claimed job records its owner (host:pid:queue) and a lease that a heartbeat
+thread renews while the handler runs, whether or not it reports progress.
+Every queue periodically puts back 'running' jobs whose lease has expired
+(their process died), so an orphaned job is retried within ``lease_seconds``
+and a live job is never picked up twice.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    rows_total INTEGER,
+    rows_per_sec REAL,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    updated_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at);
+"""
+
+# Columns added after the first release (job databases created before them are altered in place)
+_ADDED_COLUMNS = {"owner": "TEXT", "heartbeat_at": "REAL"}
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when the job has been cancelled."""
+
+
+class JobContext:
+    """Handle passed to job handlers for progress reporting and cancellation."""
+    def __init__(self, queue: "JobQueue", job_id: str, started_at: float):
+        self.queue = queue
+        self.job_id = job_id
+        self.started_at = started_at
+        self.rows_done = 0
+
+    def check_cancelled(self):
+        if self.queue._cancel_requested(self.job_id):
+            raise JobCancelled(f"Job {self.job_id} cancelled")
+
+    def progress(self, rows_done: Optional[int] = None, rows_total: Optional[int] = None,
+                 message: Optional[str] = None, advance: int = 0):
+        """Record progress (absolute ``rows_done`` or incremental ``advance``) and check for cancellation."""
+        self.rows_done = rows_done if rows_done is not None else self.rows_done + advance
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        self.queue._update(self.job_id, owner=self.queue.owner, rows_done=self.rows_done, rows_total=rows_total,
+                           rows_per_sec=round(self.rows_done / elapsed, 1), message=message)
+        self.check_cancelled()
+
+
+class JobQueue:
+    """SQLite-backed job table plus a worker thread pool."""
+    def __init__(self, db_path: str, workers: int = 2, poll_interval: float = 1.0,
+                 lease_seconds: float = 60.0):
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        # A running job whose heartbeat is older than this is considered orphaned
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers: Dict[str, Callable[..., Any]] = {}
+        self._threads: List[threading.Thread] = []
+        self._running: set = set()          # job ids this queue is executing
+        self._running_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+            existing = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)").fetchall()}
+            for column, sql_type in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {sql_type}")
+
+    # -----------------------------------------------------------
+    # 🔹 Storage helpers
+    # -----------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def _update(self, job_id: str, owner: Optional[str] = None, **fields) -> bool:
+        """Set ``fields`` on a job (only while ``owner`` holds it, when given); False if no row matched."""
+        fields = {k: v for k, v in fields.items() if v is not None}
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        where, args = "id = ?", [job_id]
+        if owner is not None:
+            where += " AND owner = ?"
+            args.append(owner)
+        with closing(self._connect()) as conn:
+            return bool(conn.execute(f"UPDATE jobs SET {assignments} WHERE {where}", (*fields.values(), *args)).rowcount)
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    # -----------------------------------------------------------
+    # 🔹 Public API
+    # -----------------------------------------------------------
+    def register(self, kind: str, handler: Callable[..., Any]):
+        """Register ``handler(ctx, **params) -> dict`` for a job kind."""
+        self.handlers[kind] = handler
+
+    def submit(self, kind: str, params: Optional[Dict[str, Any]] = None) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}' (expected one of {sorted(self.handlers)})")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(params or {}, default=str), now, now),
+            )
+        logger.info(f"📥 Queued {kind} job {job_id}")
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        sql, args = "SELECT * FROM jobs", []
+        if status:
+            sql += " WHERE status = ?"
+            args.append(status)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with closing(self._connect()) as conn:
+            return [self._row_to_dict(r) for r in conn.execute(sql, args).fetchall()]
+
+    def find(self, kind: str, params: Optional[Dict[str, Any]] = None,
+             statuses: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Jobs of ``kind`` whose params contain every ``params`` item, newest first (whole table, no limit)."""
+        sql, args = "SELECT * FROM jobs WHERE kind = ?", [kind]
+        for name, value in (params or {}).items():
+            sql += " AND json_extract(params, ?) = ?"
+            args += [f"$.{name}", value]
+        if statuses:
+            sql += f" AND status IN ({', '.join('?' * len(statuses))})"
+            args += statuses
+        with closing(self._connect()) as conn:
+            return [self._row_to_dict(r) for r in conn.execute(sql + " ORDER BY created_at DESC", args).fetchall()]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job immediately, or flag a running one to stop at its next progress call."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'queued'", (now, now, job_id))
+            if cur.rowcount:
+                return True
+            cur = conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'running'",
+                (now, job_id))
+            return bool(cur.rowcount)
+
+    # -----------------------------------------------------------
+    # 🔹 Workers
+    # -----------------------------------------------------------
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+        logger.info(f"✅ Job queue started with {self.workers} workers as {self.owner} ({self.db_path})")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop claiming jobs and wait up to ``timeout`` seconds in total for running ones to finish."""
+        self._stop.set()
+        self._wake.set()
+        deadline = time.time() + timeout
+        for t in self._threads:
+            t.join(max(deadline - time.time(), 0))
+        self._threads = []
+
+    def _heartbeat_loop(self):
+        """Renew the lease of every job this queue is running, then reclaim expired leases of others."""
+        interval = max(self.lease_seconds / 3, 0.1)
+        # Keeps renewing while stop() waits for running jobs to finish
+        while not self._stop.is_set() or self._running:
+            try:
+                self._heartbeat()
+                self._requeue_stale()
+            except sqlite3.Error as e:
+                logger.error(f"❌ Job heartbeat failed: {e}")
+            if self._stop.is_set():
+                time.sleep(interval)    # draining: the event no longer blocks
+            else:
+                self._stop.wait(interval)
+
+    def _heartbeat(self):
+        with self._running_lock:
+            running = list(self._running)
+        if not running:
+            return
+        with closing(self._connect()) as conn:
+            conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = 'running' "
+                f"AND id IN ({', '.join('?' * len(running))})", (time.time(), self.owner, *running))
+
+    def _requeue_stale(self):
+        """Put back jobs left 'running' by a process that died (lease not renewed for ``lease_seconds``)."""
+        cutoff = time.time() - self.lease_seconds
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, heartbeat_at = NULL "
+                "WHERE status = 'running' AND COALESCE(heartbeat_at, updated_at) < ?", (cutoff,))
+            if cur.rowcount:
+                logger.warning(f"⚠️ Re-queued {cur.rowcount} running jobs whose owner stopped heartbeating")
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        kinds = list(self.handlers)
+        if not kinds:
+            return None
+        placeholders = ", ".join("?" for _ in kinds)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE status = 'queued' AND kind IN ({placeholders}) "
+                "ORDER BY created_at LIMIT 1", kinds).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute("UPDATE jobs SET status = 'running', owner = ?, started_at = ?, heartbeat_at = ?, "
+                         "updated_at = ? WHERE id = ?", (self.owner, now, now, now, row["id"]))
+            conn.execute("COMMIT")
+            with self._running_lock:
+                self._running.add(row["id"])
+            job = self._row_to_dict(row)
+            job["started_at"] = now
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.error(f"❌ Job claim failed: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict[str, Any]):
+        ctx = JobContext(self, job["id"], job["started_at"])
+        logger.info(f"▶️ Running {job['kind']} job {job['id']}")
+        try:
+            result = self.handlers[job["kind"]](ctx, **job["params"])
+            self._finish(job["id"], "succeeded", ctx, result=result)
+        except JobCancelled:
+            self._finish(job["id"], "cancelled", ctx)
+        except Exception as e:
+            logger.error(f"❌ Job {job['id']} failed: {e}")
+            self._finish(job["id"], "failed", ctx, error=str(e))
+        finally:
+            with self._running_lock:
+                self._running.discard(job["id"])
+
+    def _finish(self, job_id: str, status: str, ctx: JobContext, result: Any = None, error: Optional[str] = None):
+        now = time.time()
+        elapsed = max(now - ctx.started_at, 1e-6)
+        # Only the current owner settles the job (its lease may have been reclaimed and the job re-run)
+        self._update(job_id, owner=self.owner, status=status, finished_at=now, rows_done=ctx.rows_done,
+                     rows_per_sec=round(ctx.rows_done / elapsed, 1),
+                     result=json.dumps(result, default=str) if result is not None else None, error=error)
@@ -0,0 +1,470 @@
+"""
+Whole-market analytics: beta vs DSEX, correlation matrix and clustering.
+
+Every trading code is aligned on one date axis (the trading days present in
+market_history) as a dense T x N float64 matrix of daily log returns, NaN
+where a code lacks a close on either day. DSEX closes (DSEX_CSV, written by
+download_dsex.py / DSEXScraperAgent) are reindexed onto the same axis; without
+them an equal-weighted market return stands in.
+
+Cross products run in column blocks sized from ANALYTICS_MEMORY_MB, so
+temporaries stay bounded: a 400 x 3000 panel keeps three N x N float64 sum
+matrices and one N x N float32 pair-count matrix (~250 MB).
+
+``CorrelationEngine`` holds the sums behind a rolling window, so appending a
+trading day is a rank-1 update and correlations / betas are read off without
+recomputing the window. Correlations are pairwise: every sum for a pair
+(x, y) runs over the days both codes traded, so a suspended or newly listed
+code is compared on its common days only, not against full-window moments.
+"""
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from utils.database_manager import DatabaseManager
+from services.sharemarket_service import ShareMarketService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DSEX_CSV = os.getenv("DSEX_CSV", "DSEX_historical_data.csv")
+ANALYTICS_MEMORY_MB = int(os.getenv("ANALYTICS_MEMORY_MB", "256"))   # budget for per-block temporaries
+PANEL_DAYS = int(os.getenv("ANALYTICS_PANEL_DAYS", "400"))           # trading days of returns kept per process
+ENGINE_WINDOW = int(os.getenv("ANALYTICS_WINDOW", "250"))            # days behind correlations / betas / clusters
+BETA_WINDOW = 60                                                     # rolling beta chart window
+MIN_PERIODS = 20                                                     # common days before a beta / correlation is shown
+
+
+# -----------------------------------------------------------
+# 🔹 Return panel
+# -----------------------------------------------------------
+def read_index_csv(path: str = DSEX_CSV) -> Optional[pd.Series]:
+    """DSEX closes by date, or None when the file is missing or holds no rows."""
+    if not path or not os.path.exists(path):
+        return None
+    raw = pd.read_csv(path)
+    if "Close" not in raw.columns:
+        return None
+    # yfinance writes extra "Ticker" / "Date" header rows under MultiIndex columns; they fail to parse and drop out
+    dates = pd.to_datetime(raw["Date" if "Date" in raw.columns else raw.columns[0]], errors="coerce")
+    closes = pd.to_numeric(raw["Close"], errors="coerce")
+    ok = (dates.notna() & (closes > 0)).to_numpy()
+    if not ok.any():
+        return None
+    series = pd.Series(closes.to_numpy()[ok], index=pd.DatetimeIndex(dates[ok]).normalize(), name="DSEX")
+    return series[~series.index.duplicated(keep="last")].sort_index()
+
+
+def _log_returns(prices: np.ndarray) -> np.ndarray:
+    """Row-to-row log returns; NaN where either close is missing or non-positive."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.diff(np.log(np.where(prices > 0, prices, np.nan)), axis=0)
+
+
+class ReturnPanel:
+    """T x N daily log returns on a shared date axis, plus the market return of each day."""
+
+    __slots__ = ("dates", "codes", "returns", "market", "market_source", "_pos")
+
+    def __init__(self, dates: np.ndarray, codes: List[str], returns: np.ndarray, market: np.ndarray,
+                 market_source: str):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.codes = list(codes)
+        self.returns = returns
+        self.market = market
+        self.market_source = market_source
+        self._pos = {c: i for i, c in enumerate(self.codes)}
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def column(self, trading_code: str) -> int:
+        if trading_code not in self._pos:
+            raise KeyError(f"{trading_code} has no returns in the panel")
+        return self._pos[trading_code]
+
+    def append(self, other: "ReturnPanel", max_rows: Optional[int] = None) -> "ReturnPanel":
+        """New panel with ``other``'s later rows added (same codes, same order), keeping the last ``max_rows``."""
+        if other.codes != self.codes:
+            raise ValueError("Panels must share codes to be appended")
+        new = other.dates > self.dates[-1] if len(self) else np.ones(len(other), dtype=bool)
+        keep = slice(-max_rows, None) if max_rows else slice(None)
+        return ReturnPanel(
+            np.concatenate([self.dates, other.dates[new]])[keep], self.codes,
+            np.concatenate([self.returns, other.returns[new]])[keep],
+            np.concatenate([self.market, other.market[new]])[keep], self.market_source,
+        )
+
+
+def panel_from_closes(trading_codes: np.ndarray, dates: np.ndarray, closes: np.ndarray, axis: np.ndarray,
+                      index: Optional[pd.Series] = None, codes: Optional[Sequence[str]] = None) -> ReturnPanel:
+    """
+    Scatter (code, date, close) rows onto ``axis`` and difference them into returns.
+
+    ``codes`` fixes the column set and order (rows of other codes are dropped);
+    by default every code present is used, sorted.
+    """
+    axis = np.asarray(axis, dtype="datetime64[D]")
+    dates = np.asarray(dates).astype("datetime64[D]")
+    if codes is None:
+        codes, col = np.unique(np.asarray(trading_codes, dtype=object), return_inverse=True)
+    else:
+        pos = {c: i for i, c in enumerate(codes)}
+        col = np.fromiter((pos.get(c, -1) for c in trading_codes), dtype=np.int64, count=len(trading_codes))
+
+    row = np.searchsorted(axis, dates)
+    hit = (row < len(axis)) & (col >= 0)
+    hit[hit] = axis[row[hit]] == dates[hit]
+    prices = np.full((len(axis), len(codes)), np.nan)
+    prices[row[hit], col[hit]] = closes[hit]
+    returns = _log_returns(prices)
+
+    if index is not None:
+        closes_on_axis = index.reindex(pd.DatetimeIndex(axis)).to_numpy(dtype=np.float64)
+        market, source = _log_returns(closes_on_axis[:, None])[:, 0], "DSEX"
+    else:
+        with np.errstate(invalid="ignore"):
+            valid = ~np.isnan(returns)
+            market = np.where(valid, returns, 0.0).sum(axis=1) / valid.sum(axis=1)
+        source = "equal-weight"
+    return ReturnPanel(axis[1:], [str(c) for c in codes], returns, market, source)
+
+
+# -----------------------------------------------------------
+# 🔹 Blocked matrix kernels
+# -----------------------------------------------------------
+def block_columns(cells_per_column: int, n_cols: int, memory_mb: int = ANALYTICS_MEMORY_MB) -> int:
+    """Columns per block when each column needs ``cells_per_column`` float64 temporaries."""
+    return int(max(1, min(n_cols, memory_mb * 2 ** 20 // max(8 * cells_per_column, 1))))
+
+
+def cross_moments(returns: np.ndarray, memory_mb: int = ANALYTICS_MEMORY_MB):
+    """
+    Pairwise sums of a T x N panel over the days both codes have a return (NaN = absent),
+    one column block at a time: (X'X, sx, sxx, counts) with ``sx[i, j]`` = sum of x_i and
+    ``sxx[i, j]`` = sum of x_i^2 over the days i and j share, ``counts[i, j]`` = those days.
+    """
+    t, n = returns.shape
+    valid = ~np.isnan(returns)
+    x = np.where(valid, returns, 0.0)
+    m = valid.astype(np.float32)
+    md = valid.astype(np.float64)
+    xtx, sx, sxx = np.empty((n, n)), np.empty((n, n)), np.empty((n, n))
+    counts = np.empty((n, n), dtype=np.float32)
+    block = block_columns(4 * n + t, n, memory_mb)
+    for lo in range(0, n, block):
+        hi = min(lo + block, n)
+        xb = x[:, lo:hi]
+        np.matmul(xb.T, x, out=xtx[lo:hi])
+        np.matmul(xb.T, md, out=sx[lo:hi])
+        np.matmul((xb * xb).T, md, out=sxx[lo:hi])
+        np.matmul(m[:, lo:hi].T, m, out=counts[lo:hi])
+    return xtx, sx, sxx, counts
+
+
+def _trailing_sums(a: np.ndarray, window: int) -> np.ndarray:
+    sums = np.cumsum(a, axis=0)
+    out = sums.copy()
+    out[window:] -= sums[:-window]
+    return out
+
+
+def rolling_beta(returns: np.ndarray, market: np.ndarray, window: int = BETA_WINDOW,
+                 min_periods: int = MIN_PERIODS, memory_mb: int = ANALYTICS_MEMORY_MB) -> np.ndarray:
+    """T x N trailing-``window`` beta of each column on ``market`` (NaN below ``min_periods`` joint days)."""
+    returns = returns.reshape(len(returns), -1)
+    t, n = returns.shape
+    has_market = ~np.isnan(market)
+    mk = np.where(has_market, market, 0.0)[:, None]
+    out = np.empty((t, n))
+    block = block_columns(10 * t, n, memory_mb)
+    for lo in range(0, n, block):
+        hi = min(lo + block, n)
+        both = ~np.isnan(returns[:, lo:hi]) & has_market[:, None]
+        x = np.where(both, returns[:, lo:hi], 0.0)
+        m = mk * both
+        cnt = _trailing_sums(both.astype(np.float64), window)
+        sr, sm = _trailing_sums(x, window), _trailing_sums(m, window)
+        srm, smm = _trailing_sums(x * m, window), _trailing_sums(m * m, window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            beta = (srm - sr * sm / cnt) / (smm - sm * sm / cnt)
+        beta[cnt < min_periods] = np.nan
+        out[:, lo:hi] = beta
+    return out
+
+
+# -----------------------------------------------------------
+# 🔹 Incremental rolling-window engine
+# -----------------------------------------------------------
+class CorrelationEngine:
+    """Rolling-window moments of a ReturnPanel; ``append`` slides the window one day in O(N^2)."""
+
+    def __init__(self, panel: ReturnPanel, window: int = ENGINE_WINDOW, min_periods: int = MIN_PERIODS,
+                 memory_mb: int = ANALYTICS_MEMORY_MB):
+        self.codes = list(panel.codes)
+        self.window = window
+        self.min_periods = min_periods
+        self.market_source = panel.market_source
+        self._pos = {c: i for i, c in enumerate(self.codes)}
+        n = len(self.codes)
+        self._block = block_columns(8 * n, n, memory_mb)
+
+        rows, market = panel.returns[-window:], panel.market[-window:]
+        self._dates = deque(panel.dates[-window:])
+        self._rows = deque(rows)
+        self._market = deque(market)
+        # Pairwise sums behind the correlations (see cross_moments)
+        self._xtx, self._sx, self._sxx, self._counts = cross_moments(rows, memory_mb)
+        # Per-code sums: own moments (n, x, x^2) and, over days the market also has, the regression sums
+        self._sums = {k: np.zeros(n) for k in ("n", "x", "xx", "bn", "br", "bm", "bmm", "brm", "brr")}
+        self._accumulate(rows, market, 1.0)
+
+    @property
+    def last_date(self) -> Optional[np.datetime64]:
+        return self._dates[-1] if self._dates else None
+
+    def _accumulate(self, rows: np.ndarray, market: np.ndarray, sign: float):
+        valid = ~np.isnan(rows)
+        x = np.where(valid, rows, 0.0)
+        both = valid & ~np.isnan(market)[:, None]
+        xb = np.where(both, x, 0.0)
+        mb = np.where(both, np.nan_to_num(market)[:, None], 0.0)
+        s = self._sums
+        s["n"] += sign * valid.sum(axis=0)
+        s["x"] += sign * x.sum(axis=0)
+        s["xx"] += sign * (x * x).sum(axis=0)
+        s["bn"] += sign * both.sum(axis=0)
+        s["br"] += sign * xb.sum(axis=0)
+        s["bm"] += sign * mb.sum(axis=0)
+        s["bmm"] += sign * (mb * mb).sum(axis=0)
+        s["brm"] += sign * (xb * mb).sum(axis=0)
+        s["brr"] += sign * (xb * xb).sum(axis=0)
+
+    def _rank1(self, row: np.ndarray, market: float, sign: float):
+        self._accumulate(row[None, :], np.array([market], dtype=np.float64), sign)
+        valid = ~np.isnan(row)
+        x = np.where(valid, row, 0.0)
+        m = valid.astype(np.float64)
+        for lo in range(0, len(x), self._block):
+            hi = min(lo + self._block, len(x))
+            self._xtx[lo:hi] += sign * np.outer(x[lo:hi], x)
+            self._sx[lo:hi] += sign * np.outer(x[lo:hi], m)
+            self._sxx[lo:hi] += sign * np.outer(x[lo:hi] * x[lo:hi], m)
+            self._counts[lo:hi] += sign * np.outer(m[lo:hi], m).astype(np.float32)
+
+    def append(self, date: Any, returns: np.ndarray, market: float):
+        """Add one trading day (returns in ``self.codes`` order, NaN = no trade) and drop the oldest past ``window``."""
+        row = np.asarray(returns, dtype=np.float64).reshape(-1)
+        if len(row) != len(self.codes):
+            raise ValueError(f"Expected {len(self.codes)} returns, got {len(row)}")
+        self._rank1(row, float(market), 1.0)
+        self._rows.append(row)
+        self._market.append(float(market))
+        self._dates.append(np.datetime64(date, "D"))
+        if len(self._rows) > self.window:
+            self._rank1(self._rows.popleft(), self._market.popleft(), -1.0)
+            self._dates.popleft()
+
+    def extend(self, panel: ReturnPanel) -> int:
+        """Append ``panel``'s rows after ``last_date``; returns how many were added."""
+        if panel.codes != self.codes:
+            raise ValueError("Panel codes differ from the engine's; rebuild instead")
+        added = 0
+        for i in np.flatnonzero(panel.dates > self.last_date) if self._dates else range(len(panel)):
+            self.append(panel.dates[i], panel.returns[i], panel.market[i])
+            added += 1
+        return added
+
+    def _indices(self, codes: Sequence[str]) -> np.ndarray:
+        missing = [c for c in codes if c not in self._pos]
+        if missing:
+            raise KeyError(f"No returns for {', '.join(missing)}")
+        return np.array([self._pos[c] for c in codes], dtype=np.int64)
+
+    def _corr_rows(self, rows) -> np.ndarray:
+        """
+        Pairwise Pearson correlation of ``rows`` (slice or index array) against every code: for
+        each pair, n, sums and squares all run over the days both codes have a return, so
+        corr = (n Sxy - Sx Sy) / sqrt((n Sxx - Sx^2)(n Syy - Sy^2)). NaN below ``min_periods``
+        common days or when either code is flat over them; the clip only absorbs rounding.
+        """
+        n = self._counts[rows].astype(np.float64)
+        sx, sxx = self._sx[rows], self._sxx[rows]
+        sy, syy = self._sx[:, rows].T, self._sxx[:, rows].T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = n * self._xtx[rows] - sx * sy
+            corr = cov / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+        corr[n < self.min_periods] = np.nan
+        return np.clip(corr, -1.0, 1.0, out=corr)
+
+    def correlation(self, codes: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Correlation matrix of ``codes`` (all codes when None, float32); NaN below ``min_periods`` common days."""
+        if codes is not None:
+            idx = self._indices(codes)
+            return pd.DataFrame(self._corr_rows(idx)[:, idx], index=list(codes), columns=list(codes))
+        n = len(self.codes)
+        out = np.empty((n, n), dtype=np.float32)
+        for lo in range(0, n, self._block):
+            out[lo:lo + self._block] = self._corr_rows(slice(lo, lo + self._block))
+        return pd.DataFrame(out, index=self.codes, columns=self.codes, copy=False)
+
+    def peers(self, trading_code: str, n: int = 10) -> pd.DataFrame:
+        """The ``n`` codes most correlated with ``trading_code``."""
+        i = self._indices([trading_code])
+        corr = self._corr_rows(i)[0]
+        corr[i[0]] = np.nan
+        order = np.argsort(np.where(np.isnan(corr), -np.inf, -corr), kind="stable")[:n]
+        order = order[~np.isnan(corr[order])]
+        return pd.DataFrame({"trading_code": [self.codes[j] for j in order], "correlation": corr[order],
+                             "days": self._counts[i[0], order].astype(np.int64)})
+
+    def betas(self) -> pd.DataFrame:
+        """Window beta and correlation of every code against the market."""
+        s = self._sums
+        n = s["bn"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = s["brm"] - s["br"] * s["bm"] / n
+            var_m = s["bmm"] - s["bm"] * s["bm"] / n
+            var_r = s["brr"] - s["br"] * s["br"] / n
+            beta = cov / var_m
+            corr = cov / np.sqrt(var_m * var_r)
+        low = n < self.min_periods
+        beta[low], corr[low] = np.nan, np.nan
+        return pd.DataFrame({"trading_code": self.codes, "beta": beta, "market_correlation": corr,
+                             "days": n.astype(np.int64)})
+
+    def clusters(self, k: int = 12) -> pd.DataFrame:
+        """Sector-style groups: average-linkage clustering on correlation distance sqrt((1 - rho) / 2)."""
+        from scipy.cluster.hierarchy import fcluster, linkage
+        from scipy.spatial.distance import squareform
+
+        keep = np.flatnonzero(self._sums["n"] >= self.min_periods)
+        if len(keep) < 2:
+            return pd.DataFrame({"trading_code": [self.codes[i] for i in keep], "cluster": np.ones(len(keep), int)})
+        dist = np.empty((len(keep), len(keep)))
+        for lo in range(0, len(keep), self._block):
+            rows = keep[lo:lo + self._block]
+            corr = self._corr_rows(rows)[:, keep]
+            # Pairs without enough common days count as uncorrelated
+            dist[lo:lo + len(rows)] = np.sqrt((1.0 - np.nan_to_num(corr, nan=0.0)) / 2.0)
+        np.maximum(dist, dist.T, out=dist)
+        np.fill_diagonal(dist, 0.0)
+        labels = fcluster(linkage(squareform(dist, checks=False), method="average"), t=k, criterion="maxclust")
+        out = pd.DataFrame({"trading_code": [self.codes[i] for i in keep], "cluster": labels})
+        return out.sort_values(["cluster", "trading_code"], ignore_index=True)
+
+
+# -----------------------------------------------------------
+# 🔹 Service (panel + engine cached per process)
+# -----------------------------------------------------------
+_cache: Dict[tuple, Dict[str, Any]] = {}
+_cache_lock = threading.Lock()
+
+
+class MarketAnalyticsService:
+    """
+    Beta / correlation / cluster queries over the last ``days`` trading days.
+
+    The panel and engine are built once per process and database, then
+    extended in place when market_history gains trading days, so a daily
+    ingest costs one rank-1 update rather than a rebuild.
+    """
+    def __init__(self, db_manager: DatabaseManager, days: int = PANEL_DAYS, window: int = ENGINE_WINDOW,
+                 index_csv: str = DSEX_CSV):
+        self.db_manager = db_manager
+        self.days = days
+        self.window = min(window, days)
+        self.index_csv = index_csv
+
+    def _latest_date(self) -> Optional[pd.Timestamp]:
+        session = self.db_manager.get_session()
+        try:
+            value = session.execute(text(
+                f"SELECT MAX(last_date) FROM {self.db_manager.sql.table('symbols')}")).scalar()
+        finally:
+            session.close()
+        return pd.Timestamp(value) if value is not None else None
+
+    def load_panel(self, start: Optional[Any] = None, codes: Optional[Sequence[str]] = None) -> ReturnPanel:
+        """Returns for the last ``days`` trading days, or every day after ``start`` (its close is the base)."""
+        latest = self._latest_date()
+        if latest is None:
+            raise ValueError("market_history is empty")
+        # DSE trades five days a week; pad the calendar span for holidays
+        lo = pd.Timestamp(start) if start is not None else latest - pd.Timedelta(days=(self.days + 1) * 7 // 5 + 30)
+        service = ShareMarketService(self.db_manager)
+        prices = service.price_panel()
+        if prices is not None:
+            arrays = prices.since(lo, ["trading_code", "date", "closep"])
+        else:
+            arrays = service.fetch_arrays(f"""
+                SELECT trading_code, date, closep
+                FROM {self.db_manager.sql.table("market_history")}
+                WHERE date >= :start
+            """, {"start": lo.date()}, {"trading_code": object, "date": "datetime64[ns]", "closep": np.float64})
+
+        days = arrays["date"].astype("datetime64[D]")
+        axis = np.unique(days[~np.isnat(days)])
+        if start is None:
+            axis = axis[-(self.days + 1):]
+        index = read_index_csv(self.index_csv)
+        return panel_from_closes(arrays["trading_code"], arrays["date"], arrays["closep"], axis, index, codes)
+
+    def _state(self) -> Dict[str, Any]:
+        key = (self.db_manager.connection_string, self.days, self.window, self.index_csv)
+        with _cache_lock:
+            state = _cache.get(key)
+            latest = self._latest_date()
+            if state is not None and latest is not None and np.datetime64(latest, "D") > state["engine"].last_date:
+                new = self.load_panel(start=state["engine"].last_date, codes=state["engine"].codes)
+                if len(new) <= self.window:
+                    added = state["engine"].extend(new)
+                    state["panel"] = state["panel"].append(new, max_rows=self.days)
+                    logger.info(f"✅ Appended {added} trading day(s) to the market analytics window.")
+                else:
+                    state = None
+            if state is None:
+                panel = self.load_panel()
+                state = {"panel": panel, "engine": CorrelationEngine(panel, self.window)}
+                _cache[key] = state
+                logger.info(f"✅ Built market analytics panel: {len(panel)} days x {len(panel.codes)} codes "
+                            f"(market: {panel.market_source}).")
+            return state
+
+    def panel(self) -> ReturnPanel:
+        return self._state()["panel"]
+
+    def engine(self) -> CorrelationEngine:
+        return self._state()["engine"]
+
+    def beta_history(self, trading_code: str, window: int = BETA_WINDOW) -> pd.DataFrame:
+        """Daily return, market return and trailing-``window`` beta for one code."""
+        panel = self.panel()
+        i = panel.column(trading_code)
+        return pd.DataFrame({
+            "date": panel.dates,
+            "return": panel.returns[:, i],
+            "market_return": panel.market,
+            "beta": rolling_beta(panel.returns[:, i], panel.market, window)[:, 0],
+        })
+
+    def betas(self) -> pd.DataFrame:
+        return self.engine().betas()
+
+    def correlation(self, codes: Sequence[str]) -> pd.DataFrame:
+        return self.engine().correlation(codes)
+
+    def peers(self, trading_code: str, n: int = 10) -> pd.DataFrame:
+        return self.engine().peers(trading_code, n)
+
+    def clusters(self, k: int = 12) -> pd.DataFrame:
+        return self.engine().clusters(k)
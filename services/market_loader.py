@@ -0,0 +1,243 @@
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import datetime
+import logging
+from typing import Callable, Iterator, List, Dict, Any, Optional
+import pandas as pd
+from sqlalchemy import bindparam, text
+from utils.database_manager import DatabaseManager
+from utils.sql_dialect import SqlDialect
+from services.rollups import refresh_rollups
+from services.alerts import AlertEngine, get_alert_engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MARKET_HISTORY_COLUMNS = [
+    "unnamed", "date", "trading_code", "ltp", "high", "low",
+    "openp", "closep", "ycp", "trade", "value_mn", "volume",
+]
+
+# Common header spellings in AmarStock/DSE exports -> market_history columns
+COLUMN_ALIASES = {"open": "openp", "close": "closep", "code": "trading_code", "symbol": "trading_code"}
+
+_INSERT_COLUMNS = "unnamed, date, trading_code, ltp, high, low, openp, closep, ycp, trade, value_mn, volume"
+_INSERT_PARAMS = ":unnamed, :date, :trading_code, :ltp, :high, :low, :openp, :closep, :ycp, :trade, :value_mn, :volume"
+
+
+def insert_sql(sql: SqlDialect):
+    """INSERT that skips (trading_code, date) keys already stored (unique index from migration 0002)."""
+    table = sql.table("market_history")
+    if sql.is_mssql:
+        return text(f"""
+            INSERT INTO {table} ({_INSERT_COLUMNS})
+            SELECT {_INSERT_PARAMS}
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {table} WITH (UPDLOCK, HOLDLOCK)
+                WHERE trading_code = :trading_code AND date = :date
+            )
+        """)
+    return text(f"""
+        INSERT INTO {table} ({_INSERT_COLUMNS})
+        VALUES ({_INSERT_PARAMS})
+        ON CONFLICT (trading_code, date) DO NOTHING
+    """)
+
+
+def stored_keys_sql(sql: SqlDialect):
+    """(trading_code, date) keys already stored for a batch's codes and date range."""
+    return text(f"""
+        SELECT trading_code, date FROM {sql.table("market_history")}
+        WHERE trading_code IN :codes AND date >= :lo AND date <= :hi
+    """).bindparams(bindparam("codes", expanding=True))
+
+
+def upsert_symbols_sql(sql: SqlDialect):
+    """Refresh dbo.symbols (migration 0003) rows for the codes touched by a load."""
+    source = f"""
+        SELECT trading_code, MIN(date) AS first_date, MAX(date) AS last_date, COUNT(*) AS row_count
+        FROM {sql.table("market_history")}
+        WHERE trading_code IN :codes
+        GROUP BY trading_code
+    """
+    if sql.is_mssql:
+        stmt = f"""
+            MERGE dbo.symbols AS s
+            USING ({source}) AS n
+            ON s.trading_code = n.trading_code
+            WHEN MATCHED THEN
+                UPDATE SET first_date = n.first_date, last_date = n.last_date,
+                           row_count = n.row_count, updated_at = :now
+            WHEN NOT MATCHED THEN
+                INSERT (trading_code, first_date, last_date, row_count, updated_at)
+                VALUES (n.trading_code, n.first_date, n.last_date, n.row_count, :now);
+        """
+    else:
+        stmt = f"""
+            INSERT INTO symbols (trading_code, first_date, last_date, row_count, updated_at)
+            SELECT n.trading_code, n.first_date, n.last_date, n.row_count, :now FROM ({source}) AS n WHERE true
+            ON CONFLICT (trading_code) DO UPDATE SET
+                first_date = excluded.first_date, last_date = excluded.last_date,
+                row_count = excluded.row_count, updated_at = excluded.updated_at
+        """
+    return text(stmt).bindparams(bindparam("codes", expanding=True))
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Lower-case/strip headers the same way the download scripts do, then apply aliases."""
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    return df.rename(columns={k: v for k, v in COLUMN_ALIASES.items() if k in df.columns and v not in df.columns})
+
+
+def iter_history_chunks(path: str, chunk_rows: int = 50_000) -> Iterator[pd.DataFrame]:
+    """Yield a CSV/XLSX price history as DataFrames of at most ``chunk_rows`` rows."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        for chunk in pd.read_csv(path, chunksize=chunk_rows):
+            yield chunk
+    elif ext in (".xlsx", ".xlsm"):
+        # openpyxl read-only mode streams rows from the zip instead of loading the sheet
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(h) if h is not None else f"unnamed: {i}" for i, h in enumerate(header)]
+            batch: List[tuple] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= chunk_rows:
+                    yield pd.DataFrame(batch, columns=columns)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=columns)
+        finally:
+            wb.close()
+    else:
+        raise ValueError(f"Unsupported file type '{ext}' (expected .csv or .xlsx)")
+
+
+class MarketHistoryLoader:
+    """Batched loader for dbo.market_history (executemany instead of one INSERT per row)."""
+    def __init__(self, db_manager: DatabaseManager, batch_size: int = 1000,
+                 alerts: Optional[AlertEngine] = None, evaluate_alerts: bool = True):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        # New rows of every committed batch go through the price-alert rules
+        self.alerts = (alerts or get_alert_engine()) if evaluate_alerts else None
+        self.insert_sql = insert_sql(db_manager.sql)
+        self.stored_keys_sql = stored_keys_sql(db_manager.sql)
+        self.upsert_symbols_sql = upsert_symbols_sql(db_manager.sql)
+
+    # -----------------------------------------------------------
+    # 🔹 DataFrame -> parameter dicts
+    # -----------------------------------------------------------
+    @staticmethod
+    def normalize_frame(df: pd.DataFrame, symbol: Optional[str] = None, since: Optional[Any] = None) -> pd.DataFrame:
+        """Raw history frame -> market_history columns, one row per (trading_code, date) after ``since``."""
+        df = normalize_columns(df)
+        out = pd.DataFrame(index=df.index)
+        for col in MARKET_HISTORY_COLUMNS:
+            out[col] = df[col] if col in df.columns else None
+
+        out["unnamed"] = symbol if symbol else out["trading_code"]
+        if symbol:
+            out["trading_code"] = out["trading_code"].fillna(symbol)
+        out["date"] = pd.to_datetime(out["date"], errors="coerce").dt.date
+        out = out[out["date"].notna() & out["trading_code"].notna()]
+        if since is not None:
+            out = out[out["date"] > pd.Timestamp(since).date()]
+        return out.drop_duplicates(subset=["trading_code", "date"], keep="last")
+
+    @staticmethod
+    def frame_records(out: pd.DataFrame) -> List[Dict[str, Any]]:
+        """A normalized frame as INSERT params (NaN -> None so the driver sends NULL)."""
+        return out.astype(object).where(out.notna(), None).to_dict("records")
+
+    @classmethod
+    def to_records(cls, df: pd.DataFrame, symbol: Optional[str] = None, since: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """Map a history frame to INSERT params; rows dated on/before ``since`` are skipped."""
+        return cls.frame_records(cls.normalize_frame(df, symbol, since))
+
+    # -----------------------------------------------------------
+    # 🔹 Load a DataFrame in batches
+    # -----------------------------------------------------------
+    def load_frame(self, df: pd.DataFrame, symbol: Optional[str] = None, since: Optional[Any] = None) -> int:
+        return self.load_records(self.to_records(df, symbol, since))
+
+    def _new_records(self, session, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rows of ``batch`` whose (trading_code, date) is not stored yet (nor repeated earlier in the batch)."""
+        stored = session.execute(self.stored_keys_sql, {
+            "codes": sorted({r["trading_code"] for r in batch}),
+            "lo": min(r["date"] for r in batch), "hi": max(r["date"] for r in batch),
+        }).fetchall()
+        # str(date)[:10]: drivers return date, datetime or ISO text depending on the backend
+        seen = {(code, str(date)[:10]) for code, date in stored}
+        fresh = []
+        for r in batch:
+            key = (r["trading_code"], str(r["date"])[:10])
+            if key not in seen:
+                seen.add(key)
+                fresh.append(r)
+        return fresh
+
+    def load_records(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Insert ``to_records`` output in ``batch_size`` batches and refresh symbols/rollups in one
+        transaction. Keys already stored are skipped; only the inserted rows refresh the rollups and
+        go through the alert rules. Returns the number of rows inserted.
+        """
+        if not records:
+            return 0
+        inserted: List[Dict[str, Any]] = []
+        session = self.db_manager.get_session()
+        try:
+            for start in range(0, len(records), self.batch_size):
+                fresh = self._new_records(session, records[start:start + self.batch_size])
+                if fresh:
+                    # The INSERT still skips conflicts, in case another loader stored a key meanwhile
+                    session.execute(self.insert_sql, fresh)
+                    inserted.extend(fresh)
+            if not inserted:
+                session.rollback()
+                return 0
+            codes = sorted({r["trading_code"] for r in inserted})
+            session.execute(self.upsert_symbols_sql, {"codes": codes, "now": datetime.datetime.utcnow()})
+            # Only the weekly/monthly buckets from the earliest inserted date onward are rebuilt
+            refresh_rollups(session, self.db_manager.sql, codes, since=min(r["date"] for r in inserted))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        if self.alerts is not None:
+            try:
+                self.alerts.evaluate(inserted)
+            except Exception as e:
+                # Alerts never fail an ingest; rows stay loaded and rules resume from their last_date
+                logger.error(f"❌ Alert evaluation failed: {e}")
+        return len(inserted)
+
+    # -----------------------------------------------------------
+    # 🔹 Load a CSV/XLSX file chunk by chunk
+    # -----------------------------------------------------------
+    def load_file(self, path: str, symbol: Optional[str] = None, chunk_rows: int = 50_000,
+                  on_chunk: Optional[Callable[[int], None]] = None, since: Optional[Any] = None) -> Dict[str, int]:
+        """Load ``path`` chunk by chunk; ``on_chunk(rows_loaded_so_far)`` is called after each commit."""
+        rows, chunks = 0, 0
+        for chunk in iter_history_chunks(path, chunk_rows):
+            rows += self.load_frame(chunk, symbol, since)
+            chunks += 1
+            if on_chunk:
+                on_chunk(rows)
+        logger.info(f"✅ Loaded {rows} rows in {chunks} chunks from {os.path.basename(path)}")
+        return {"rows": rows, "chunks": chunks}
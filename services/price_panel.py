@@ -0,0 +1,255 @@
+"""
+Compact, memory-mapped copy of dbo.market_history shared by every process.
+
+All rows are stored sorted by (trading_code, date) as one ``.npy`` file per
+column under PRICE_PANEL_PATH/<version>/:
+
+    code     int16/int32  index into meta.json "codes" (categorical trading_code)
+    day      int32        days since 1970-01-01
+    ltp ...  float64      prices, trade counts, value_mn, volume (the values the
+                          database returns, so panel and DB reads agree exactly)
+    offsets  int64        rows of codes[i] are offsets[i]:offsets[i + 1]
+
+Readers ``np.load(mmap_mode="r")`` the columns, so the OS page cache holds a
+single copy (tens of MB for the full DSE history) however many API workers,
+Streamlit sessions or jobs open it, and a symbol's rows are an O(1) slice.
+A build writes a new version directory and then swaps the CURRENT pointer
+file, so open readers keep a consistent snapshot.
+
+    python services/price_panel.py build
+    python services/price_panel.py show ACI
+"""
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import datetime
+import json
+import logging
+import shutil
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRICE_PANEL_PATH = os.getenv("PRICE_PANEL_PATH", os.path.join("db", "price_panel"))
+# auto: used when it matches dbo.symbols, off: always query the database
+PRICE_PANEL_MODE = os.getenv("PRICE_PANEL", "auto").lower()
+KEEP_VERSIONS = 2
+
+# Stored dtype of each market_history column. float64, not float32: 171.9 must read back as
+# 171.9 (not 171.899994), or features and predictions depend on whether the panel is fresh
+PANEL_DTYPES = {
+    "ltp": np.float64, "high": np.float64, "low": np.float64, "openp": np.float64,
+    "closep": np.float64, "ycp": np.float64, "trade": np.float64,
+    "value_mn": np.float64, "volume": np.float64,
+}
+# meta.json "format"; panels built with another layout (format 1 stored float32 prices) are ignored
+PANEL_FORMAT = 2
+_EPOCH_DAY = np.datetime64("1970-01-01", "D")
+
+
+def _to_days(values: Any) -> np.ndarray:
+    return (np.asarray(values).astype("datetime64[D]") - _EPOCH_DAY).astype(np.int32)
+
+
+def _from_days(days: np.ndarray) -> np.ndarray:
+    return _EPOCH_DAY + days.astype(np.int64).astype("timedelta64[D]")
+
+
+# -----------------------------------------------------------
+# 🔹 Reader
+# -----------------------------------------------------------
+class PricePanel:
+    """One version of the panel, opened read-only and memory-mapped."""
+
+    def __init__(self, folder: str):
+        with open(os.path.join(folder, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.folder = folder
+        self.codes: List[str] = self.meta["codes"]
+        self.rows: int = self.meta["rows"]
+        self._pos = {c: i for i, c in enumerate(self.codes)}
+        self.offsets = np.load(os.path.join(folder, "offsets.npy"))
+        self.columns = {name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r")
+                        for name in ["code", "day", *PANEL_DTYPES]}
+
+    def __contains__(self, trading_code: str) -> bool:
+        return trading_code in self._pos
+
+    def bounds(self, trading_code: str) -> Tuple[int, int]:
+        i = self._pos[trading_code]
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+    def symbol(self, trading_code: str, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Zero-copy views of one code's rows (date ascending); ``day`` is always included."""
+        lo, hi = self.bounds(trading_code)
+        names = ["day", *[c for c in (columns or PANEL_DTYPES) if c != "day"]]
+        return {name: self.columns[name][lo:hi] for name in names}
+
+    def frame(self, trading_code: str, columns: Sequence[str], cursor: Optional[Any] = None,
+              direction: str = "asc", limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Same rows and columns as ShareMarketService.get_history_frame (``date`` first,
+        float64 prices), materialized for one code only.
+        """
+        lo, hi = self.bounds(trading_code)
+        days = self.columns["day"][lo:hi]
+        if direction == "desc":
+            end = int(np.searchsorted(days, _to_days([cursor])[0])) if cursor is not None else len(days)
+            start = max(0, end - limit) if limit else 0
+            stop = lo + start - 1
+            rows = slice(lo + end - 1, stop if stop >= 0 else None, -1) if end > start else slice(0, 0)
+        else:
+            start = int(np.searchsorted(days, _to_days([cursor])[0], side="right")) if cursor is not None else 0
+            end = min(len(days), start + limit) if limit else len(days)
+            rows = slice(lo + start, lo + end)
+
+        out = {}
+        for name in columns:
+            if name == "date":
+                out[name] = _from_days(self.columns["day"][rows]).astype("datetime64[ns]")
+            elif name == "trading_code":
+                out[name] = np.full(len(out["date"]), trading_code, dtype=object)
+            else:
+                out[name] = self.columns[name][rows].astype(np.float64)
+        return pd.DataFrame(out, copy=False)
+
+    def since(self, start: Any, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Every code's rows on or after ``start`` (``trading_code`` as strings, ``date`` as datetime64[D])."""
+        mask = self.columns["day"] >= _to_days([start])[0]
+        out = {}
+        for name in columns:
+            if name == "trading_code":
+                out[name] = np.asarray(self.codes, dtype=object)[self.columns["code"][mask]]
+            elif name == "date":
+                out[name] = _from_days(self.columns["day"][mask])
+            else:
+                out[name] = np.asarray(self.columns[name][mask])
+        return out
+
+
+_panel: Optional[PricePanel] = None
+_outdated: Optional[str] = None    # folder of a current panel whose format is not PANEL_FORMAT
+_panel_lock = threading.Lock()
+
+
+def _current_version(path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(path, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def get_price_panel(path: str = PRICE_PANEL_PATH) -> Optional[PricePanel]:
+    """
+    The process-wide panel, reopened when a build swaps CURRENT (None when never built, or
+    when the current build predates PANEL_FORMAT and has to be rebuilt).
+    """
+    global _panel, _outdated
+    version = _current_version(path)
+    if version is None:
+        return None
+    folder = os.path.join(path, version)
+    with _panel_lock:
+        if folder == _outdated:
+            return None
+        if _panel is None or _panel.folder != folder:
+            panel = PricePanel(folder)
+            if panel.meta.get("format", 1) != PANEL_FORMAT:
+                _outdated = folder
+                logger.warning(f"⚠️ Price panel {version} has an old format; run the price_panel job to rebuild it")
+                return None
+            _panel = panel
+            logger.info(f"✅ Mapped price panel {version}: {_panel.rows} rows, {len(_panel.codes)} codes.")
+        return _panel
+
+
+# -----------------------------------------------------------
+# 🔹 Build
+# -----------------------------------------------------------
+def build_price_panel(db_manager, path: str = PRICE_PANEL_PATH) -> Dict[str, Any]:
+    """Dump market_history into a new panel version and make it current."""
+    from services.sharemarket_service import ShareMarketService
+
+    arrays = ShareMarketService(db_manager).fetch_arrays(f"""
+        SELECT trading_code, date, {", ".join(PANEL_DTYPES)}
+        FROM {db_manager.sql.table("market_history")}
+        ORDER BY trading_code, date
+    """, None, {"trading_code": object, "date": "datetime64[ns]", **{c: np.float64 for c in PANEL_DTYPES}})
+
+    codes, code_ids = np.unique(arrays.pop("trading_code"), return_inverse=True)
+    # Stable re-sort by code id: the server's collation may order codes differently than NumPy
+    order = np.argsort(code_ids, kind="stable")
+    code_ids = code_ids[order]
+    arrays = {name: values[order] for name, values in arrays.items()}
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(code_ids, minlength=len(codes)))]).astype(np.int64)
+    days = _to_days(arrays.pop("date"))
+
+    version = datetime.datetime.utcnow().strftime("v%Y%m%dT%H%M%S%f")
+    folder = os.path.join(path, version)
+    os.makedirs(folder)
+    np.save(os.path.join(folder, "code.npy"), code_ids.astype(np.int16 if len(codes) < 2 ** 15 else np.int32))
+    np.save(os.path.join(folder, "day.npy"), days)
+    np.save(os.path.join(folder, "offsets.npy"), offsets)
+    for name, dtype in PANEL_DTYPES.items():
+        np.save(os.path.join(folder, f"{name}.npy"), arrays[name].astype(dtype))
+
+    meta = {
+        "format": PANEL_FORMAT,
+        "codes": [str(c) for c in codes],
+        "rows": int(len(days)),
+        "last_date": str(_from_days(np.max(days, keepdims=True))[0]) if len(days) else None,
+        "built_at": datetime.datetime.utcnow().isoformat() + "Z",
+    }
+    with open(os.path.join(folder, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    pointer = os.path.join(path, "CURRENT.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(path, "CURRENT"))
+    _prune(path, version)
+
+    size = sum(os.path.getsize(os.path.join(folder, n)) for n in os.listdir(folder))
+    logger.info(f"✅ Built price panel {version}: {meta['rows']} rows, {len(codes)} codes, {size / 2 ** 20:.1f} MB.")
+    return {"version": version, "rows": meta["rows"], "codes": len(codes), "bytes": size,
+            "last_date": meta["last_date"]}
+
+
+def _prune(path: str, current: str):
+    """Drop all but the newest KEEP_VERSIONS versions (a mapped file that cannot be removed yet is left)."""
+    versions = sorted(v for v in os.listdir(path) if v.startswith("v") and v != current)
+    for old in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    from utils.config import build_connection_string
+    from utils.database_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Memory-mapped price panel")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="dump market_history into a new panel version")
+    show = sub.add_parser("show", help="print the last rows of one code")
+    show.add_argument("trading_code")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        manager = DatabaseManager(build_connection_string())
+        try:
+            print(build_price_panel(manager))
+        finally:
+            manager.close()
+    else:
+        panel = get_price_panel()
+        if panel is None:
+            sys.exit("No price panel yet; run: python services/price_panel.py build")
+        print(panel.frame(args.trading_code.upper(), ["date", "closep", "volume"]).tail(10))
@@ -0,0 +1,267 @@
+"""
+Live quote fan-out for the streaming endpoints (/stream/quotes SSE, /ws/quotes).
+
+One ``QuoteHub`` per API process keeps a single upstream poller per symbol,
+however many clients watch it, plus one poller over the alert_events table:
+
+    QuoteSource.fetch(symbol) --(every QUOTE_POLL_SECONDS, only while watched)--> Topic
+    Topic --(only when the quote changed)--> every Subscriber of the symbol
+
+Subscribers never block the pollers. Each holds just the latest undelivered
+quote per symbol (a newer quote replaces the pending one: coalescing) and a
+bounded deque of alert events (oldest dropped when a client falls behind), so
+a slow or stalled client costs O(symbols) memory and zero upstream calls.
+
+Sources (QUOTE_SOURCE):
+    db    latest stored row per symbol (moves whenever an ingest lands)
+    http  GET {QUOTE_FEED_URL}/quote/{SYMBOL} -> {"ltp": ..., "time": ...}
+          (a live feed, or the local stub in benchmarks/quote_feed.py)
+"""
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set
+from utils.metrics import inc
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUOTE_SOURCE = os.getenv("QUOTE_SOURCE", "db").lower()
+QUOTE_FEED_URL = os.getenv("QUOTE_FEED_URL", "http://127.0.0.1:8765").rstrip("/")
+QUOTE_POLL_SECONDS = float(os.getenv("QUOTE_POLL_SECONDS", "2"))
+QUOTE_MIN_PUSH_SECONDS = float(os.getenv("QUOTE_MIN_PUSH_SECONDS", "0.5"))   # per-client push rate cap
+MAX_SYMBOLS_PER_CLIENT = 50
+MAX_PENDING_ALERTS = 100
+HEARTBEAT_SECONDS = 15.0
+
+
+# -----------------------------------------------------------
+# 🔹 Upstream quote sources: .fetch(symbol) -> quote dict or None (blocking, run on a thread)
+# -----------------------------------------------------------
+class DatabaseQuoteSource:
+    """Latest market_history row (served from the shared price panel when it is current)."""
+    def __init__(self, db_manager=None):
+        self._db_manager = db_manager
+        self._lock = threading.Lock()
+
+    def _service(self):
+        from services.sharemarket_service import ShareMarketService
+        from utils.config import build_connection_string
+        from utils.database_manager import DatabaseManager
+
+        with self._lock:
+            if self._db_manager is None:
+                self._db_manager = DatabaseManager(build_connection_string())
+        return ShareMarketService(self._db_manager)
+
+    def fetch(self, symbol: str) -> Optional[Dict[str, Any]]:
+        frame = self._service().get_history_frame(symbol, ["date", "ltp", "closep", "ycp", "volume"],
+                                                  direction="desc", limit=1)
+        if frame.empty:
+            return None
+        row = frame.iloc[0]
+        ltp = row["ltp"] if row["ltp"] == row["ltp"] else row["closep"]
+        return {"ltp": float(ltp), "ycp": None if row["ycp"] != row["ycp"] else float(row["ycp"]),
+                "volume": None if row["volume"] != row["volume"] else float(row["volume"]),
+                "time": str(row["date"].date())}
+
+
+class HttpQuoteSource:
+    """JSON quote endpoint: GET {base_url}/quote/{SYMBOL}."""
+    def __init__(self, base_url: str = QUOTE_FEED_URL, timeout: float = 5.0):
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.Client(timeout=timeout)
+
+    def fetch(self, symbol: str) -> Optional[Dict[str, Any]]:
+        resp = self._client.get(f"{self.base_url}/quote/{symbol}")
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return resp.json()
+
+
+def get_quote_source(kind: str = QUOTE_SOURCE):
+    if kind == "http":
+        return HttpQuoteSource()
+    if kind == "db":
+        return DatabaseQuoteSource()
+    raise ValueError(f"Unknown QUOTE_SOURCE '{kind}' (expected db or http)")
+
+
+# -----------------------------------------------------------
+# 🔹 Subscribers (coalescing, bounded)
+# -----------------------------------------------------------
+class Subscriber:
+    """One client's pending messages: latest quote per symbol plus a bounded alert backlog."""
+    def __init__(self, symbols: Iterable[str]):
+        self.symbols: Set[str] = set(symbols)
+        self._quotes: Dict[str, Dict[str, Any]] = {}
+        self._alerts: deque = deque(maxlen=MAX_PENDING_ALERTS)
+        self._ready = asyncio.Event()
+        self.coalesced = 0
+        self.dropped = 0
+
+    def offer_quote(self, quote: Dict[str, Any]):
+        if quote["symbol"] in self._quotes:
+            self.coalesced += 1
+            inc("quote_updates_coalesced_total")
+        self._quotes[quote["symbol"]] = quote
+        self._ready.set()
+
+    def offer_alert(self, event: Dict[str, Any]):
+        if len(self._alerts) == self._alerts.maxlen:
+            self.dropped += 1
+            inc("quote_alerts_dropped_total")
+        self._alerts.append(event)
+        self._ready.set()
+
+    async def next_batch(self, timeout: float = HEARTBEAT_SECONDS) -> List[Dict[str, Any]]:
+        """Everything pending (alerts first), waiting up to ``timeout``; [] means send a heartbeat."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        batch = list(self._alerts) + list(self._quotes.values())
+        self._alerts.clear()
+        self._quotes.clear()
+        return batch
+
+
+class _Topic:
+    __slots__ = ("symbol", "subscribers", "last", "task")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.subscribers: Set[Subscriber] = set()
+        self.last: Optional[Dict[str, Any]] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+# -----------------------------------------------------------
+# 🔹 Hub
+# -----------------------------------------------------------
+class QuoteHub:
+    """Per-process fan-out; create and use it from the event loop thread."""
+    def __init__(self, source=None, poll_seconds: float = QUOTE_POLL_SECONDS, alerts=None):
+        self.source = source
+        self.poll_seconds = poll_seconds
+        self.alerts = alerts
+        self._topics: Dict[str, _Topic] = {}
+        self._alert_task: Optional[asyncio.Task] = None
+        self.upstream_fetches = 0
+
+    def subscribe(self, symbols: Iterable[str]) -> Subscriber:
+        symbols = sorted({s.strip().upper() for s in symbols if s and s.strip()})
+        if not symbols:
+            raise ValueError("Subscribe to at least one symbol")
+        if len(symbols) > MAX_SYMBOLS_PER_CLIENT:
+            raise ValueError(f"At most {MAX_SYMBOLS_PER_CLIENT} symbols per client")
+        if self.source is None:
+            self.source = get_quote_source()
+
+        sub = Subscriber(symbols)
+        for symbol in symbols:
+            topic = self._topics.get(symbol)
+            if topic is None:
+                topic = self._topics[symbol] = _Topic(symbol)
+                topic.task = asyncio.create_task(self._poll(topic), name=f"quote-poll-{symbol}")
+            topic.subscribers.add(sub)
+            if topic.last is not None:
+                sub.offer_quote(topic.last)
+        if self._alert_task is None or self._alert_task.done():
+            self._alert_task = asyncio.create_task(self._poll_alerts(), name="quote-poll-alerts")
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        for symbol in sub.symbols:
+            topic = self._topics.get(symbol)
+            if topic is None:
+                continue
+            topic.subscribers.discard(sub)
+            if not topic.subscribers:
+                # Last watcher gone: stop polling upstream for this symbol
+                topic.task.cancel()
+                del self._topics[symbol]
+        if not self._topics and self._alert_task is not None:
+            # Nobody watching any symbol: stop tailing alert_events too (restarted by the next subscribe)
+            self._alert_task.cancel()
+            self._alert_task = None
+
+    async def _poll(self, topic: _Topic):
+        while True:
+            try:
+                self.upstream_fetches += 1
+                inc("quote_upstream_fetches_total")
+                quote = await asyncio.to_thread(self.source.fetch, topic.symbol)
+                if quote is not None:
+                    quote = {"type": "quote", "symbol": topic.symbol, **quote}
+                    if topic.last is None or any(quote.get(k) != topic.last.get(k) for k in ("ltp", "time")):
+                        topic.last = quote
+                        for sub in tuple(topic.subscribers):
+                            sub.offer_quote(quote)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                inc("quote_upstream_errors_total")
+                logger.warning(f"⚠️ Quote fetch failed for {topic.symbol}: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _poll_alerts(self):
+        """Forward new alert_events rows (fired by ingests in any process) to subscribers of their symbol."""
+        if self.alerts is None:
+            from services.alerts import get_alert_engine
+            self.alerts = get_alert_engine()
+        last_id = await asyncio.to_thread(self.alerts.last_event_id)
+        while True:
+            try:
+                events = await asyncio.to_thread(self.alerts.events_after, last_id)
+                for event in events:
+                    last_id = max(last_id, event["id"])
+                    topic = self._topics.get(event["trading_code"])
+                    for sub in tuple(topic.subscribers) if topic else ():
+                        sub.offer_alert({"type": "alert", **event})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Alert poll failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"symbols": len(self._topics),
+                "subscribers": len({s for t in self._topics.values() for s in t.subscribers}),
+                "upstream_fetches": self.upstream_fetches}
+
+    async def close(self):
+        tasks = [t.task for t in self._topics.values()] + ([self._alert_task] if self._alert_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._topics.clear()
+        self._alert_task = None
+
+
+async def batches(hub: QuoteHub, sub: Subscriber, min_interval: float = QUOTE_MIN_PUSH_SECONDS):
+    """
+    Yield ``sub``'s pending messages ([] = heartbeat) until the consumer stops, then unsubscribe.
+
+    The consumer's own send is the backpressure: while it is blocked, and for
+    ``min_interval`` after each push, newer quotes coalesce to the latest per symbol.
+    """
+    try:
+        while True:
+            batch = await sub.next_batch()
+            yield batch
+            if batch:
+                await asyncio.sleep(min_interval)
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,369 @@
+"""
+Local retrieval index for ResearchAgent.
+
+Company news / filings are plain files under RESEARCH_DOCS_DIR:
+
+    research/ACI/2025-q3-report.txt      -> symbol ACI
+    research/ACI/news/board-meeting.md   -> symbol ACI
+    research/dse-outlook.html            -> symbol MARKET (general context)
+
+Files are split into chunks, embedded in batches and stored in a persistent
+chromadb collection under RESEARCH_INDEX_PATH. Embeddings are cached in
+SQLite keyed by (embedder, sha256(chunk)), so re-ingesting unchanged content
+never re-embeds it, and files whose chunks are unchanged are skipped.
+
+The embedder is pluggable (RESEARCH_EMBEDDER): a sentence-transformers model
+when it can be loaded locally, otherwise an offline feature-hashing embedder
+that needs nothing beyond NumPy.
+
+    python services/research_index.py ingest
+    python services/research_index.py query ACI "dividend outlook"
+"""
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import hashlib
+import html
+import logging
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RESEARCH_DOCS_DIR = os.getenv("RESEARCH_DOCS_DIR", "research")
+RESEARCH_INDEX_PATH = os.getenv("RESEARCH_INDEX_PATH", os.path.join("db", "research_index"))
+# auto | hashing | any sentence-transformers model name
+RESEARCH_EMBEDDER = os.getenv("RESEARCH_EMBEDDER", "auto")
+RESEARCH_TOP_K = int(os.getenv("RESEARCH_TOP_K", "5"))
+DEFAULT_ST_MODEL = "all-MiniLM-L6-v2"
+GENERAL_SYMBOL = "MARKET"
+DOC_EXTENSIONS = (".txt", ".md", ".html", ".htm")
+CHUNK_CHARS = 1_000
+EMBED_BATCH = 64
+
+
+# -----------------------------------------------------------
+# 🔹 Embedders: .slug (cache/collection key), .dim, .embed(texts) -> (n, dim) float32, L2-normalized
+# -----------------------------------------------------------
+class HashingEmbedder:
+    """Offline fallback: signed feature hashing of word unigrams + bigrams."""
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.slug = f"hashing-{dim}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"[a-z0-9]+", text.lower())
+            grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            if not grams:
+                continue
+            hashes = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint32, count=len(grams))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(out[row], (hashes % self.dim).astype(np.int64), signs)
+        # Sublinear term weighting, then unit length for cosine similarity
+        out = np.sign(out) * np.log1p(np.abs(out))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1.0, norms)
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name: str = DEFAULT_ST_MODEL, batch_size: int = EMBED_BATCH):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.batch_size = batch_size
+        self.dim = int(self.model.get_sentence_embedding_dimension())
+        self.slug = "st-" + re.sub(r"[^a-z0-9]+", "-", model_name.lower()).strip("-")
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+                                    convert_to_numpy=True, show_progress_bar=False)
+        return vectors.astype(np.float32, copy=False)
+
+
+def get_embedder(name: str = RESEARCH_EMBEDDER):
+    """``hashing`` -> offline embedder; a model name -> that model; ``auto`` -> MiniLM if loadable, else hashing."""
+    if name == "hashing":
+        return HashingEmbedder()
+    try:
+        return SentenceTransformerEmbedder(DEFAULT_ST_MODEL if name == "auto" else name)
+    except Exception as e:
+        if name != "auto":
+            raise
+        logger.warning(f"⚠️ sentence-transformers unavailable ({e}); using offline hashing embedder")
+        return HashingEmbedder()
+
+
+# -----------------------------------------------------------
+# 🔹 Embedding cache (content hash -> vector)
+# -----------------------------------------------------------
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    embedder TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL,
+                    PRIMARY KEY (embedder, hash)
+                )
+            """)
+            self._conn.commit()
+
+    def get_many(self, embedder: str, hashes: Sequence[str], dim: int) -> Dict[str, np.ndarray]:
+        found = {}
+        keys = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE embedder = ? AND hash IN ({','.join('?' * len(part))})",
+                    [embedder, *part],
+                ).fetchall()
+                for h, blob in rows:
+                    vec = np.frombuffer(blob, dtype=np.float32)
+                    if len(vec) == dim:
+                        found[h] = vec
+        return found
+
+    def put_many(self, embedder: str, items: Sequence[Tuple[str, np.ndarray]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (embedder, hash, vector) VALUES (?, ?, ?)",
+                [(embedder, h, np.ascontiguousarray(v, dtype=np.float32).tobytes()) for h, v in items],
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+# -----------------------------------------------------------
+# 🔹 Documents
+# -----------------------------------------------------------
+def read_document(path: str) -> str:
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+    if path.lower().endswith((".html", ".htm")):
+        text = re.sub(r"(?is)<(script|style)\b.*?</\1>", " ", text)
+        text = html.unescape(re.sub(r"(?s)<[^>]+>", " ", text))
+    return re.sub(r"[ \t\r\f\v]+", " ", text).strip()
+
+
+def chunk_text(text: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """Greedy paragraph packing into chunks of at most ``max_chars`` (long paragraphs are hard-split)."""
+    chunks, current = [], ""
+    for para in (p.strip() for p in re.split(r"\n\s*\n", text)):
+        if not para:
+            continue
+        while len(para) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(para[:max_chars])
+            para = para[max_chars:]
+        if current and len(current) + len(para) + 2 > max_chars:
+            chunks.append(current)
+            current = para
+        else:
+            current = f"{current}\n\n{para}" if current else para
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def iter_documents(root: str) -> Iterator[Tuple[str, str, str]]:
+    """(symbol, relative path, absolute path) for every supported file under ``root``."""
+    for dirpath, _, files in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        symbol = GENERAL_SYMBOL if rel_dir == "." else rel_dir.split(os.sep)[0].upper()
+        for name in sorted(files):
+            if name.lower().endswith(DOC_EXTENSIONS):
+                path = os.path.join(dirpath, name)
+                yield symbol, os.path.relpath(path, root).replace(os.sep, "/"), path
+
+
+# -----------------------------------------------------------
+# 🔹 Index
+# -----------------------------------------------------------
+class ResearchIndex:
+    """Persistent chromadb collection per embedder, fed through the embedding cache."""
+    def __init__(self, path: str = RESEARCH_INDEX_PATH, embedder=None, batch_size: int = EMBED_BATCH,
+                 query_cache_size: int = 1024):
+        import chromadb
+        from chromadb.config import Settings
+
+        os.makedirs(path, exist_ok=True)
+        self.embedder = embedder or get_embedder()
+        self.batch_size = batch_size
+        self.cache = EmbeddingCache(os.path.join(path, "embeddings.sqlite"))
+        self.client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+        # Embeddings are always passed in, so chromadb never loads its own embedding model
+        self.collection = self.client.get_or_create_collection(
+            f"research_{self.embedder.slug}", metadata={"hnsw:space": "cosine"}, embedding_function=None)
+        self._queries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_size = query_cache_size
+        self._lock = threading.Lock()
+
+    # ---------- embedding ----------
+    def embed(self, texts: Sequence[str]) -> Tuple[np.ndarray, int]:
+        """Vectors for ``texts`` plus how many had to be embedded (the rest came from the cache)."""
+        hashes = [content_hash(t) for t in texts]
+        cached = self.cache.get_many(self.embedder.slug, hashes, self.embedder.dim)
+        missing = list(dict.fromkeys(h for h in hashes if h not in cached))
+        if missing:
+            text_by_hash = dict(zip(hashes, texts))
+            for start in range(0, len(missing), self.batch_size):
+                batch = missing[start:start + self.batch_size]
+                vectors = self.embedder.embed([text_by_hash[h] for h in batch])
+                self.cache.put_many(self.embedder.slug, list(zip(batch, vectors)))
+                cached.update(zip(batch, vectors))
+        out = np.vstack([cached[h] for h in hashes]) if hashes else np.empty((0, self.embedder.dim), np.float32)
+        return out, len(missing)
+
+    def _query_vector(self, text: str) -> np.ndarray:
+        with self._lock:
+            vec = self._queries.get(text)
+            if vec is not None:
+                self._queries.move_to_end(text)
+                return vec
+        vec = self.embed([text])[0][0]
+        with self._lock:
+            self._queries[text] = vec
+            if len(self._queries) > self._query_cache_size:
+                self._queries.popitem(last=False)
+        return vec
+
+    # ---------- ingest ----------
+    def ingest_file(self, symbol: str, rel_path: str, path: str) -> Dict[str, int]:
+        chunks = chunk_text(read_document(path))
+        ids = [f"{symbol}:{rel_path}#{i}" for i in range(len(chunks))]
+        hashes = [content_hash(c) for c in chunks]
+
+        existing = self.collection.get(where={"path": rel_path}, include=["metadatas"])
+        stored = {i: m.get("hash") for i, m in zip(existing["ids"], existing["metadatas"] or [])}
+        if stored == dict(zip(ids, hashes)):
+            return {"chunks": len(chunks), "embedded": 0, "skipped": 1}
+
+        current = set(ids)
+        stale = [i for i in stored if i not in current]
+        if stale:
+            self.collection.delete(ids=stale)
+        if not chunks:
+            return {"chunks": 0, "embedded": 0, "skipped": 0}
+
+        vectors, embedded = self.embed(chunks)
+        title = os.path.splitext(os.path.basename(rel_path))[0].replace("-", " ").replace("_", " ")
+        modified = time.strftime("%Y-%m-%d", time.gmtime(os.path.getmtime(path)))
+        self.collection.upsert(
+            ids=ids, embeddings=vectors.tolist(), documents=chunks,
+            metadatas=[{"symbol": symbol, "path": rel_path, "title": title, "hash": h, "chunk": i,
+                        "modified": modified} for i, h in enumerate(hashes)],
+        )
+        return {"chunks": len(chunks), "embedded": embedded, "skipped": 0}
+
+    def ingest_dir(self, root: str = RESEARCH_DOCS_DIR,
+                   on_file: Optional[Callable[[int, Dict[str, int]], None]] = None) -> Dict[str, int]:
+        """Ingest every document under ``root``; chunks of files that disappeared are removed."""
+        totals = {"files": 0, "chunks": 0, "embedded": 0, "skipped": 0, "removed": 0}
+        seen = set()
+        for symbol, rel_path, path in iter_documents(root):
+            seen.add(rel_path)
+            result = self.ingest_file(symbol, rel_path, path)
+            totals["files"] += 1
+            for key in ("chunks", "embedded", "skipped"):
+                totals[key] += result[key]
+            if on_file:
+                on_file(totals["files"], totals)
+
+        ids, paths = self._all_paths()
+        gone = [i for i, p in zip(ids, paths) if p not in seen]
+        if gone:
+            self.collection.delete(ids=gone)
+            totals["removed"] = len(gone)
+        logger.info(f"✅ Research index: {totals}")
+        return totals
+
+    def _all_paths(self) -> Tuple[List[str], List[str]]:
+        existing = self.collection.get(include=["metadatas"])
+        return existing["ids"], [m.get("path") for m in existing["metadatas"] or []]
+
+    # ---------- search ----------
+    def search(self, symbol: Optional[str], query: str, k: int = RESEARCH_TOP_K) -> List[Dict[str, Any]]:
+        """Top ``k`` chunks for ``symbol`` (plus general MARKET documents) by cosine similarity."""
+        if self.collection.count() == 0:
+            return []
+        symbols = [GENERAL_SYMBOL] + ([symbol.upper()] if symbol else [])
+        where = {"symbol": {"$in": symbols}} if len(symbols) > 1 else {"symbol": symbols[0]}
+        res = self.collection.query(query_embeddings=[self._query_vector(query).tolist()], n_results=k,
+                                    where=where, include=["documents", "metadatas", "distances"])
+        return [
+            {"symbol": m.get("symbol"), "title": m.get("title"), "source": m.get("path"),
+             "modified": m.get("modified"), "score": round(1.0 - float(d), 4), "snippet": doc[:400]}
+            for doc, m, d in zip(res["documents"][0], res["metadatas"][0], res["distances"][0])
+        ]
+
+    def close(self):
+        self.cache.close()
+
+
+_index: Optional[ResearchIndex] = None
+_index_unavailable: Optional[str] = None    # why the index cannot be built in this process (missing dependency)
+_index_lock = threading.Lock()
+
+
+def get_research_index() -> Optional[ResearchIndex]:
+    """
+    Process-wide index, opened on first use; None when chromadb is unavailable (remembered, so
+    the import is not retried per call). Other open errors propagate and are retried next call.
+    """
+    global _index, _index_unavailable
+    if _index is None and _index_unavailable is None:
+        with _index_lock:
+            if _index is None and _index_unavailable is None:
+                try:
+                    _index = ResearchIndex()
+                except ImportError as e:
+                    _index_unavailable = str(e)
+                    logger.warning(f"⚠️ Research index disabled: {e}")
+    return _index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local research vector index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="embed and index documents")
+    ingest.add_argument("--dir", default=RESEARCH_DOCS_DIR)
+    query = sub.add_parser("query", help="search one symbol's documents")
+    query.add_argument("symbol")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=RESEARCH_TOP_K)
+    args = parser.parse_args()
+
+    index = ResearchIndex()
+    if args.command == "ingest":
+        print(index.ingest_dir(args.dir))
+    else:
+        started = time.perf_counter()
+        hits = index.search(args.symbol, args.text, args.k)
+        for hit in hits:
+            print(f"{hit['score']:.3f}  {hit['source']}  {hit['snippet'][:120]!r}")
+        print(f"⏱️ {1000 * (time.perf_counter() - started):.1f} ms")
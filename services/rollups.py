@@ -0,0 +1,134 @@
+import os
+import sys
+
+# Add project root to Python path (so 'utils' can be imported)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import datetime
+import logging
+from typing import Any, Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from utils.sql_dialect import SqlDialect
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rollup tables from migration 0004 (same price columns as daily history, ``date`` = last trading day)
+ROLLUP_TABLES = {"weekly": "market_history_weekly", "monthly": "market_history_monthly"}
+RESOLUTIONS = ("daily", "weekly", "monthly")
+OHLCV_COLUMNS = ["date", "ltp", "high", "low", "openp", "closep", "trade", "value_mn", "volume"]
+ROLLUP_COLUMNS = ["trading_code", "period_start"] + OHLCV_COLUMNS + ["days"]
+
+# Rough trading days per bucket (DSE trades Sunday–Thursday)
+TRADING_DAYS_PER_BUCKET = {"daily": 1, "weekly": 5, "monthly": 21}
+
+_EPOCH_WEEKDAY_FROM_SUNDAY = 4   # 1970-01-01 was a Thursday
+
+
+def period_starts(dates: Any, resolution: str) -> np.ndarray:
+    """First calendar day of each date's bucket: the Sunday that opens its DSE week, or the 1st of its month."""
+    days = np.asarray(dates).astype("datetime64[D]")
+    if resolution == "weekly":
+        ordinals = days.astype(np.int64)
+        return (ordinals - (ordinals + _EPOCH_WEEKDAY_FROM_SUNDAY) % 7).astype("datetime64[D]")
+    if resolution == "monthly":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Unknown rollup resolution '{resolution}' (expected one of {list(ROLLUP_TABLES)})")
+
+
+def period_start(day: Any, resolution: str) -> datetime.date:
+    return period_starts([np.datetime64(pd.Timestamp(day).date(), "D")], resolution)[0].astype(datetime.date)
+
+
+def aggregate(daily: pd.DataFrame, resolution: str) -> pd.DataFrame:
+    """Daily rows (trading_code, date, OHLCV) -> one row per (trading_code, bucket)."""
+    df = daily.sort_values(["trading_code", "date"], kind="stable")
+    df = df.assign(period_start=period_starts(df["date"].to_numpy(), resolution))
+    grouped = df.groupby(["trading_code", "period_start"], sort=True)
+    out = grouped.agg(
+        date=("date", "max"),
+        ltp=("ltp", "last"),
+        high=("high", "max"),
+        low=("low", "min"),
+        openp=("openp", "first"),
+        closep=("closep", "last"),
+        trade=("trade", "sum"),
+        value_mn=("value_mn", "sum"),
+        volume=("volume", "sum"),
+        days=("date", "size"),
+    ).reset_index()
+    return out[ROLLUP_COLUMNS]
+
+
+def _read_daily(session: Session, sql: SqlDialect, codes: Sequence[str], start: Optional[datetime.date]) -> pd.DataFrame:
+    where = " AND date >= :start" if start is not None else ""
+    stmt = text(f"""
+        SELECT trading_code, {", ".join(OHLCV_COLUMNS)}
+        FROM {sql.table("market_history")}
+        WHERE trading_code IN :codes{where}
+        ORDER BY trading_code, date
+    """).bindparams(bindparam("codes", expanding=True))
+    params: Dict[str, Any] = {"codes": list(codes)}
+    if start is not None:
+        params["start"] = start
+    rows = session.execute(stmt, params).fetchall()
+
+    df = pd.DataFrame.from_records(rows, columns=["trading_code"] + OHLCV_COLUMNS)
+    df["date"] = pd.to_datetime(df["date"])
+    numeric = [c for c in OHLCV_COLUMNS if c != "date"]
+    df[numeric] = df[numeric].astype("float64")
+    return df
+
+
+def refresh_rollups(session: Session, sql: SqlDialect, codes: Sequence[str],
+                    since: Optional[Any] = None) -> Dict[str, int]:
+    """
+    Recompute the weekly/monthly buckets of ``codes`` that contain ``since`` or later (all buckets when None).
+
+    Appending a trading day only re-reads and rewrites the open (last) week and
+    month. Runs inside the caller's transaction; the caller commits.
+    """
+    codes = sorted(set(codes))
+    if not codes:
+        return {}
+    starts = {r: period_start(since, r) for r in ROLLUP_TABLES} if since is not None else {}
+    daily = _read_daily(session, sql, codes, min(starts.values()) if starts else None)
+
+    written = {}
+    for resolution, table in ROLLUP_TABLES.items():
+        start = starts.get(resolution)
+        buckets = aggregate(daily, resolution) if len(daily) else pd.DataFrame(columns=ROLLUP_COLUMNS)
+        if start is not None:
+            # Buckets opening before ``start`` were only partially read; they are unchanged anyway
+            buckets = buckets[buckets["period_start"] >= np.datetime64(start, "D")]
+
+        where = " AND period_start >= :start" if start is not None else ""
+        delete = text(f"DELETE FROM {sql.table(table)} WHERE trading_code IN :codes{where}") \
+            .bindparams(bindparam("codes", expanding=True))
+        session.execute(delete, {"codes": codes, **({"start": start} if start is not None else {})})
+
+        if len(buckets):
+            buckets = buckets.assign(
+                period_start=pd.to_datetime(buckets["period_start"]).dt.date,
+                date=pd.to_datetime(buckets["date"]).dt.date,
+            )
+            records = buckets.astype(object).where(buckets.notna(), None).to_dict("records")
+            session.execute(text(f"""
+                INSERT INTO {sql.table(table)} ({", ".join(ROLLUP_COLUMNS)})
+                VALUES ({", ".join(":" + c for c in ROLLUP_COLUMNS)})
+            """), records)
+        written[resolution] = len(buckets)
+    return written
+
+
+def choose_resolution(trading_days: float, max_points: Optional[int]) -> str:
+    """Finest resolution whose row count for ``trading_days`` fits in ``max_points``."""
+    if not max_points:
+        return "daily"
+    for resolution in RESOLUTIONS:
+        if trading_days / TRADING_DAYS_PER_BUCKET[resolution] <= max_points:
+            return resolution
+    return "monthly"
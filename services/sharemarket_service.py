@@ -4,17 +4,64 @@ import sys
 # Add project root to Python path (so 'utils' can be imported)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+import asyncio
+import datetime
+import itertools
 import json
 import logging
-from typing import List, Dict, Any, Optional
-from sqlalchemy import text
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import Date, column, text
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from utils.database_manager import DatabaseManager
+from utils.database_manager import AsyncDatabaseManager, DatabaseManager
+from services.rollups import OHLCV_COLUMNS, RESOLUTIONS, ROLLUP_TABLES, choose_resolution
+from services.price_panel import PRICE_PANEL_MODE, PricePanel, get_price_panel
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns callers may project from dbo.market_history (whitelist: names are interpolated into SQL)
+HISTORY_COLUMNS = ("date", "trading_code", "ltp", "high", "low", "openp", "closep",
+                   "ycp", "trade", "value_mn", "volume")
+
+
+# NumPy dtypes used when materializing history (no Decimal / object price columns)
+HISTORY_DTYPES = {c: "float64" for c in HISTORY_COLUMNS}
+HISTORY_DTYPES.update({"date": "datetime64[ns]", "trading_code": object})
+
+
+def _grow(arr: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.empty(capacity, dtype=arr.dtype)
+    grown[:len(arr)] = arr
+    return grown
+
+
+def _arrow_to_arrays(table, names: List[str], dtypes: List[np.dtype]) -> Dict[str, np.ndarray]:
+    import pyarrow as pa
+
+    out = {}
+    for i, (name, dtype) in enumerate(zip(names, dtypes)):
+        col = table.column(i)
+        if dtype.kind == "f":
+            col = col.cast(pa.float64())
+        elif dtype.kind == "M":
+            col = col.cast(pa.timestamp("ns"))
+        out[name] = np.asarray(col.to_numpy(), dtype=dtype)
+    return out
+
+
+def history_columns(columns: Optional[Sequence[str]] = None) -> List[str]:
+    """Validate a column projection; ``date`` is always included first as the pagination key."""
+    if not columns:
+        return list(HISTORY_COLUMNS)
+    cols = [c.strip().lower() for c in columns if c and c.strip()]
+    unknown = [c for c in cols if c not in HISTORY_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown history columns: {unknown} (allowed: {list(HISTORY_COLUMNS)})")
+    return ["date"] + [c for c in dict.fromkeys(cols) if c != "date"]
+
 
 class ShareMarketService:
     """Service class for Share Market related database operations."""
@@ -28,10 +75,11 @@ class ShareMarketService:
     def get_trading_list(self) -> Optional[List[str]]:
         session = self.db_manager.get_session()
         try:
-            sql = text("SELECT DISTINCT trading_code FROM dbo.market_history ORDER BY trading_code ASC")
+            # dbo.symbols is maintained by MarketHistoryLoader: a PK scan instead of DISTINCT over the fact table
+            sql = text(f"SELECT trading_code FROM {self.db_manager.sql.table('symbols')} ORDER BY trading_code ASC")
             result = session.execute(sql).fetchall()
             if not result:
-                logger.warning("⚠️ No trading codes found in market_history.")
+                logger.warning("⚠️ No trading codes found in symbols.")
                 return None
             trading_codes = [row[0] for row in result if row[0]]
             logger.info(f"✅ Retrieved {len(trading_codes)} trading codes.")
@@ -43,28 +91,353 @@ class ShareMarketService:
             session.close()
 
     # -----------------------------------------------------------
-    # 🔹 Get history for a specific trading code
+    # 🔹 Latest stored date per trading code (oldest first)
+    # -----------------------------------------------------------
+    def get_last_dates(self) -> Dict[str, Any]:
+        session = self.db_manager.get_session()
+        try:
+            sql = text(f"SELECT trading_code, last_date FROM {self.db_manager.sql.table('symbols')} ORDER BY last_date ASC")
+            return {row[0]: row[1] for row in session.execute(sql).fetchall()}
+        except SQLAlchemyError as e:
+            logger.error(f"❌ Database error in get_last_dates: {e}")
+            return {}
+        finally:
+            session.close()
+
+    def latest_close(self, trading_code: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """(last stored date, its close) for one code, from dbo.symbols' last_date; None if nothing is stored."""
+        dialect = self.db_manager.sql
+        session = self.db_manager.get_session()
+        try:
+            row = session.execute(text(f"""
+                SELECT m.date, m.closep FROM {dialect.table("market_history")} m
+                JOIN {dialect.table("symbols")} s ON s.trading_code = m.trading_code AND s.last_date = m.date
+                WHERE m.trading_code = :code
+            """), {"code": trading_code.strip().upper()}).fetchone()
+        finally:
+            session.close()
+        if row is None:
+            return None
+        return row[0], None if row[1] is None else float(row[1])
+
+    # -----------------------------------------------------------
+    # 🔹 Keyset history query (shared by iter_history / get_history_frame)
     # -----------------------------------------------------------
-    def get_history_by_code(self, trading_code: str) -> Optional[List[Dict[str, Any]]]:
+    def _history_query(self, trading_code: str, cols: List[str], cursor: Optional[Any],
+                       direction: str, limit: Optional[int]) -> Tuple[str, Dict[str, Any]]:
+        if direction not in ("asc", "desc"):
+            raise ValueError("direction must be 'asc' or 'desc'")
+        op, order = ("<", "DESC") if direction == "desc" else (">", "ASC")
+
+        dialect = self.db_manager.sql
+        where = f" AND date {op} :cursor" if cursor is not None else ""
+        sql = f"""
+            SELECT {dialect.top() if limit else ""}{", ".join(cols)}
+            FROM {dialect.table("market_history")}
+            WHERE trading_code = :trading_code{where}
+            ORDER BY date {order}{dialect.limit() if limit else ""}
+        """
+        params: Dict[str, Any] = {"trading_code": trading_code}
+        if limit:
+            params["limit"] = int(limit)
+        if cursor is not None:
+            params["cursor"] = cursor
+        return sql, params
+
+    # -----------------------------------------------------------
+    # 🔹 Stream history for a trading code (keyset paginated)
+    # -----------------------------------------------------------
+    def iter_history(self, trading_code: str, columns: Optional[Sequence[str]] = None,
+                     cursor: Optional[Any] = None, direction: str = "desc",
+                     limit: Optional[int] = None, batch_size: int = 1000) -> Iterator[Tuple]:
+        """
+        Yield history rows as tuples in ``history_columns(columns)`` order.
+
+        ``cursor`` is the last date already seen; rows strictly after it in
+        ``direction`` are returned, so walking pages is an index seek on
+        (trading_code, date) instead of an OFFSET scan. Rows are pulled from
+        the server ``batch_size`` at a time.
+        """
+        cols = history_columns(columns)
+        sql, params = self._history_query(trading_code, cols, cursor, direction, limit)
+        stmt = text(sql).columns(
+            # Typed date so embedded backends (SQLite stores ISO text) also return datetime.date
+            *[column(c, Date if c == "date" else None) for c in cols]
+        ).execution_options(yield_per=batch_size)
+
         session = self.db_manager.get_session()
         try:
-            sql = text("""
-                SELECT TOP 100 *
-                FROM dbo.market_history
+            for row in session.execute(stmt, params):
+                yield tuple(row)
+        finally:
+            session.close()
+
+    # -----------------------------------------------------------
+    # 🔹 Typed fetch straight into NumPy arrays
+    # -----------------------------------------------------------
+    def fetch_arrays(self, sql: str, params: Optional[Dict[str, Any]], schema: Dict[str, Any],
+                     batch_size: int = 10_000, size_hint: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Run ``sql`` and return one NumPy array per ``schema`` entry (column name -> dtype, in SELECT order).
+
+        Uses the driver's Arrow path when it has one (DuckDB); otherwise reads
+        raw DBAPI rows ``batch_size`` at a time into preallocated arrays, so
+        Decimals/dates are converted once by NumPy and no Row objects or
+        intermediate object DataFrame are built.
+        """
+        names = list(schema)
+        dtypes = [np.dtype(schema[n]) for n in names]
+        session = self.db_manager.get_session()
+        try:
+            result = session.execute(text(sql), params or {})
+            cursor = result.cursor
+
+            fetch_arrow = getattr(cursor, "fetch_arrow_table", None)
+            if callable(fetch_arrow):
+                return _arrow_to_arrays(fetch_arrow(), names, dtypes)
+
+            capacity = size_hint or batch_size
+            out = [np.empty(capacity, dtype=d) for d in dtypes]
+            n = 0
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                m = len(rows)
+                if n + m > capacity:
+                    capacity = max(capacity * 2, n + m)
+                    out = [_grow(arr, capacity) for arr in out]
+                for arr, values in zip(out, zip(*rows)):
+                    arr[n:n + m] = values
+                n += m
+            return {name: arr[:n] for name, arr in zip(names, out)}
+        finally:
+            session.close()
+
+    # -----------------------------------------------------------
+    # 🔹 Change marker: (stored rows, last date) from dbo.symbols
+    # -----------------------------------------------------------
+    def data_version(self) -> Tuple[int, Optional[str]]:
+        """Moves whenever a load adds rows; caches of history and analyses are keyed by it."""
+        session = self.db_manager.get_session()
+        try:
+            rows, last_date = session.execute(text(
+                f"SELECT SUM(row_count), MAX(last_date) FROM {self.db_manager.sql.table('symbols')}")).fetchone()
+        finally:
+            session.close()
+        return int(rows or 0), None if last_date is None else str(last_date)
+
+    # -----------------------------------------------------------
+    # 🔹 Shared memory-mapped panel, when it is current
+    # -----------------------------------------------------------
+    def price_panel(self) -> Optional[PricePanel]:
+        """The memory-mapped panel (services/price_panel.py) if it matches dbo.symbols' row count and last date."""
+        if PRICE_PANEL_MODE == "off":
+            return None
+        panel = get_price_panel()
+        if panel is None:
+            return None
+        try:
+            rows, last_date = self.data_version()
+        except SQLAlchemyError as e:
+            logger.error(f"❌ Database error in price_panel: {e}")
+            return None
+        if last_date is None or rows != panel.rows or str(pd.Timestamp(last_date).date()) != panel.meta["last_date"]:
+            return None
+        return panel
+
+    # -----------------------------------------------------------
+    # 🔹 Typed history frame (float64 prices, datetime64 dates)
+    # -----------------------------------------------------------
+    def get_history_frame(self, trading_code: str, columns: Optional[Sequence[str]] = None,
+                          cursor: Optional[Any] = None, direction: str = "asc",
+                          limit: Optional[int] = None) -> pd.DataFrame:
+        """Sliced from the shared price panel when it is current, else read from market_history."""
+        cols = history_columns(columns)
+        if direction not in ("asc", "desc"):
+            raise ValueError("direction must be 'asc' or 'desc'")
+        panel = self.price_panel()
+        if panel is not None and trading_code in panel:
+            return panel.frame(trading_code, cols, cursor, direction, limit)
+        sql, params = self._history_query(trading_code, cols, cursor, direction, limit)
+        arrays = self.fetch_arrays(sql, params, {c: HISTORY_DTYPES[c] for c in cols}, size_hint=limit)
+        return pd.DataFrame(arrays, copy=False)
+
+    # -----------------------------------------------------------
+    # 🔹 OHLCV at the resolution that fits a point budget
+    # -----------------------------------------------------------
+    def get_ohlcv(self, trading_code: str, start: Optional[Any] = None, end: Optional[Any] = None,
+                  max_points: Optional[int] = None, resolution: str = "auto") -> Tuple[str, pd.DataFrame]:
+        """
+        (resolution, frame) for ``trading_code`` between ``start`` and ``end`` (inclusive, either open).
+
+        With ``resolution="auto"`` the daily table is used when the range fits in
+        ``max_points`` rows, else the weekly or monthly rollup (migration 0004),
+        so multi-year ranges read a few hundred rows. ``date`` is the last
+        trading day of each bucket.
+        """
+        if resolution == "auto":
+            resolution = choose_resolution(self._trading_days(trading_code, start, end), max_points)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be 'auto' or one of {list(RESOLUTIONS)}")
+
+        table = "market_history" if resolution == "daily" else ROLLUP_TABLES[resolution]
+        where, params = "", {"trading_code": trading_code}
+        if start is not None:
+            where += " AND date >= :start"
+            params["start"] = pd.Timestamp(start).date()
+        if end is not None:
+            where += " AND date <= :end"
+            params["end"] = pd.Timestamp(end).date()
+        sql = f"""
+            SELECT {", ".join(OHLCV_COLUMNS)}
+            FROM {self.db_manager.sql.table(table)}
+            WHERE trading_code = :trading_code{where}
+            ORDER BY date ASC
+        """
+        arrays = self.fetch_arrays(sql, params, {c: HISTORY_DTYPES[c] for c in OHLCV_COLUMNS})
+        return resolution, pd.DataFrame(arrays, copy=False)
+
+    def _trading_days(self, trading_code: str, start: Optional[Any], end: Optional[Any]) -> float:
+        """Estimated daily rows in the range, from dbo.symbols (no scan of the fact table)."""
+        session = self.db_manager.get_session()
+        try:
+            row = session.execute(text(f"""
+                SELECT first_date, last_date, row_count FROM {self.db_manager.sql.table("symbols")}
                 WHERE trading_code = :trading_code
-                ORDER BY date DESC
-            """)
-            result = session.execute(sql, {"trading_code": trading_code}).fetchall()
-            if not result:
+            """), {"trading_code": trading_code}).fetchone()
+        finally:
+            session.close()
+        if row is None or row[0] is None:
+            return 0.0
+        first, last, count = pd.Timestamp(row[0]), pd.Timestamp(row[1]), row[2]
+        lo = max(first, pd.Timestamp(start)) if start is not None else first
+        hi = min(last, pd.Timestamp(end)) if end is not None else last
+        if hi < lo:
+            return 0.0
+        span = (last - first).days + 1
+        return count * ((hi - lo).days + 1) / span
+
+    # -----------------------------------------------------------
+    # 🔹 Get history for a specific trading code
+    # -----------------------------------------------------------
+    def get_history_by_code(self, trading_code: str, columns: Optional[Sequence[str]] = None,
+                            cursor: Optional[Any] = None, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        try:
+            cols = history_columns(columns)
+            data = [dict(zip(cols, row)) for row in
+                    self.iter_history(trading_code, cols, cursor=cursor, direction="desc", limit=limit)]
+            if not data:
                 logger.warning(f"⚠️ No data found for trading_code: {trading_code}")
                 return None
-
-            # Convert to list of dicts
-            data = [dict(row._mapping) for row in result]
             logger.info(f"✅ Retrieved {len(data)} rows for {trading_code}")
             return data
         except SQLAlchemyError as e:
             logger.error(f"❌ Database error in get_history_by_code: {e}")
             return None
+
+    # -----------------------------------------------------------
+    # 🔹 Rebuild per-code summary rows (dbo.market_summary, migration 0003)
+    # -----------------------------------------------------------
+    def refresh_summary(self) -> int:
+        session = self.db_manager.get_session()
+        try:
+            dialect = self.db_manager.sql
+            history, summary = dialect.table("market_history"), dialect.table("market_summary")
+            session.execute(text(f"DELETE FROM {summary}"))
+            session.execute(text(f"""
+                INSERT INTO {summary}
+                    (trading_code, first_date, last_date, row_count, last_close,
+                     min_close, max_close, avg_close, std_close, refreshed_at)
+                SELECT a.trading_code, a.first_date, a.last_date, a.row_count, l.closep,
+                       a.min_close, a.max_close, a.avg_close, a.std_close, :now
+                FROM (
+                    SELECT trading_code, MIN(date) AS first_date, MAX(date) AS last_date, COUNT(*) AS row_count,
+                           MIN(closep) AS min_close, MAX(closep) AS max_close,
+                           AVG(CAST(closep AS DOUBLE PRECISION)) AS avg_close,
+                           {dialect.stdev}(closep) AS std_close
+                    FROM {history}
+                    GROUP BY trading_code
+                ) a
+                JOIN {history} l ON l.trading_code = a.trading_code AND l.date = a.last_date
+            """), {"now": datetime.datetime.utcnow()})
+            # Counted, not taken from rowcount: DuckDB reports -1 for INSERT ... SELECT
+            codes = session.execute(text(f"SELECT COUNT(*) FROM {summary}")).scalar()
+            session.commit()
+            logger.info(f"✅ Refreshed market_summary for {codes} trading codes.")
+            return int(codes or 0)
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"❌ Database error in refresh_summary: {e}")
+            raise
         finally:
             session.close()
+
+
+class AsyncShareMarketService:
+    """
+    ShareMarketService for async handlers: each method awaits its synchronous
+    counterpart on the AsyncDatabaseManager's DB threads, so the event loop
+    never blocks and independent queries can run concurrently.
+    """
+    def __init__(self, db: AsyncDatabaseManager):
+        self.db = db
+        self.sync = ShareMarketService(db.db_manager)
+
+    async def get_trading_list(self) -> Optional[List[str]]:
+        return await self.db.run(self.sync.get_trading_list)
+
+    async def get_last_dates(self) -> Dict[str, Any]:
+        return await self.db.run(self.sync.get_last_dates)
+
+    async def fetch_arrays(self, sql: str, params: Optional[Dict[str, Any]], schema: Dict[str, Any],
+                           **kwargs) -> Dict[str, np.ndarray]:
+        return await self.db.run(self.sync.fetch_arrays, sql, params, schema, **kwargs)
+
+    async def data_version(self) -> Tuple[int, Optional[str]]:
+        return await self.db.run(self.sync.data_version)
+
+    async def get_history_frame(self, trading_code: str, columns: Optional[Sequence[str]] = None,
+                                cursor: Optional[Any] = None, direction: str = "asc",
+                                limit: Optional[int] = None) -> pd.DataFrame:
+        return await self.db.run(self.sync.get_history_frame, trading_code, columns, cursor, direction, limit)
+
+    async def get_history_rows(self, trading_code: str, columns: Optional[Sequence[str]] = None,
+                               cursor: Optional[Any] = None, direction: str = "desc",
+                               limit: Optional[int] = None) -> List[Tuple]:
+        """One bounded page of ``iter_history`` rows."""
+        return await self.db.run(lambda: list(self.sync.iter_history(trading_code, columns, cursor, direction, limit)))
+
+    async def iter_history(self, trading_code: str, columns: Optional[Sequence[str]] = None,
+                           cursor: Optional[Any] = None, direction: str = "desc",
+                           limit: Optional[int] = None, batch_size: int = 1000) -> AsyncIterator[List[Tuple]]:
+        """
+        ``iter_history`` in lists of up to ``batch_size`` rows. The server cursor
+        (and its session) stays open across DB-thread calls and is closed when
+        the consumer stops, including on client disconnect.
+        """
+        rows = self.sync.iter_history(trading_code, columns, cursor, direction, limit, batch_size)
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                pending = asyncio.ensure_future(self.db.run(lambda: list(itertools.islice(rows, batch_size))))
+                page = await asyncio.shield(pending)
+                if not page:
+                    break
+                yield page
+        finally:
+            if pending is not None and not pending.done():
+                # A DB thread cannot be interrupted: let the in-flight fetch finish before closing the cursor
+                await asyncio.wait([pending])
+            await self.db.run(rows.close)
+
+    async def get_ohlcv(self, trading_code: str, start: Optional[Any] = None, end: Optional[Any] = None,
+                        max_points: Optional[int] = None, resolution: str = "auto") -> Tuple[str, pd.DataFrame]:
+        return await self.db.run(self.sync.get_ohlcv, trading_code, start, end, max_points, resolution)
+
+    async def get_history_by_code(self, trading_code: str, columns: Optional[Sequence[str]] = None,
+                                  cursor: Optional[Any] = None, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        return await self.db.run(self.sync.get_history_by_code, trading_code, columns, cursor, limit)
+
+    async def refresh_summary(self) -> int:
+        return await self.db.run(self.sync.refresh_summary)
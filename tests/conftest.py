@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Add project root to Python path (so 'utils' / 'services' can be imported)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
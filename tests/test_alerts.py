@@ -0,0 +1,80 @@
+import pytest
+
+from services.alerts import AlertEngine, check_rule
+
+
+def _rows(code, closes, start_day=1):
+    return [{"trading_code": code, "date": f"2024-01-{start_day + i:02d}", "closep": c} for i, c in enumerate(closes)]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return AlertEngine(str(tmp_path / "alerts.sqlite"), webhook_url="")
+
+
+@pytest.mark.parametrize("kind, params, prev, close, fires", [
+    ("buy_below", {"price": 100.0}, 105.0, 100.0, True),      # touching the level counts
+    ("buy_below", {"price": 100.0}, 99.0, 98.0, False),       # already below: no new crossing
+    ("buy_below", {"price": 100.0}, None, 95.0, True),
+    ("sell_above", {"price": 100.0}, 95.0, 100.0, True),
+    ("sell_above", {"price": 100.0}, 101.0, 102.0, False),
+    ("move_pct", {"pct": 5.0}, 100.0, 95.0, True),
+    ("move_pct", {"pct": 5.0}, 100.0, 104.9, False),
+    ("move_pct", {"pct": 5.0}, None, 150.0, False),          # no previous close to compare with
+    ("band_break", {"lower": 90.0, "upper": 110.0}, 100.0, 111.0, True),
+    ("band_break", {"lower": 90.0, "upper": 110.0}, 100.0, 89.0, True),
+    ("band_break", {"lower": 90.0, "upper": 110.0}, 100.0, 110.0, False),
+    ("band_break", {"lower": 90.0, "upper": 110.0}, 120.0, 125.0, False),
+])
+def test_check_rule(kind, params, prev, close, fires):
+    assert (check_rule(kind, params, prev, close) is not None) == fires
+
+
+def test_evaluate_each_kind(engine):
+    engine.add_rule("aci", "buy_below", {"price": 100})
+    engine.add_rule("ACI", "sell_above", {"price": 120})
+    engine.add_rule("ACI", "move_pct", {"pct": 10})
+    engine.add_rule("ACI", "band_break", {"lower": 95, "upper": 125})
+
+    fired = engine.evaluate(_rows("ACI", [110, 98, 121, 130]) + _rows("GP", [1, 1000]))
+    got = sorted((e["kind"], e["date"]) for e in fired)
+    assert got == [
+        ("band_break", "2024-01-04"),
+        ("buy_below", "2024-01-02"),
+        ("move_pct", "2024-01-02"),     # 110 -> 98 is -10.9%
+        ("move_pct", "2024-01-03"),     # 98 -> 121 is +23.5%
+        ("sell_above", "2024-01-03"),
+    ]
+    assert all(e["trading_code"] == "ACI" for e in engine.events(limit=100))
+
+
+def test_reingesting_rows_fires_nothing_twice(engine):
+    engine.add_rule("ACI", "buy_below", {"price": 100})
+    rows = _rows("ACI", [110, 95, 105, 90])
+    assert len(engine.evaluate(rows)) == 2
+    assert engine.evaluate(rows) == []
+    assert engine.evaluate(list(reversed(rows))) == []
+    assert len(engine.events(limit=100)) == 2
+    assert engine.list_rules("ACI")[0]["fired_count"] == 2
+
+    # only the genuinely new day is evaluated, against the stored last close (90)
+    assert engine.evaluate(rows + _rows("ACI", [80], start_day=5)) == []
+    assert [e["date"] for e in engine.evaluate(_rows("ACI", [101, 99], start_day=6))] == ["2024-01-07"]
+
+
+def test_rule_seeded_with_latest_skips_stored_rows(engine):
+    engine.add_rule("ACI", "sell_above", {"price": 100}, latest=("2024-01-03", 90.0))
+    assert engine.evaluate(_rows("ACI", [120, 130, 90])) == []      # dates up to the seed are history
+    fired = engine.evaluate(_rows("ACI", [105], start_day=4))
+    assert [(e["date"], e["close"]) for e in fired] == [("2024-01-04", 105.0)]
+
+
+def test_add_rule_validates_params(engine):
+    with pytest.raises(ValueError):
+        engine.add_rule("ACI", "unknown", {})
+    with pytest.raises(ValueError):
+        engine.add_rule("ACI", "buy_below", {"price": "abc"})
+    with pytest.raises(ValueError):
+        engine.add_rule("ACI", "band_break", {"lower": 10, "upper": 5})
+    with pytest.raises(ValueError):
+        engine.add_rule("ACI", "move_pct", {"pct": 0})
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from utils.downsample import downsample_indices
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+@pytest.mark.parametrize("max_points", [1, 2, 3, 10])
+def test_never_exceeds_budget(method, max_points):
+    y = np.sin(np.linspace(0, 20, 500))
+    idx = downsample_indices(y, max_points, method=method)
+    assert 1 <= len(idx) <= max_points
+    assert idx[-1] == 499
+    assert np.all(np.diff(idx) > 0)
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_single_point_budget_keeps_last(method):
+    assert downsample_indices([1.0, 2.0, 3.0], 1, method=method).tolist() == [2]
+
+
+def test_short_series_untouched():
+    assert downsample_indices([1.0, 2.0], 5).tolist() == [0, 1]
+    assert downsample_indices([1.0, 2.0, 3.0], 0).tolist() == [0, 1, 2]
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from services.job_handlers import confine_path, validate_job_params
+
+
+def test_confine_path_accepts_files_inside(tmp_path):
+    root = tmp_path / "uploads"
+    root.mkdir()
+    assert confine_path(str(root / "a.csv"), [str(root)]) == os.path.realpath(root / "a.csv")
+
+
+@pytest.mark.parametrize("path", ["../secret.csv", "sub/../../secret.csv", "/etc/passwd"])
+def test_confine_path_rejects_escapes(tmp_path, path):
+    root = tmp_path / "uploads"
+    root.mkdir()
+    target = path if os.path.isabs(path) else str(root / path)
+    with pytest.raises(ValueError):
+        confine_path(target, [str(root)])
+
+
+def test_confine_path_rejects_sibling_prefix(tmp_path):
+    (tmp_path / "uploads").mkdir()
+    with pytest.raises(ValueError):
+        confine_path(str(tmp_path / "uploads_evil" / "a.csv"), [str(tmp_path / "uploads")])
+
+
+def test_confine_path_follows_symlinks(tmp_path):
+    root = tmp_path / "uploads"
+    root.mkdir()
+    (root / "link").symlink_to(tmp_path)
+    with pytest.raises(ValueError):
+        confine_path(str(root / "link" / "secret.csv"), [str(root)])
+
+
+def test_validate_job_params_checks_path_kinds(monkeypatch, tmp_path):
+    monkeypatch.setattr("services.job_handlers.INGEST_DIR", str(tmp_path))
+    validate_job_params("ingest", {"path": str(tmp_path / "a.csv")})
+    validate_job_params("summary_refresh", {})
+    with pytest.raises(ValueError):
+        validate_job_params("ingest", {"path": str(tmp_path / ".." / "a.csv")})
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from services.job_queue import JobCancelled, JobContext, JobQueue
+
+
+def _queue(tmp_path, **kwargs):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), **kwargs)
+    queue.register("noop", lambda ctx: {"ok": True})
+    return queue
+
+
+def _wait(queue, job_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while queue.get(job_id)["status"] in ("queued", "running"):
+        assert time.time() < deadline, f"job {job_id} did not finish"
+        time.sleep(0.05)
+    return queue.get(job_id)
+
+
+def test_concurrent_claims_take_each_job_once(tmp_path):
+    queues = [_queue(tmp_path) for _ in range(4)]
+    ids = {queues[0].submit("noop") for _ in range(40)}
+    claimed, lock = [], threading.Lock()
+
+    def drain(queue):
+        while (job := queue._claim()) is not None:
+            with lock:
+                claimed.append((job["id"], queue.owner))
+
+    threads = [threading.Thread(target=drain, args=(q,)) for q in queues for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(j for j, _ in claimed) == sorted(ids)
+    for job_id, owner in claimed:
+        job = queues[0].get(job_id)
+        assert job["status"] == "running" and job["owner"] == owner
+
+
+def test_expired_lease_is_requeued_and_rerun(tmp_path):
+    dead = _queue(tmp_path, lease_seconds=0.3)
+    job_id = dead.submit("noop")
+    assert dead._claim()["id"] == job_id          # claimed, then the owner "dies" (no heartbeat)
+
+    live = _queue(tmp_path, lease_seconds=0.3, poll_interval=0.05)
+    live.start()
+    try:
+        job = _wait(live, job_id)
+    finally:
+        live.stop()
+    assert job["status"] == "succeeded"
+    assert job["owner"] == live.owner
+
+
+def test_live_lease_is_not_taken_over(tmp_path):
+    started = threading.Event()
+
+    def slow(ctx):
+        started.set()
+        time.sleep(1.0)      # longer than the lease, no progress calls: only the heartbeat keeps it
+        return {"ok": True}
+
+    first = _queue(tmp_path, lease_seconds=0.3, poll_interval=0.05)
+    first.register("slow", slow)
+    second = _queue(tmp_path, lease_seconds=0.3, poll_interval=0.05)
+    second.register("slow", slow)
+    job_id = first.submit("slow")
+    first.start()
+    try:
+        assert started.wait(5)
+        second.start()
+        job = _wait(first, job_id)
+    finally:
+        first.stop()
+        second.stop()
+    assert job["status"] == "succeeded"
+    assert job["owner"] == first.owner
+
+
+def test_cancel_queued_and_running(tmp_path):
+    queue = _queue(tmp_path, poll_interval=0.05)
+    queued = queue.submit("noop")
+    assert queue.cancel(queued)
+    assert queue.get(queued)["status"] == "cancelled"
+
+    release = threading.Event()
+
+    def loop(ctx):
+        while True:
+            release.wait(0.05)
+            ctx.progress(advance=1)
+
+    queue.register("loop", loop)
+    running = queue.submit("loop")
+    queue.start()
+    try:
+        while queue.get(running)["status"] != "running":
+            time.sleep(0.05)
+        assert queue.cancel(running)
+        job = _wait(queue, running)
+    finally:
+        queue.stop()
+    assert job["status"] == "cancelled"
+    assert not queue.cancel(running)               # already settled
+
+
+def test_progress_raises_after_cancel(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = queue.submit("noop")
+    job = queue._claim()
+    ctx = JobContext(queue, job_id, job["started_at"])
+    queue.cancel(job_id)
+    with pytest.raises(JobCancelled):
+        ctx.progress(1)
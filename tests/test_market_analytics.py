@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from services.market_analytics import CorrelationEngine, ReturnPanel
+
+
+def _panel(days=120, codes=6, seed=7):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.02, size=(days, codes))
+    returns[:, 1] += returns[:, 0]                 # a correlated pair
+    returns[:60, 2] = np.nan                       # newly listed halfway through
+    returns[30:50, 3] = np.nan                     # suspended for 20 days
+    returns[rng.random((days, codes)) < 0.05] = np.nan
+    dates = np.datetime64("2024-01-01") + np.arange(days)
+    return ReturnPanel(dates, [f"C{i}" for i in range(codes)], returns, np.nanmean(returns, axis=1), "equal_weight")
+
+
+def _expected(panel, window):
+    frame = pd.DataFrame(panel.returns[-window:], columns=panel.codes)
+    return frame.corr(min_periods=20).to_numpy()
+
+
+def test_correlation_is_pairwise_over_common_days():
+    panel = _panel()
+    engine = CorrelationEngine(panel, window=len(panel))
+    got = engine.correlation().to_numpy(dtype=np.float64)
+    np.testing.assert_allclose(got, _expected(panel, len(panel)), atol=1e-5, equal_nan=True)
+
+
+def test_rank1_updates_match_a_fresh_window():
+    panel = _panel(days=150)
+    head = ReturnPanel(panel.dates[:100], panel.codes, panel.returns[:100], panel.market[:100], "equal_weight")
+    engine = CorrelationEngine(head, window=80)
+    assert engine.extend(panel) == 50
+    got = engine.correlation().to_numpy(dtype=np.float64)
+    np.testing.assert_allclose(got, _expected(panel, 80), atol=1e-5, equal_nan=True)
@@ -0,0 +1,59 @@
+import numpy as np
+
+from utils.timeseries import TimeSeries
+
+# Trading days with a weekend gap: 2024-01-06 and 2024-01-07 are missing
+DATES = ["2024-01-03", "2024-01-04", "2024-01-05", "2024-01-08", "2024-01-09"]
+
+
+def _series():
+    return TimeSeries.from_lists(DATES, [1.0, 2.0, 3.0, 4.0, 5.0])
+
+
+def test_between_includes_both_ends():
+    ts = _series().between("2024-01-04", "2024-01-08")
+    assert ts.date_strings() == ["2024-01-04", "2024-01-05", "2024-01-08"]
+    assert ts.values.tolist() == [2.0, 3.0, 4.0]
+
+
+def test_between_missing_end_dates_snap_inward():
+    ts = _series().between("2024-01-06", "2024-01-07")
+    assert len(ts) == 0
+    assert _series().between("2024-01-06", "2024-01-10").date_strings() == ["2024-01-08", "2024-01-09"]
+    assert _series().between("2024-01-01", "2024-01-03").date_strings() == ["2024-01-03"]
+
+
+def test_between_open_ends_and_empty_ranges():
+    ts = _series()
+    assert ts.between().date_strings() == DATES
+    assert ts.between(start="2024-01-08").date_strings() == DATES[3:]
+    assert ts.between(end="2024-01-04").date_strings() == DATES[:2]
+    assert len(ts.between("2024-01-10", "2024-02-01")) == 0
+    assert len(ts.between("2024-01-08", "2024-01-04")) == 0       # start after end
+
+
+def test_at_skips_missing_and_unparseable_dates():
+    ts = _series().at(["2024-01-09", "2024-01-06", "not a date", "2024-01-03", "2024-01-09"])
+    assert ts.date_strings() == ["2024-01-03", "2024-01-09"]      # sorted, each date once
+    assert ts.values.tolist() == [1.0, 5.0]
+    assert len(_series().at(["2024-01-06"])) == 0
+    assert len(_series().at([])) == 0
+
+
+def test_at_keeps_every_row_of_a_repeated_date():
+    ts = TimeSeries.from_lists(["2024-01-02", "2024-01-03", "2024-01-03", "2024-01-04"], [1, 2, 3, 4])
+    assert ts.at(["2024-01-03"]).values.tolist() == [2.0, 3.0]
+
+
+def test_empty_series():
+    ts = TimeSeries.from_lists([], [])
+    assert len(ts) == 0
+    assert len(ts.between("2024-01-01", "2024-12-31")) == 0
+    assert len(ts.at(["2024-01-01"])) == 0
+    assert ts.to_axis() == {"x": [], "y": [], "name": "Price"}
+
+
+def test_unsorted_input_and_bad_rows():
+    ts = TimeSeries.from_lists(["2024-01-05", "bad", "2024-01-03", "2024-01-04"], [3, 9, "x", 2])
+    assert ts.date_strings() == ["2024-01-04", "2024-01-05"]
+    assert np.all(np.diff(ts.dates) > 0)
@@ -3,8 +3,16 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+DEFAULT_DB_PATHS = {"sqlite": "db/sharemarket.sqlite", "duckdb": "db/sharemarket.duckdb"}
+
+
 def build_connection_string() -> str:
-    """Build SQLAlchemy connection string for MSSQL"""
+    """Build SQLAlchemy connection string for MSSQL, or an embedded SQLite/DuckDB file (DB_BACKEND)"""
+    backend = os.getenv("DB_BACKEND", "mssql").lower()
+    if backend in DEFAULT_DB_PATHS:
+        path = os.getenv("DB_PATH", DEFAULT_DB_PATHS[backend])
+        return f"{backend}:///{path}"
+
     driver = os.getenv("DB_DRIVER", "ODBC Driver 11 for SQL Server")
     server = os.getenv("DB_SERVER", "(local)")
     port = os.getenv("DB_PORT", "1433")
@@ -1,8 +1,40 @@
 """
 SQLAlchemy Database Manager for MSSQL Server Integration (raw SQL usage)
+
+Also supports embedded SQLite / DuckDB files (see utils.config DB_BACKEND);
+``db_manager.sql`` gives the dialect helpers services use to keep raw SQL portable.
+``AsyncDatabaseManager`` wraps one for async (FastAPI) code.
 """
-from sqlalchemy import create_engine
+import asyncio
+import functools
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from utils.sql_dialect import SqlDialect
+
+# Threads serving AsyncDatabaseManager calls (keep <= engine pool_size + max_overflow, 5 + 10 by default)
+DB_THREADS = int(os.getenv("DB_THREADS", "8"))
+
+
+class _SampleStdev:
+    """STDEV aggregate for SQLite (Welford), matching SQL Server's sample STDEV."""
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def step(self, value):
+        if value is None:
+            return
+        self.n += 1
+        delta = float(value) - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (float(value) - self.mean)
+
+    def finalize(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else None
 
 
 # Database connection and session management
@@ -12,17 +44,34 @@ class DatabaseManager:
         self.connection_string = connection_string
         self.engine = None
         self.SessionLocal = None
+        self.sql: SqlDialect = None  # type: ignore
         self.initialize_database()
     
     def initialize_database(self):
         """Initialize database connection"""
         try:
+            url = make_url(self.connection_string)
+            backend = url.get_backend_name()
+            engine_kwargs = {}
+            if backend == "mssql" and url.get_driver_name() == "pyodbc":
+                # Send executemany batches as one round trip instead of one per row
+                engine_kwargs["fast_executemany"] = True
+            if backend in ("sqlite", "duckdb") and url.database and url.database != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(url.database)), exist_ok=True)
+            if backend == "sqlite":
+                # FastAPI/job workers use sessions from several threads
+                engine_kwargs["connect_args"] = {"check_same_thread": False}
+
             self.engine = create_engine(
                 self.connection_string,
                 echo=False,  # Set to True for SQL debugging
                 pool_pre_ping=True,
-                pool_recycle=3600
+                pool_recycle=3600,
+                **engine_kwargs
             )
+            if backend == "sqlite":
+                event.listen(self.engine, "connect", self._configure_sqlite)
+            self.sql = SqlDialect(self.engine.dialect.name)
             
             # Create session factory
             self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
@@ -32,6 +81,14 @@ class DatabaseManager:
         except Exception as e:
             print(f"Failed to initialize database: {e}")
             raise
+
+    @staticmethod
+    def _configure_sqlite(dbapi_conn, _record):
+        dbapi_conn.create_aggregate("STDEV", 1, _SampleStdev)
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
     
     def get_session(self):
         """Get a database session"""
@@ -46,5 +103,41 @@ class DatabaseManager:
             self.engine.dispose()
 
 
+class AsyncDatabaseManager:
+    """
+    Awaitable access to a DatabaseManager.
+
+    pyodbc, SQLite and DuckDB have no asyncio driver usable by the raw-SQL
+    services, so blocking calls run on a dedicated pool of ``DB_THREADS``
+    threads. They never touch the event loop or Starlette's shared
+    threadpool: a slow history query holds one DB thread while other
+    requests keep being served, and handlers can ``asyncio.gather`` queries.
+    """
+    def __init__(self, db_manager: DatabaseManager, max_workers: int = DB_THREADS):
+        self.db_manager = db_manager
+        self.sql: SqlDialect = db_manager.sql
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await ``fn(*args, **kwargs)`` on a DB thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def fetchall(self, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Tuple]:
+        """Rows of a raw SQL query as tuples."""
+        return await self.run(self._fetchall, sql, params)
+
+    def _fetchall(self, sql: str, params: Optional[Dict[str, Any]]) -> List[Tuple]:
+        session = self.db_manager.get_session()
+        try:
+            return [tuple(row) for row in session.execute(text(sql), params or {}).fetchall()]
+        finally:
+            session.close()
+
+    def close(self):
+        """Stop the DB threads (queued calls are cancelled); the wrapped engine is left to its owner."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
 # Global database manager instance (will be initialized in config)
-db_manager: DatabaseManager = None # type: ignore
\ No newline at end of file
+db_manager: DatabaseManager = None # type: ignore
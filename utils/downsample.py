@@ -0,0 +1,104 @@
+"""
+Point-budget downsampling for chart series.
+
+Both methods return sorted row indices (always including the first and last
+point; just the last one for a one-point budget), so callers can slice dates,
+values or whole DataFrames with them:
+
+- ``lttb``: Largest-Triangle-Three-Buckets; keeps the visually dominant point
+  of each bucket. Bucket averages and triangle areas are NumPy ops; only the
+  walk over buckets (``max_points`` steps) is a Python loop.
+- ``minmax``: lowest and highest point of every bucket, fully vectorized.
+  Guarantees every peak and trough survives.
+
+NaN values never get selected unless a bucket holds nothing else.
+"""
+from typing import Any, Optional
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def _all_rows(n: int) -> np.ndarray:
+    return np.arange(n, dtype=np.int64)
+
+
+def _endpoints(n: int, max_points: int) -> np.ndarray:
+    """First and last row, or just the last one when the budget is a single point."""
+    return np.array([n - 1] if max_points <= 1 else [0, n - 1], dtype=np.int64)
+
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    """Edges splitting rows 1..n-2 (first/last are always kept) into ``buckets`` near-equal runs."""
+    return np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+
+def minmax_indices(y: Any, max_points: int) -> np.ndarray:
+    y = np.asarray(y, dtype=np.float64).reshape(-1)
+    n = len(y)
+    buckets = (max_points - 2) // 2
+    if n <= max_points or buckets < 1:
+        return _all_rows(n) if n <= max_points else _endpoints(n, max_points)
+
+    size = int(np.ceil((n - 2) / buckets))
+    inner = y[1:n - 1]
+    pad = buckets * size - len(inner)
+    lo_src = np.concatenate([np.where(np.isnan(inner), np.inf, inner), np.full(pad, np.inf)]).reshape(buckets, size)
+    hi_src = np.concatenate([np.where(np.isnan(inner), -np.inf, inner), np.full(pad, -np.inf)]).reshape(buckets, size)
+
+    base = np.arange(buckets, dtype=np.int64) * size + 1
+    picks = np.concatenate([base + lo_src.argmin(axis=1), base + hi_src.argmax(axis=1)])
+    picks = picks[picks < n - 1]
+    return np.unique(np.concatenate([[0], picks, [n - 1]]))
+
+
+def lttb_indices(y: Any, max_points: int, x: Optional[Any] = None) -> np.ndarray:
+    y = np.asarray(y, dtype=np.float64).reshape(-1)
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return _all_rows(n) if n <= max_points else _endpoints(n, max_points)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64).reshape(-1)
+
+    buckets = max_points - 2
+    edges = _bucket_edges(n, buckets)
+    # Average point of each bucket (the third triangle vertex for the bucket before it)
+    counts = np.diff(edges)
+    y_filled = np.where(np.isnan(y), 0.0, y)
+    valid = (~np.isnan(y)).astype(np.float64)
+    sum_x = np.add.reduceat(x[:n - 1], edges[:-1])
+    sum_y = np.add.reduceat(y_filled[:n - 1], edges[:-1])
+    cnt_y = np.maximum(np.add.reduceat(valid[:n - 1], edges[:-1]), 1.0)
+    avg_x = np.append(sum_x / np.maximum(counts, 1), x[-1])
+    avg_y = np.append(sum_y / cnt_y, y_filled[-1])
+
+    out = np.empty(max_points, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(buckets):
+        lo, hi = edges[i], edges[i + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        area = np.where(np.isnan(area), -1.0, area)
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def downsample_indices(y: Any, max_points: Optional[int], x: Optional[Any] = None,
+                       method: str = "lttb") -> np.ndarray:
+    """Rows to keep so at most ``max_points`` remain (all rows when ``max_points`` is falsy)."""
+    n = len(y)
+    if not max_points or n <= max_points:
+        return _all_rows(n)
+    if method == "lttb":
+        return lttb_indices(y, max_points, x)
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    raise ValueError(f"Unknown downsampling method '{method}' (expected one of {METHODS})")
+
+
+def downsample_frame(df, column: str, max_points: Optional[int], method: str = "lttb"):
+    """Rows of ``df`` chosen by downsampling ``df[column]`` (row order preserved)."""
+    idx = downsample_indices(df[column].to_numpy(dtype=np.float64, na_value=np.nan), max_points, method=method)
+    return df if len(idx) == len(df) else df.iloc[idx]
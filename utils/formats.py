@@ -0,0 +1,108 @@
+"""
+Response encodings for the data-heavy API endpoints.
+
+Bulk results are handed over as a dict of equal-length columns and encoded as
+Arrow IPC stream, Parquet, or columnar JSON (orjson when installed). pyarrow
+and orjson are optional: JSON falls back to the stdlib encoder, and binary
+formats report a clear error if pyarrow is missing.
+"""
+import datetime
+import decimal
+import json
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+JSON_MEDIA_TYPE = "application/json"
+
+# format name -> media type
+FORMATS = {
+    "json": JSON_MEDIA_TYPE,
+    "columnar": JSON_MEDIA_TYPE,
+    "arrow": ARROW_MEDIA_TYPE,
+    "parquet": PARQUET_MEDIA_TYPE,
+}
+_ACCEPT_ALIASES = {
+    ARROW_MEDIA_TYPE: "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    PARQUET_MEDIA_TYPE: "parquet",
+    "application/x-parquet": "parquet",
+}
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None, default: str = "json") -> str:
+    """Pick an output format from an explicit ``format`` param, else the Accept header."""
+    if requested:
+        fmt = requested.strip().lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{requested}' (expected one of {sorted(FORMATS)})")
+        return fmt
+    for part in (accept or "").split(","):
+        media = part.split(";")[0].strip().lower()
+        if media in _ACCEPT_ALIASES:
+            return _ACCEPT_ALIASES[media]
+    return default
+
+
+def _default(v: Any):
+    if isinstance(v, (datetime.date, datetime.datetime)):
+        return v.isoformat()
+    if isinstance(v, decimal.Decimal):
+        return float(v)
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, np.ndarray):
+        return v.tolist()
+    raise TypeError(f"Object of type {type(v).__name__} is not JSON serializable")
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Serialize to JSON bytes; orjson (with native NumPy support) when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def _to_arrow_array(values: Sequence[Any]):
+    import pyarrow as pa
+
+    if isinstance(values, np.ndarray):
+        return pa.array(values)
+    first = next((v for v in values if v is not None), None)
+    if isinstance(first, decimal.Decimal):
+        values = [float(v) if v is not None else None for v in values]
+    return pa.array(values)
+
+
+def encode_columns(columns: Dict[str, Sequence[Any]], fmt: str,
+                   metadata: Optional[Dict[str, Any]] = None) -> Tuple[bytes, str]:
+    """Encode equal-length columns; ``metadata`` rides along as top-level JSON keys or Arrow schema metadata."""
+    if fmt in ("json", "columnar"):
+        return dumps_json({**(metadata or {}), "columns": columns}), JSON_MEDIA_TYPE
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError(f"Format '{fmt}' requires pyarrow (pip install pyarrow)")
+
+    table = pa.table({name: _to_arrow_array(values) for name, values in columns.items()})
+    if metadata:
+        table = table.replace_schema_metadata({"meta": dumps_json(metadata)})
+
+    sink = pa.BufferOutputStream()
+    if fmt == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink, compression="zstd")
+    else:
+        raise ValueError(f"Unknown format '{fmt}'")
+    return sink.getvalue().to_pybytes(), FORMATS[fmt]
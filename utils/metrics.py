@@ -0,0 +1,143 @@
+"""
+In-process metrics for the prediction API.
+
+Counters and latency histograms live in one module-level ``REGISTRY`` and are
+rendered in Prometheus text exposition format by ``/metrics``. Kept stdlib
+only so it can be imported from agents and services without extra deps.
+
+    with timed("scrape"):
+        docs = scraper.run(url)
+    inc("scrape_fallbacks_total")
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+# Seconds; spans range from sub-ms model inference to multi-second Selenium scrapes
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+NAMESPACE = "sharemarket"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, le in enumerate(self.buckets):
+            if value <= le:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by (name, labels)."""
+    def __init__(self, namespace: str = NAMESPACE, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Counters and per-stage {count, sum, avg} for /status."""
+        with self._lock:
+            counters = {name: {_fmt_labels(k): v for k, v in series.items()}
+                        for name, series in self._counters.items()}
+            stages = {}
+            for name, series in self._histograms.items():
+                for key, h in series.items():
+                    stages[f"{name}{_fmt_labels(key)}"] = {
+                        "count": h.count, "sum_seconds": round(h.sum, 6),
+                        "avg_seconds": round(h.sum / h.count, 6) if h.count else None,
+                    }
+        return {"counters": counters, "latency": stages}
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = f"{self.namespace}_{name}"
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_fmt_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = f"{self.namespace}_{name}"
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for key, h in sorted(series.items()):
+                    for le, count in zip(h.buckets, h.counts):
+                        lines.append(f"{full}_bucket{_fmt_labels(key, ('le', f'{le:g}'))} {count}")
+                    lines.append(f"{full}_bucket{_fmt_labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{full}_sum{_fmt_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{full}_count{_fmt_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe("stage_seconds", "Wall time per /predict pipeline stage")
+REGISTRY.describe("model_cache_total", "Quantile model cache lookups by result (hit/miss)")
+REGISTRY.describe("scrape_fallbacks_total", "Scrapes that returned an error instead of chart data")
+REGISTRY.describe("heuristic_fallbacks_total", "Predictions served by the ModelAgent heuristic")
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def inc(name: str, value: float = 1.0, **labels: str):
+    REGISTRY.inc(name, value, labels)
+
+
+@contextmanager
+def timed(stage: str, metric: str = "stage_seconds") -> Iterator[None]:
+    """Record the wall time of the block under ``metric{stage=...}`` (also on error)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(metric, time.perf_counter() - start, {"stage": stage})
@@ -0,0 +1,34 @@
+"""
+Small helpers for the few places raw SQL differs between SQL Server and the
+embedded backends (SQLite, DuckDB): schema prefix, row limits, and STDEV.
+"""
+
+
+class SqlDialect:
+    def __init__(self, name: str):
+        self.name = name
+
+    @property
+    def is_mssql(self) -> bool:
+        return self.name == "mssql"
+
+    @property
+    def schema(self):
+        """Schema name for Alembic/inspection calls (None = default schema)."""
+        return "dbo" if self.is_mssql else None
+
+    def table(self, name: str) -> str:
+        return f"dbo.{name}" if self.is_mssql else name
+
+    def top(self, param: str = ":limit") -> str:
+        """Row-limit prefix for SELECT (T-SQL TOP); empty elsewhere."""
+        return f"TOP ({param}) " if self.is_mssql else ""
+
+    def limit(self, param: str = ":limit") -> str:
+        """Row-limit suffix (LIMIT); empty on SQL Server."""
+        return "" if self.is_mssql else f" LIMIT {param}"
+
+    @property
+    def stdev(self) -> str:
+        # SQLite gets a STDEV aggregate registered on connect (see DatabaseManager)
+        return "STDDEV_SAMP" if self.name == "duckdb" else "STDEV"
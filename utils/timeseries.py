@@ -0,0 +1,136 @@
+"""
+Sorted, array-backed time series shared by the scrapers and the feature pipeline.
+
+Dates are stored as int64 day ordinals (days since 1970-01-01) and values as
+float64, both in contiguous NumPy arrays. The dates array is always sorted
+ascending, so range slicing and date-list lookups are binary searches instead
+of list scans.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+_EPOCH_DAY = np.datetime64("1970-01-01", "D")
+NO_DATE = np.iinfo(np.int64).min
+
+
+def _flat(values: Any) -> np.ndarray:
+    arr = values.to_numpy() if isinstance(values, (pd.Series, pd.DataFrame, pd.Index)) else np.asarray(values)
+    return arr.reshape(-1)
+
+
+def to_ordinals(dates: Any) -> np.ndarray:
+    """Convert strings/datetimes to int64 day ordinals; unparseable entries become ``NO_DATE``."""
+    arr = _flat(dates)
+    if not np.issubdtype(arr.dtype, np.datetime64):
+        parsed = pd.to_datetime(pd.Series(arr, dtype=object), errors="coerce")
+        if getattr(parsed.dt, "tz", None) is not None:
+            parsed = parsed.dt.tz_localize(None)
+        arr = parsed.to_numpy()
+    days = arr.astype("datetime64[D]")
+    out = (days - _EPOCH_DAY).astype(np.int64)
+    out[np.isnat(days)] = NO_DATE
+    return out
+
+
+def ordinals_to_strings(ordinals: np.ndarray, fmt: str = "%Y-%m-%d") -> List[str]:
+    """Format day ordinals back into date strings."""
+    days = _EPOCH_DAY + np.asarray(ordinals, dtype=np.int64).astype("timedelta64[D]")
+    if fmt == "%Y-%m-%d":
+        return np.datetime_as_string(days, unit="D").tolist()
+    return pd.DatetimeIndex(days).strftime(fmt).tolist()
+
+
+class TimeSeries:
+    """Immutable date/value series with a sorted-date invariant."""
+
+    __slots__ = ("dates", "values", "name")
+
+    def __init__(self, dates: np.ndarray, values: np.ndarray, name: str = "Price", assume_sorted: bool = False):
+        dates = np.ascontiguousarray(dates, dtype=np.int64)
+        values = np.ascontiguousarray(values, dtype=np.float64).reshape(-1)
+        if len(dates) != len(values):
+            raise ValueError(f"dates and values length mismatch: {len(dates)} != {len(values)}")
+
+        if not assume_sorted and len(dates) > 1 and np.any(dates[1:] < dates[:-1]):
+            order = np.argsort(dates, kind="stable")
+            dates, values = dates[order], values[order]
+
+        self.dates = dates
+        self.values = values
+        self.name = name
+
+    # -----------------------------------------------------------
+    # 🔹 Constructors
+    # -----------------------------------------------------------
+    @classmethod
+    def from_lists(cls, x: Iterable[Any], y: Iterable[Any], name: str = "Price") -> "TimeSeries":
+        """Build from parallel date/value sequences, dropping unparseable dates and non-numeric values."""
+        ords = to_ordinals(x)
+        vals = pd.to_numeric(pd.Series(_flat(y), dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+        keep = (ords != NO_DATE) & ~np.isnan(vals)
+        return cls(ords[keep], vals[keep], name=name)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, date_col: str = "Date", value_col: str = "Close",
+                   name: str = "Price") -> "TimeSeries":
+        """Build from two DataFrame columns."""
+        return cls.from_lists(df[date_col], df[value_col], name=name)
+
+    @classmethod
+    def from_axis(cls, axis: Dict[str, Any], default_name: str = "Price") -> "TimeSeries":
+        """Build from an ``{"x": [...], "y": [...], "name": ...}`` axis dict."""
+        return cls.from_lists(axis.get("x", []), axis.get("y", []), name=axis.get("name", default_name))
+
+    # -----------------------------------------------------------
+    # 🔹 Lookups
+    # -----------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _take(self, idx: np.ndarray) -> "TimeSeries":
+        return TimeSeries(self.dates[idx], self.values[idx], name=self.name, assume_sorted=True)
+
+    def between(self, start: Optional[Any] = None, end: Optional[Any] = None) -> "TimeSeries":
+        """Inclusive date range slice in O(log n); returns views, not copies."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, to_ordinals([start])[0], side="left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, to_ordinals([end])[0], side="right"))
+        return TimeSeries(self.dates[lo:hi], self.values[lo:hi], name=self.name, assume_sorted=True)
+
+    def at(self, dates: Iterable[Any]) -> "TimeSeries":
+        """Batched point lookup: keep every row whose date is in ``dates`` (O(m log n))."""
+        keys = to_ordinals(dates)
+        keys = np.unique(keys[keys != NO_DATE])
+        if len(keys) == 0 or len(self.dates) == 0:
+            return self._take(np.empty(0, dtype=np.int64))
+
+        lo = np.searchsorted(self.dates, keys, side="left")
+        hi = np.searchsorted(self.dates, keys, side="right")
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            return self._take(np.empty(0, dtype=np.int64))
+
+        # Expand each [lo, hi) run into explicit row positions without a Python loop
+        starts = np.repeat(lo, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self._take(starts + offsets)
+
+    def downsample(self, max_points: Optional[int], method: str = "lttb") -> "TimeSeries":
+        """At most ``max_points`` rows, keeping peaks/troughs (see utils.downsample)."""
+        from utils.downsample import downsample_indices
+
+        if not max_points or len(self) <= max_points:
+            return self
+        return self._take(downsample_indices(self.values, max_points, x=self.dates, method=method))
+
+    # -----------------------------------------------------------
+    # 🔹 Export
+    # -----------------------------------------------------------
+    def date_strings(self, fmt: str = "%Y-%m-%d") -> List[str]:
+        return ordinals_to_strings(self.dates, fmt)
+
+    def to_axis(self) -> Dict[str, Any]:
+        """Axis dict in the shape the agents and API already exchange."""
+        return {"x": self.date_strings(), "y": self.values.tolist(), "name": self.name}